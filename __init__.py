@@ -1,3 +1,14 @@
 name = 'eazysdk'
 
-from eazysdk.main import EazySDK
\ No newline at end of file
+
+def __getattr__(name):
+    # The SDKs are imported on first use, so importing eazysdk is cheap
+    if name == 'EazySDK':
+        from eazysdk.main import EazySDK
+        return EazySDK
+    if name == 'AsyncEazySDK':
+        from eazysdk.aio import AsyncEazySDK
+        return AsyncEazySDK
+    raise AttributeError(
+        "module 'eazysdk' has no attribute '%s'" % name
+    )
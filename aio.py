@@ -0,0 +1,733 @@
+"""
+eazysdk.aio
+~~~~~~~~~~~
+
+This module contains the AsyncEazySDK, which mirrors every call of the
+EazySDK as a coroutine. Requests are sent with aiohttp, which must be
+installed separately.
+"""
+from asyncio import Semaphore
+from asyncio import FIRST_COMPLETED
+from asyncio import ensure_future
+from asyncio import wait
+from asyncio import TimeoutError
+from asyncio import sleep
+from asyncio import shield
+from asyncio import wait_for
+from asyncio import get_running_loop
+from collections import deque
+from collections import namedtuple
+from contextvars import copy_context
+from functools import wraps
+from time import monotonic
+from .get import Get
+from .get import bisect_window
+from .get import check_payment_rows
+from .get import customer_records
+from .get import customer_windows
+from .get import split_windows
+from .get import max_payment_rows
+from .get import payment_records
+from .post import Post
+from .post import contract_key
+from .post import contract_row
+from .post import customer_key
+from .post import customer_parameters
+from .bulk import async_pipeline
+from .bulk import created_id
+from .utils.contract_checks import ContractContext
+from .patch import Patch
+from .delete import Delete
+from .session import Response
+from .session import Session
+from .session import describe_request
+from .session import raise_for_response
+from .session import release_response
+from .session import response_content
+from .session import RawResponse
+from .stream import aiter_array
+from .coalesce import SingleFlight
+from .coalesce import deadline_exceeded
+from .settings import Settings
+from .settings import Settings as s
+from .exceptions import check_common_exceptions
+from .exceptions import describe_error
+from .exceptions import EazySDKException
+from .exceptions import RequestTimeoutError
+from .exceptions import ServerError
+from .timeouts import call_deadline
+from .timeouts import remaining
+from .timeouts import request_timeout
+from .timeouts import timeout
+
+
+class AsyncTransport:
+    def __init__(self, concurrency=None, pool_maxsize=None):
+        """
+        Creates a non-blocking transport shared by every request sent
+        to EazyCustomerManager from an AsyncEazySDK
+
+        :Optional args:
+        - concurrency - The number of requests allowed in flight at
+            once. By default, this is read from settings.connection_pool
+        - pool_maxsize - The number of connections kept alive per host.
+            By default, this is read from settings.connection_pool
+        """
+        if concurrency is None:
+            concurrency = s.connection_pool['async_concurrency']
+        if pool_maxsize is None:
+            pool_maxsize = s.connection_pool['pool_maxsize']
+        self.concurrency = concurrency
+        self.pool_maxsize = pool_maxsize
+        # The semaphore is created on first use, inside the running loop
+        self.semaphore = None
+        self.client = None
+
+    def _client(self):
+        if self.client is None:
+            try:
+                import aiohttp
+            except ImportError:
+                raise ImportError(
+                    'The AsyncEazySDK requires aiohttp. It can be installed'
+                    ' with pip install aiohttp'
+                )
+            self.semaphore = Semaphore(self.concurrency)
+            self.client = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=self.pool_maxsize
+                )
+            )
+        return self.client
+
+    async def request(self, method, url, params=None, headers=None,
+                      timeout=None, deadline=None, stream=False):
+        """
+        Send a request without blocking the event loop, waiting for a
+        free slot if the concurrency limit has been reached
+
+        :Required args:
+        - method - The HTTP method of the request
+        - url - The full URL of the request
+
+        :Optional args:
+        - timeout - The (connect, read) timeouts of the request
+        - deadline - The total number of seconds the request may take,
+            including waiting for a free slot
+        - stream - Return once the headers have arrived, leaving the
+            body to be read from the AsyncStreamedResponse
+
+        :Returns:
+        AsyncResponse(status_code, headers, text, content), or an
+        AsyncStreamedResponse if stream is set
+        """
+        import aiohttp
+        client = self._client()
+        connect, read = timeout or (None, None)
+        client_timeout = aiohttp.ClientTimeout(
+            total=deadline, sock_connect=connect, sock_read=read,
+        )
+        async with self.semaphore:
+            if stream:
+                return AsyncStreamedResponse(await client.request(
+                    method, url, params=_query(params), headers=headers,
+                    timeout=client_timeout,
+                ))
+            async with client.request(method, url, params=_query(params),
+                                      headers=headers,
+                                      timeout=client_timeout) as response:
+                # The text is decoded from the body read here
+                content = await response.read()
+                return AsyncResponse(
+                    response.status, response.headers,
+                    await response.text(), content,
+                )
+
+    async def close(self):
+        """
+        Close every connection held by the transport
+        """
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+
+# The parts of an aiohttp response used by the AsyncSession. The body
+# is kept as the bytes received when the transport has them.
+AsyncResponse = namedtuple(
+    'AsyncResponse', 'status_code headers text content', defaults=(None,)
+)
+
+
+class AsyncStreamedResponse:
+    def __init__(self, response):
+        """
+        An aiohttp response whose body has not been read, returned by
+        AsyncTransport.request when streaming
+        """
+        self.response = response
+        self.status_code = response.status
+        self.headers = response.headers
+
+    async def read(self):
+        """
+        Read the whole body of the response, as bytes
+        """
+        return await self.response.read()
+
+    async def read_text(self):
+        """
+        Read the whole body of the response
+        """
+        return await self.response.text()
+
+    def iter_chunks(self, chunk_size):
+        """
+        Read the body of the response a chunk at a time
+        """
+        return self.response.content.iter_chunked(chunk_size)
+
+    def close(self):
+        """
+        Return the connection of the response to the pool
+        """
+        self.response.release()
+
+
+def _query(params):
+    # Encode parameters the same way requests does for the EazySDK
+    if not params:
+        return None
+    return [
+        (key, value if isinstance(value, str) else str(value))
+        for key, value in params if value is not None
+    ]
+
+
+class AsyncSingleFlight(SingleFlight):
+    async def do(self, key, function):
+        """ Await function(), unless a call for the same key is already
+        in flight, in which case await its result instead. A caller
+        being cancelled does not cancel the call shared with others.
+
+        :Args:
+        key - The key identical calls share
+        function - The coroutine function to be called without
+            arguments
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = self._calls[key] = ensure_future(function())
+                future.add_done_callback(
+                    lambda done: self._finish(key, done)
+                )
+                self._sent += 1
+            else:
+                self._shared += 1
+        try:
+            return await wait_for(shield(future), remaining())
+        except TimeoutError:
+            if future.done():
+                raise
+            raise deadline_exceeded()
+
+    def _finish(self, key, future):
+        with self._lock:
+            del self._calls[key]
+        if not future.cancelled():
+            # The result may have no callers left to retrieve it
+            future.exception()
+
+
+class AsyncSession(Session):
+    single_flight = AsyncSingleFlight
+
+    async def send(self, request):
+        """
+        Send a request to EazyCustomerManager, and await the response.
+        See Session.send.
+
+        :Required args:
+        - request - The Request to be sent to EazyCustomerManager
+
+        :Example:
+        await send(Request('GET', 'customers'))
+
+        :Returns:
+        request JSON objects
+        """
+        if request.method != 'GET':
+            try:
+                return await self._send(request)
+            finally:
+                self.cache.invalidate(request)
+        key = self.request_key(request)
+        response = self.cache.get(request, key)
+        if response is not None:
+            return response
+        generation = self.cache.generation
+        if not s.coalescing['enabled']:
+            return await self._fetch(request, key, generation)
+        return await self.flights.do(
+            key, lambda: self._fetch(request, key, generation)
+        )
+
+    async def _fetch(self, request, key, generation):
+        response = await self._send(request)
+        self.cache.put(request, key, response, generation)
+        return response
+
+    async def _send(self, request):
+        response, status, attempt, started = await self._exchange(request)
+        if response.text:
+            response_json = describe_request(
+                Response(response.text, getattr(response, 'content', None)),
+                request, started,
+            )
+            response_json.status_code = status
+            response_json.attempts = attempt
+            return response_json
+        return {}
+
+    async def _exchange(self, request, **kwargs):
+        # See Session._exchange
+        from aiohttp import ClientConnectorError, ClientError
+        request_url, headers = self.prepare(request)
+        started = monotonic()
+        attempt = 1
+        while True:
+            status = retry_after = error = None
+            self.circuit_breaker.allow(request.family)
+            try:
+                wait = self.rate_limiter.reserve(request.family)
+                while wait:
+                    await sleep(wait)
+                    wait = self.rate_limiter.reserve(request.family)
+                timeouts = request_timeout()
+            except BaseException:
+                self.circuit_breaker.release(request.family)
+                raise
+            try:
+                response = await self.transport.request(
+                    request.method,
+                    request_url,
+                    params=request.params,
+                    headers=headers,
+                    timeout=timeouts,
+                    deadline=remaining(),
+                    **kwargs
+                )
+            except TimeoutError:
+                error = RequestTimeoutError(
+                    'EazyCustomerManager did not respond to %s %s in time.'
+                    % (request.method, request.endpoint)
+                )
+                sent = True
+            except ClientConnectorError as e:
+                # The connection could not be established
+                error = e
+                sent = False
+            except ClientError as e:
+                error = e
+                sent = True
+            except BaseException:
+                self.circuit_breaker.release(request.family)
+                raise
+            else:
+                status = response.status_code
+            self.circuit_breaker.record(request.family, status)
+            if error is None:
+                if status not in self.retry_policy.statuses:
+                    break
+                retry_after = response.headers.get('Retry-After')
+                sent = True
+
+            delay = self.retry_policy.delay(
+                request, attempt, status, retry_after, sent
+            )
+            if delay is None:
+                if error is not None:
+                    raise describe_request(error, request, started)
+                break
+            if error is None:
+                release_response(response)
+            await sleep(delay)
+            attempt += 1
+        return response, status, attempt, started
+
+    async def stream(self, request, key, chunk_size=65536):
+        """
+        Send a GET request to EazyCustomerManager, and yield the records
+        of an array in the response as the body arrives. See
+        Session.stream.
+
+        :Example:
+        async for customer in stream(Request('GET', 'customer'),
+                                     'Customers'):
+            print(customer['Id'])
+        """
+        response, status, attempt, started = await self._exchange(
+            request, stream=True
+        )
+        try:
+            if not 200 <= status < 300:
+                raise_for_response(
+                    await _text(response), status, attempt, request, started
+                )
+            async for record in aiter_array(
+                    _async_chunks(response, chunk_size), key):
+                yield record
+        finally:
+            release_response(response)
+
+    async def raw(self, request):
+        """
+        Send a request to EazyCustomerManager, and return the body of
+        the response as the bytes received. See Session.raw.
+
+        :Example:
+        await raw(Request('GET', 'customer'))
+        """
+        try:
+            response, status, attempt, started = await self._exchange(
+                request, stream=True
+            )
+        finally:
+            if request.method != 'GET':
+                self.cache.invalidate(request)
+        try:
+            if not 200 <= status < 300:
+                raise_for_response(
+                    await _text(response), status, attempt, request, started
+                )
+            if hasattr(response, 'read'):
+                content = await response.read()
+            else:
+                content = response_content(response)
+        finally:
+            release_response(response)
+        raw = describe_request(RawResponse(
+            content, status, response.headers,
+        ), request, started)
+        raw.attempts = attempt
+        return raw
+
+
+async def _text(response):
+    # Read the body of a streamed response, or of a transport which
+    # does not stream
+    if hasattr(response, 'read_text'):
+        return await response.read_text()
+    return response.text
+
+
+async def _async_chunks(response, chunk_size):
+    # Read a streamed response a chunk at a time, or all at once from a
+    # transport which does not stream
+    if hasattr(response, 'iter_chunks'):
+        async for chunk in response.iter_chunks(chunk_size):
+            yield chunk
+    else:
+        yield response.text
+
+
+def coroutine(method, blocking=False):
+    """
+    Mirror a request method of the EazySDK as a coroutine. The method's
+    validation and response handling are shared, only the requests it
+    yields are awaited rather than blocking.
+
+    :Args:
+    method - The request method of the EazySDK
+    blocking - The method's validation may block, such as by fetching
+        the schedules or the bank holidays, so it is run in a thread
+        rather than in the event loop
+    """
+    steps = method.steps
+
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        # The deadline covers the validation and every request of a call
+        with call_deadline():
+            generator = steps(self, *args, **kwargs)
+            response = None
+            try:
+                if blocking:
+                    request, stop = await get_running_loop().run_in_executor(
+                        None, copy_context().run, _advance, generator,
+                    )
+                    if stop is not None:
+                        raise stop
+                else:
+                    request = generator.send(None)
+                while True:
+                    response = await self.sdk.send(request)
+                    request = generator.send(response)
+            except StopIteration as e:
+                return check_common_exceptions(e.value)
+            except EazySDKException as e:
+                raise describe_error(e, response)
+    return wrapper
+
+
+def _advance(generator):
+    # Run a request method to its first request, returning the request,
+    # or the StopIteration holding its result, which cannot be raised
+    # through a future
+    try:
+        return generator.send(None), None
+    except StopIteration as e:
+        return None, e
+
+
+class AsyncGet(Get):
+    def __init__(self, session):
+        """
+        A collection of GET requests made to the ECM3 API, awaited
+        """
+        self.sdk = session
+
+    callback_url = coroutine(Get.callback_url)
+    customers = coroutine(Get.customers)
+    contracts = coroutine(Get.contracts)
+    payments = coroutine(Get.payments)
+    payments_single = coroutine(Get.payments_single)
+    schedules = coroutine(Get.schedules)
+
+    async def iter_customers(self, search_from, search_to='', workers=4,
+                             windows=None, max_customers=1000,
+                             window_seconds=30, **criteria):
+        """
+        Search for the customers added between two dates, searching
+        windows of the dates concurrently. See Get.iter_customers.
+
+        :Example:
+        async for customer in iter_customers('2019-01-01'):
+            print(customer['Id'])
+        """
+        pending = deque(customer_windows(
+            search_from, search_to, windows or workers * 4
+        ))
+        seen = set()
+        running = {}
+        try:
+            while pending or running:
+                while pending and len(running) < workers:
+                    window = pending.popleft()
+                    running[ensure_future(self._customer_window(
+                        window, window_seconds, criteria
+                    ))] = window
+                done = (await wait(running, return_when=FIRST_COMPLETED))[0]
+                for task in done:
+                    window = running.pop(task)
+                    try:
+                        customers = task.result()
+                    except (RequestTimeoutError, ServerError):
+                        halves = bisect_window(window)
+                        if halves is None:
+                            raise
+                        pending.extendleft(reversed(halves))
+                        continue
+                    if len(customers) >= max_customers:
+                        pending = split_windows(pending)
+                    for customer in customers:
+                        if customer['Id'] not in seen:
+                            seen.add(customer['Id'])
+                            yield customer
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def _customer_window(self, window, seconds, criteria):
+        with timeout(deadline=seconds):
+            return customer_records(await self.customers(
+                search_from=str(window[0]), search_to=str(window[1]),
+                **criteria
+            ))
+
+    async def iter_payments(self, contracts, prefetch=1):
+        """
+        Iterate over at most 100 payments of each of one or more
+        contracts, fetching the payments of the next contracts while the
+        payments of a contract are being read. This does not page. See
+        Get.iter_payments.
+
+        :Example:
+        async for payment in iter_payments(contracts):
+            print(payment['Amount'])
+        """
+        if isinstance(contracts, str):
+            contracts = [contracts]
+        contracts = iter(contracts)
+        pending = deque()
+        try:
+            while True:
+                while len(pending) <= prefetch:
+                    contract = next(contracts, None)
+                    if contract is None:
+                        break
+                    pending.append((contract, ensure_future(
+                        self.payments(contract, max_payment_rows)
+                    )))
+                if not pending:
+                    return
+                contract, task = pending.popleft()
+                payments = payment_records(await task)
+                for payment in check_payment_rows(contract, payments):
+                    yield payment
+        finally:
+            for contract, task in pending:
+                task.cancel()
+
+
+class AsyncPost(Post):
+    def __init__(self, session):
+        """
+        A collection of POST requests made to the ECM3 API, awaited
+        """
+        self.sdk = session
+
+    callback_url = coroutine(Post.callback_url)
+    customer = coroutine(Post.customer)
+    validated_customer = coroutine(Post.validated_customer)
+    contract = coroutine(Post.contract, blocking=True)
+    validated_contract = coroutine(Post.validated_contract)
+    cancel_direct_debit = coroutine(Post.cancel_direct_debit)
+    archive_contract = coroutine(Post.archive_contract)
+    reactivate_direct_debit = coroutine(Post.reactivate_direct_debit)
+    restart_contract = coroutine(Post.restart_contract)
+    payment = coroutine(Post.payment, blocking=True)
+
+    def bulk_customers(self, rows, workers=4, checkpoint=None):
+        """
+        Create many customers in ECM3, yielding the result of each row as
+        soon as it is known. See Post.bulk_customers.
+
+        :Example:
+        async for result in bulk_customers('customers.csv'):
+            print(result.key, result.id or result.error)
+        """
+        async def submit(parameters):
+            return created_id(
+                await self.validated_customer(parameters), 'Customer'
+            )
+        return async_pipeline(
+            rows, customer_parameters, submit, customer_key, workers,
+            checkpoint,
+        )
+
+    def bulk_contracts(self, rows, workers=4, checkpoint=None, as_of=None):
+        """
+        Create many contracts in ECM3, yielding the result of each row as
+        soon as it is known. See Post.bulk_contracts.
+
+        :Example:
+        async for result in bulk_contracts('contracts.csv'):
+            print(result.key, result.id or result.error)
+        """
+        context = ContractContext(as_of)
+
+        async def submit(item):
+            return created_id(
+                await self.validated_contract(*item), 'Contract'
+            )
+        return async_pipeline(
+            rows, lambda row: contract_row(row, context), submit,
+            contract_key, workers, checkpoint, prepare=context.resolve,
+        )
+
+
+class AsyncPatch(Patch):
+    def __init__(self, session):
+        """
+        A collection of PATCH requests made to the EazyCustomerManager
+        API, awaited
+        """
+        self.sdk = session
+
+    customer = coroutine(Patch.customer)
+    contract_amount = coroutine(Patch.contract_amount)
+    contract_day_weekly = coroutine(Patch.contract_day_weekly)
+    contract_date_monthly = coroutine(Patch.contract_date_monthly)
+    contract_date_annually = coroutine(Patch.contract_date_annually)
+    payment = coroutine(Patch.payment, blocking=True)
+
+
+class AsyncDelete(Delete):
+    def __init__(self, session):
+        """
+        A collection of DELETE requests made to the EazyCustomerManager
+        API, awaited
+        """
+        self.sdk = session
+
+    callback_url = coroutine(Delete.callback_url)
+    payment = coroutine(Delete.payment)
+
+
+class AsyncEazySDK:
+    """
+    Creates a new instance of the EazySDK whose calls are awaited
+
+    :Example:
+    async with AsyncEazySDK() as client:
+        await client.get.customers(surname='Test')
+    """
+    def __init__(self, concurrency=None):
+        self.settings = Settings()
+        # A single transport bounds the concurrency of every call
+        self.transport = AsyncTransport(concurrency)
+        self.session = AsyncSession(self.transport)
+        self.get = AsyncGet(self.session)
+        self.post = AsyncPost(self.session)
+        self.patch = AsyncPatch(self.session)
+        self.delete = AsyncDelete(self.session)
+
+    def timeout(self, connect=None, read=None, deadline=None):
+        """
+        Override the timeouts of every call awaited inside the block.
+        See EazySDK.timeout.
+        """
+        return timeout(connect, read, deadline)
+
+    def retry_stats(self):
+        """
+        Return the number of retries made by this instance of the
+        AsyncEazySDK. See EazySDK.retry_stats.
+        """
+        return self.session.retry_policy.stats()
+
+    def circuit_stats(self):
+        """
+        Return the state of every circuit of this instance of the
+        AsyncEazySDK. See EazySDK.circuit_stats.
+        """
+        return self.session.circuit_breaker.stats()
+
+    def coalescing_stats(self):
+        """
+        Return the number of GET requests coalesced by this instance of
+        the AsyncEazySDK. See EazySDK.coalescing_stats.
+        """
+        return self.session.flights.stats()
+
+    def cache_stats(self):
+        """
+        Return the usage of the response cache of this instance of the
+        AsyncEazySDK. See EazySDK.cache_stats.
+        """
+        return self.session.cache.stats()
+
+    async def close(self):
+        """
+        Close every connection held by this instance of the
+        AsyncEazySDK
+        """
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
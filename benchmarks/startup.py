@@ -0,0 +1,93 @@
+"""
+eazysdk.benchmarks.startup
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module benchmarks the cold start of the EazySDK: the time taken to
+import eazysdk, and to construct an EazySDK, each measured in a fresh
+interpreter. It also reports whether either step imported requests,
+which should only happen once the first request is made.
+
+Run it with python -m eazysdk.benchmarks.startup
+
+The import is also timed by the startup.import benchmark of
+eazysdk.benchmarks.suite, which compares it with a baseline.
+"""
+from statistics import median
+import json
+import os
+import subprocess
+import sys
+
+# Run in a fresh interpreter, printing its measurements as JSON
+_probe = '''
+import json, sys
+from time import perf_counter
+start = perf_counter()
+import eazysdk
+imported = perf_counter()
+client = eazysdk.EazySDK()
+constructed = perf_counter()
+print(json.dumps({
+    'import_seconds': imported - start,
+    'construct_seconds': constructed - imported,
+    'requests_imported': 'requests' in sys.modules,
+}))
+'''
+
+
+def _environment():
+    # The environment of a fresh interpreter importing this copy of
+    # eazysdk
+    package = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(package)]
+        + [p for p in [environment.get('PYTHONPATH')] if p]
+    )
+    return environment
+
+
+def measure():
+    """ Import eazysdk and construct an EazySDK in a fresh interpreter.
+
+    :Returns:
+    {'import_seconds': 0.004, 'construct_seconds': 0.0001,
+     'requests_imported': False}
+    """
+    output = subprocess.run(
+        [sys.executable, '-c', _probe], env=_environment(), check=True,
+        stdout=subprocess.PIPE, universal_newlines=True,
+    ).stdout
+    return json.loads(output)
+
+
+def import_fresh():
+    """ Start a fresh interpreter which imports eazysdk and exits. This
+    is timed by eazysdk.benchmarks.suite, so a slower import is caught
+    by its comparison with a baseline.
+    """
+    subprocess.run([sys.executable, '-c', 'import eazysdk'],
+                   env=_environment(), check=True)
+
+
+def run(repeat=5):
+    """ Measure the cold start of the EazySDK a number of times.
+
+    :Args:
+    repeat - The number of fresh interpreters measured
+
+    :Returns:
+    {'import_seconds': 0.004, 'construct_seconds': 0.0001,
+     'requests_imported': False, 'repeat': 5}
+    """
+    runs = [measure() for i in range(repeat)]
+    return {
+        'import_seconds': median(r['import_seconds'] for r in runs),
+        'construct_seconds': median(r['construct_seconds'] for r in runs),
+        'requests_imported': any(r['requests_imported'] for r in runs),
+        'repeat': repeat,
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,383 @@
+"""
+eazysdk.benchmarks.suite
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module benchmarks the hot paths of the EazySDK against the
+in-process stand-in server in eazysdk.fakeserver, so no request is sent
+to EazyCollect. Results are written as JSON, and can be compared with
+the results of an earlier release to find regressions before it is
+deployed.
+
+Run it with
+
+    python -m eazysdk.benchmarks.suite --output new.json
+    python -m eazysdk.benchmarks.suite --compare old.json
+
+The exit status is 1 if any benchmark is slower than the baseline by
+more than the threshold.
+"""
+from argparse import ArgumentParser
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from statistics import mean
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import json
+import platform
+import sys
+
+# The shortest time a round of a benchmark is run for
+min_round_seconds = 0.05
+
+
+@contextmanager
+def offline():
+    """ Point the EazySDK at a stand-in server for the duration of the
+    block, with its schedules and bank holidays kept in a temporary
+    cache directory. The settings are restored afterwards.
+
+    :Returns:
+    The running FakeECM3
+    """
+    from ..fakeserver import FakeECM3
+    from ..settings import Settings as s
+    from ..utils.schedules import registry
+    saved = {
+        name: dict(getattr(s, name))
+        for name in ('current_environment', 'sandbox_client_details',
+                     'other', 'cache')
+    }
+    try:
+        with TemporaryDirectory() as directory, FakeECM3(
+            bank_holidays=[str(date(date.today().year + 1, 1, 1))], seed=1,
+        ) as ecm3:
+            s.current_environment['env'] = 'sandbox'
+            s.sandbox_client_details['client_code'] = 'BENCH'
+            s.sandbox_client_details['api_key'] = 'bench'
+            s.other['cache_directory'] = directory
+            s.other['base_url'] = ecm3.base_url
+            s.other['bank_holidays_url'] = ecm3.bank_holidays_url
+            s.cache['enabled'] = False
+            registry.clear()
+            yield ecm3
+    finally:
+        for name, values in saved.items():
+            getattr(s, name).clear()
+            getattr(s, name).update(values)
+        registry.clear()
+
+
+def _in_process(ecm3):
+    # An EazySDK answered by the stand-in server without sockets
+    from ..main import EazySDK
+    from ..fakeserver import FakeTransport
+    client = EazySDK()
+    client.session.transport = FakeTransport(ecm3)
+    return client
+
+
+def session_send_in_process(ecm3):
+    from ..session import Request
+    client = _in_process(ecm3)
+    # The schedules are the cheapest route of the stand-in server to
+    # answer, so the time is spent in the session
+    request = Request('GET', 'schedules')
+    return lambda: client.session.send(request)
+
+
+def session_send_http(ecm3):
+    from ..main import EazySDK
+    from ..session import Request
+    client = EazySDK()
+    request = Request('GET', 'schedules')
+    return lambda: client.session.send(request)
+
+
+def common_exceptions_large_body(ecm3):
+    from ..exceptions import common_exceptions_decorator
+    body = ecm3.respond('GET', 'customer').text
+    wrapped = common_exceptions_decorator(lambda self: body)
+    return lambda: wrapped(None)
+
+
+def parse_large_body(ecm3):
+    from ..codec import loads
+    body = ecm3.respond('GET', 'customer').text.encode('utf-8')
+    return lambda: loads(body)
+
+
+class _Received(namedtuple('_Received', 'status_code headers content')):
+    # A response as received by requests, whose text is decoded from
+    # its body whenever it is read
+    __slots__ = ()
+    encoding = 'utf-8'
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding)
+
+
+class _Replay:
+    # A transport answering every request with the same response, so
+    # the time is spent in the session and in parsing the response
+    def __init__(self, response):
+        self.response = _Received(
+            response.status_code, response.headers,
+            response.text.encode('utf-8'),
+        )
+
+    def request(self, *args, **kwargs):
+        return self.response
+
+
+def session_send_parse(name):
+    # Send a customer search and parse its response with the named JSON
+    # backend, as the request methods do
+    def benchmark(ecm3):
+        from ..codec import backend
+        from ..codec import loads
+        from ..session import Request
+        from ..settings import Settings as s
+        saved = s.other['json_backend']
+        s.other['json_backend'] = name
+        try:
+            # Raises ImportError if the backend is not installed
+            backend()
+        finally:
+            s.other['json_backend'] = saved
+        client = _in_process(ecm3)
+        client.session.transport = _Replay(ecm3.respond('GET', 'customer'))
+        request = Request('GET', 'customer')
+
+        def operation():
+            s.other['json_backend'] = name
+            try:
+                return loads(client.session.send(request))
+            finally:
+                s.other['json_backend'] = saved
+        return operation
+    return benchmark
+
+
+def customer_checks(ecm3):
+    from ..utils import customer_checks
+
+    def check():
+        customer_checks.check_postcode_is_valid_uk_format('GL52 2NF')
+        customer_checks.check_email_address_format('test@example.com')
+        customer_checks.check_bank_details_format(
+            '12345678', '123456', 'MR TEST TEST'
+        )
+    return check
+
+
+def contract_checks(ecm3):
+    from ..utils import contract_checks
+    start = str(date.today() + timedelta(days=60))
+
+    def check():
+        contract_checks.check_schedule_name('Monthly Free')
+        contract_checks.check_termination_type('Until further notice')
+        contract_checks.check_at_the_end('Switch to further notice')
+        contract_checks.check_payment_day_in_month(15)
+        contract_checks.check_start_date(start)
+    return check
+
+
+def payment_checks(ecm3):
+    from ..utils import payment_checks
+    collection = str(date.today() + timedelta(days=60))
+
+    def check():
+        payment_checks.check_collection_amount('10.00')
+        payment_checks.check_collection_date(collection)
+    return check
+
+
+def working_days_in_future(ecm3):
+    from ..utils.working_days import check_working_days_in_future
+    return lambda: check_working_days_in_future(10)
+
+
+def schedule_lookup(ecm3):
+    from ..utils.schedules import registry
+    return lambda: registry.lookup('Monthly Free')
+
+
+def post_contract(ecm3):
+    client = _in_process(ecm3)
+    customer = next(iter(ecm3.customers))
+    start = str(date.today() + timedelta(days=60))
+    return lambda: client.post.contract(
+        customer, 'Ad-Hoc Free', start, False, 'Until further notice',
+        'Switch to further notice',
+    )
+
+
+def startup_import(ecm3):
+    # The time taken by a fresh interpreter to start and import eazysdk
+    from .startup import import_fresh
+    return import_fresh
+
+
+# The benchmarks of the suite, each a function taking the running
+# FakeECM3 and returning the operation to be timed
+benchmarks = {
+    'session.send.in_process': session_send_in_process,
+    'session.send.http': session_send_http,
+    'exceptions.large_body': common_exceptions_large_body,
+    'codec.large_body': parse_large_body,
+    'session.send.parse.json': session_send_parse('json'),
+    'session.send.parse.orjson': session_send_parse('orjson'),
+    'customer_checks': customer_checks,
+    'contract_checks': contract_checks,
+    'payment_checks': payment_checks,
+    'working_days.in_future': working_days_in_future,
+    'schedules.lookup': schedule_lookup,
+    'post.contract': post_contract,
+    'startup.import': startup_import,
+}
+
+
+def measure(operation, rounds=5):
+    """ Time an operation, running it enough times in each round for
+    the round to take at least min_round_seconds.
+
+    :Args:
+    operation - The function to be timed
+    rounds - The number of rounds timed
+
+    :Returns:
+    {'median': 1e-05, 'min': 9e-06, 'mean': 1.1e-05, 'number': 5000,
+     'rounds': 5}, in seconds per operation
+    """
+    # Run once to warm up caches, then find the number of operations
+    # in a round
+    operation()
+    number = 1
+    while True:
+        elapsed = _time(operation, number)
+        if elapsed >= min_round_seconds or number >= 10 ** 7:
+            break
+        number *= 10 if elapsed < min_round_seconds / 10 else 2
+    times = [elapsed / number] + [
+        _time(operation, number) / number for i in range(rounds - 1)
+    ]
+    return {
+        'median': median(times),
+        'min': min(times),
+        'mean': mean(times),
+        'number': number,
+        'rounds': rounds,
+    }
+
+
+def _time(operation, number):
+    start = perf_counter()
+    for i in range(number):
+        operation()
+    return perf_counter() - start
+
+
+def run(names=None, rounds=5, customers=1000):
+    """ Run the benchmarks of the suite against a stand-in server.
+
+    :Args:
+    names - The names of the benchmarks run. By default, every
+        benchmark is run
+    rounds - The number of rounds each benchmark is timed for
+    customers - The number of customers held by the stand-in server
+
+    :Returns:
+    {'version': '1.2.0', 'python': '3.11.7', 'created': '...',
+     'results': {'schedules.lookup': {'median': 1e-06, ...}}}
+    """
+    from ..__version__ import __version__
+    results = {}
+    with offline() as ecm3:
+        ecm3.populate(customers=customers, contracts=1)
+        for name, benchmark in benchmarks.items():
+            if names and name not in names:
+                continue
+            try:
+                operation = benchmark(ecm3)
+            except ImportError:
+                # An optional dependency of the benchmark is missing
+                continue
+            results[name] = measure(operation, rounds)
+    return {
+        'version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': datetime.now().isoformat(),
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.1):
+    """ Compare the median of each benchmark with a baseline.
+
+    :Args:
+    baseline - The results of an earlier run
+    current - The results of this run
+    threshold - The share a benchmark may slow down by before it is
+        counted as a regression
+
+    :Returns:
+    A list of {'name', 'baseline', 'current', 'change', 'regressed'},
+    where change is the relative change of the median
+    """
+    comparison = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        change = result['median'] / before['median'] - 1
+        comparison.append({
+            'name': name,
+            'baseline': before['median'],
+            'current': result['median'],
+            'change': change,
+            'regressed': change > threshold,
+        })
+    return comparison
+
+
+def main(arguments=None):
+    parser = ArgumentParser(prog='python -m eazysdk.benchmarks.suite')
+    parser.add_argument('--output', help='write the results to a file')
+    parser.add_argument('--compare', help='results of an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='the slow-down counted as a regression')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--only', action='append', metavar='NAME',
+                        choices=sorted(benchmarks),
+                        help='run only the named benchmark')
+    arguments = parser.parse_args(arguments)
+
+    results = run(arguments.only, arguments.rounds)
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if not arguments.compare:
+        return 0
+
+    with open(arguments.compare) as file:
+        baseline = json.load(file)
+    comparison = compare(baseline, results, arguments.threshold)
+    for row in comparison:
+        print('%-26s %12.3fus %12.3fus %+8.1f%%%s' % (
+            row['name'], row['baseline'] * 1e6, row['current'] * 1e6,
+            row['change'] * 100, '  REGRESSED' if row['regressed'] else '',
+        ), file=sys.stderr)
+    return 1 if any(row['regressed'] for row in comparison) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
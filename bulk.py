@@ -0,0 +1,350 @@
+"""
+eazysdk.bulk
+~~~~~~~~~~~~
+
+This module contains the pipeline behind the bulk calls of the EazySDK,
+such as Post.bulk_customers. Rows are validated as a separate stage,
+submitted concurrently through a bounded pool of workers, and a result
+is returned for every row as soon as it is known. Rows which succeeded
+are recorded in an optional checkpoint file, so an interrupted run can
+be started again without submitting them twice.
+"""
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from contextvars import copy_context
+from threading import Lock
+from requests.exceptions import RequestException
+from .codec import loads
+from .exceptions import EazySDKException
+from .exceptions import InvalidParameterError
+from .exceptions import describe_error
+from .exceptions import error_message
+import csv
+import os
+
+
+class RowResult(namedtuple('RowResult', 'row key id error resumed')):
+    """
+    The result of a row of a bulk call
+
+    :Fields:
+    - row - The number of the row in the input, from 0
+    - key - The key of the row, such as its customer reference
+    - id - The GUID of the record created for the row, or None
+    - error - The EazySDKException the row failed with, or None
+    - resumed - True if the row succeeded in an earlier run, and was
+        read from the checkpoint rather than submitted
+    """
+    __slots__ = ()
+
+    def __new__(cls, row, key, id=None, error=None, resumed=False):
+        return super(RowResult, cls).__new__(
+            cls, row, key, id, error, resumed
+        )
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class Checkpoint:
+    def __init__(self, path):
+        """
+        A file recording the key and GUID of every row which succeeded,
+        one row per line. Rows are appended as they succeed, so the file
+        is complete up to the moment a run was interrupted.
+
+        :Required args:
+        - path - The path of the checkpoint file, which is created if it
+            does not exist
+
+        :Example:
+        checkpoint = Checkpoint('onboarding.checkpoint')
+        if 'CUST-0001' in checkpoint:
+            print(checkpoint['CUST-0001'])
+        """
+        self.path = os.fspath(path)
+        self._lock = Lock()
+        self._done = {}
+        try:
+            with open(self.path, newline='', encoding='utf-8') as file:
+                text = file.read()
+        except FileNotFoundError:
+            text = ''
+        # A line cut short by an interruption is not a complete record,
+        # and is cut from the file before more rows are appended
+        complete = text[:text.rfind('\n') + 1]
+        if complete != text:
+            os.truncate(self.path, len(complete.encode('utf-8')))
+        for record in csv.reader(complete.splitlines(True)):
+            if len(record) == 2:
+                self._done[record[0]] = record[1]
+        self._file = open(self.path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file, lineterminator='\n')
+
+    def __contains__(self, key):
+        return key in self._done
+
+    def __getitem__(self, key):
+        return self._done[key]
+
+    def __len__(self):
+        return len(self._done)
+
+    def snapshot(self):
+        """ Return the keys and GUIDs of the rows recorded so far. A run
+        resumes from the rows recorded before it started, rather than
+        from the rows it records itself.
+        """
+        with self._lock:
+            return dict(self._done)
+
+    def record(self, key, id):
+        """ Record that the row with the given key succeeded, and the
+        GUID of the record created for it.
+        """
+        with self._lock:
+            self._done[key] = id
+            self._writer.writerow((key, id))
+            self._file.flush()
+
+    def close(self):
+        """ Close the checkpoint file.
+        """
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_rows(file, encoding='utf-8-sig'):
+    """ Yield the rows of a CSV file with a header line as dictionaries,
+    with missing values read as empty strings.
+
+    :Args:
+    file - The path of the CSV file, or a file opened as text
+    encoding - The encoding of a file given by path
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, newline='', encoding=encoding) as opened:
+            yield from read_rows(opened)
+        return
+    for row in csv.DictReader(file):
+        yield {
+            name: '' if value is None else value
+            for name, value in row.items()
+        }
+
+
+def rows_of(rows):
+    """ Return the rows of a bulk call given as an iterable of
+    dictionaries, or as the path of a CSV file.
+    """
+    if isinstance(rows, (str, os.PathLike)):
+        return read_rows(rows)
+    return rows
+
+
+def created_id(response, entity):
+    """ Return the GUID of the record created by a POST request, or
+    raise an EazySDKException with the message of the response.
+
+    :Args:
+    response - The response of the POST request
+    entity - The key of the record in the response, such as 'Customer'
+    """
+    try:
+        return loads(response)[entity]['Id']
+    except (TypeError, ValueError, KeyError):
+        raise describe_error(
+            EazySDKException(error_message(response)), response
+        )
+
+
+# The errors a submitted row may fail with, which are returned in its
+# result rather than stopping the run
+submission_errors = (EazySDKException, RequestException)
+
+
+def _async_submission_errors():
+    # The errors a row submitted by an async run may fail with, which
+    # include those of aiohttp when it is installed
+    from asyncio import TimeoutError as AsyncTimeoutError
+    try:
+        from aiohttp import ClientError
+    except ImportError:
+        return submission_errors + (AsyncTimeoutError,)
+    return submission_errors + (ClientError, AsyncTimeoutError)
+
+
+def _validated(rows, validate, key, checkpoint):
+    # The validation stage, yielding (row, key, parameters) for each
+    # row to be submitted, or the result of a row which is not
+    done = {} if checkpoint is None else checkpoint.snapshot()
+    # The row each key was first resumed or submitted by in this run
+    seen = {}
+    for number, row in enumerate(rows):
+        row_key = key(row, number)
+        if row_key in done and row_key not in seen:
+            seen[row_key] = number
+            yield RowResult(number, row_key, done[row_key], resumed=True)
+            continue
+        try:
+            parameters = validate(row)
+            if row_key in seen:
+                raise InvalidParameterError(
+                    'The key %s of this row is the same as the key of row'
+                    ' %d, so it was not submitted.'
+                    % (row_key, seen[row_key])
+                )
+        except EazySDKException as e:
+            yield RowResult(number, row_key, error=e)
+            continue
+        seen[row_key] = number
+        yield number, row_key, parameters
+
+
+def _submit(submit, parameters, row_key, checkpoint):
+    # Submit a row in a worker, recording it in the checkpoint as soon
+    # as it succeeds, even if its result is never read
+    id = submit(parameters)
+    if checkpoint is not None:
+        checkpoint.record(row_key, id)
+    return id
+
+
+async def _async_submit(submit, parameters, row_key, checkpoint):
+    id = await submit(parameters)
+    if checkpoint is not None:
+        checkpoint.record(row_key, id)
+    return id
+
+
+def _finished(number, row_key, result, errors=submission_errors):
+    # The result of a submitted row
+    try:
+        return RowResult(number, row_key, result())
+    except errors as e:
+        return RowResult(number, row_key, error=e)
+
+
+def pipeline(rows, validate, submit, key, workers=4, checkpoint=None):
+    """ Validate and submit rows, yielding the RowResult of every row as
+    soon as it is known. At most workers rows are submitted at once, and
+    rows are only read as workers become free. If the results stop
+    being read, the rows already being submitted are waited for, so
+    every row which succeeded is in the checkpoint.
+
+    :Args:
+    rows - An iterable of rows, or the path of a CSV file
+    validate - A function returning the parameters of a row, or raising
+        an EazySDKException if the row is not valid
+    submit - A function submitting the parameters of a row, and
+        returning the GUID of the record created
+    key - A function returning the key of a row in the checkpoint,
+        given the row and its number in the input
+    workers - The number of rows submitted at once
+    checkpoint - The path of a checkpoint file, or a Checkpoint
+    """
+    checkpoint, opened = _checkpoint(checkpoint)
+    pool = ThreadPoolExecutor(workers)
+    running = {}
+    try:
+        for item in _validated(rows_of(rows), validate, key, checkpoint):
+            if isinstance(item, RowResult):
+                yield item
+                continue
+            while len(running) >= workers:
+                yield from _completed(running)
+            number, row_key, parameters = item
+            # The worker keeps the deadline and timeouts of the caller
+            running[pool.submit(
+                copy_context().run, _submit, submit, parameters, row_key,
+                checkpoint,
+            )] = number, row_key
+        while running:
+            yield from _completed(running)
+    finally:
+        for future in running:
+            future.cancel()
+        pool.shutdown()
+        if opened:
+            checkpoint.close()
+
+
+def _completed(running):
+    done = wait(running, return_when=FIRST_COMPLETED)[0]
+    for future in done:
+        number, row_key = running.pop(future)
+        yield _finished(number, row_key, future.result)
+
+
+async def async_pipeline(rows, validate, submit, key, workers=4,
+                         checkpoint=None, prepare=None):
+    """ Validate and submit rows, yielding the RowResult of every row as
+    soon as it is known. See pipeline, where submit is a coroutine
+    function.
+
+    :Args:
+    prepare - A function run in a thread before the first row is
+        validated, which fetches anything validation needs, so that
+        validating rows does not block the event loop
+    """
+    # asyncio is imported here, so synchronous runs do not import it
+    from asyncio import ensure_future
+    from asyncio import get_running_loop
+    from asyncio import wait as async_wait
+    checkpoint, opened = _checkpoint(checkpoint)
+    running = {}
+    errors = _async_submission_errors()
+    try:
+        if prepare is not None:
+            await get_running_loop().run_in_executor(
+                None, copy_context().run, prepare,
+            )
+        for item in _validated(rows_of(rows), validate, key, checkpoint):
+            if isinstance(item, RowResult):
+                yield item
+                continue
+            while len(running) >= workers:
+                for result in await _async_completed(running, errors):
+                    yield result
+            number, row_key, parameters = item
+            running[ensure_future(_async_submit(
+                submit, parameters, row_key, checkpoint,
+            ))] = number, row_key
+        while running:
+            for result in await _async_completed(running, errors):
+                yield result
+    finally:
+        if running:
+            await async_wait(running)
+            for task in running:
+                # Read, so an error is not reported as never retrieved
+                task.exception()
+        if opened:
+            checkpoint.close()
+
+
+async def _async_completed(running, errors):
+    from asyncio import FIRST_COMPLETED as ASYNC_FIRST_COMPLETED
+    from asyncio import wait as async_wait
+    done = (await async_wait(running, return_when=ASYNC_FIRST_COMPLETED))[0]
+    results = []
+    for task in done:
+        number, row_key = running.pop(task)
+        results.append(_finished(number, row_key, task.result, errors))
+    return results
+
+
+def _checkpoint(checkpoint):
+    # Return the Checkpoint to use, and whether it was opened here
+    if checkpoint is None or isinstance(checkpoint, Checkpoint):
+        return checkpoint, False
+    return Checkpoint(checkpoint), True
@@ -0,0 +1,200 @@
+"""
+eazysdk.cache
+~~~~~~~~~~~~~
+
+This module contains the response cache used by the EazySDK sessions.
+Responses to customer, contract and payment GET requests are kept for a
+time to live set for each family of endpoints, and the least recently
+used responses are evicted once the cache is full. Writes sent through
+the session invalidate the customers and contracts they touch.
+"""
+from collections import OrderedDict
+from .codec import loads
+from threading import Lock
+from time import monotonic
+from .settings import Settings as s
+
+# The responses of searches which found nothing
+_empty_responses = frozenset((
+    '{"Customers":[]}',
+    '{"Contracts":[]}',
+    '{"Payments":[]}',
+))
+
+
+class _Entry:
+    __slots__ = ('response', 'size', 'expires_at', 'tags')
+
+    def __init__(self, response, size, expires_at, tags):
+        self.response = response
+        self.size = size
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+def _ids(response, collection):
+    # The Id of every record in a collection returned by a search
+    try:
+        return [record['Id'] for record in loads(response)[collection]]
+    except (ValueError, KeyError, TypeError):
+        return []
+
+
+def tags(request, response=None):
+    """ Return the customers and contracts a request reads or writes,
+    as ('customer', id) and ('contract', id) pairs. Customer searches
+    are also tagged 'customers', as any new or changed customer may
+    change their results.
+    """
+    parts = request.endpoint.strip('/').split('/')
+    found = set()
+    if parts[0] == 'customer':
+        if len(parts) == 1:
+            found.add('customers')
+            if response is not None:
+                for customer in _ids(response, 'Customers'):
+                    found.add(('customer', customer))
+        else:
+            found.add(('customer', parts[1]))
+            if response is not None and len(parts) > 2 \
+                    and parts[2] == 'contract':
+                for contract in _ids(response, 'Contracts'):
+                    found.add(('contract', contract))
+            if request.method == 'PATCH':
+                found.add('customers')
+    elif parts[0] == 'contract' and len(parts) > 1:
+        found.add(('contract', parts[1]))
+    return found
+
+
+class ResponseCache:
+    def __init__(self, max_bytes=None, ttls=None):
+        """
+        Creates a least recently used cache of responses, holding at
+        most max_bytes of response bodies
+
+        :Optional args:
+        - max_bytes - The total size of the responses held. By default,
+            this is read from settings.cache
+        - ttls - A dictionary of endpoint families and the number of
+            seconds their responses are kept, and the number of seconds
+            searches which found nothing are kept as 'negative'. By
+            default, this is read from settings.cache
+        """
+        self.max_bytes = max_bytes
+        self.ttls = ttls
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # Incremented by every invalidation, so a response read before
+        # a write is never stored after it
+        self.generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _setting(self, name):
+        value = getattr(self, name)
+        if value is None:
+            value = s.cache[name]
+        return value
+
+    def _ttl(self, request, response):
+        ttls = self._setting('ttls')
+        if response in _empty_responses:
+            return ttls.get('negative')
+        return ttls.get(request.family)
+
+    def get(self, request, key):
+        """ Return the cached response to a request, or None if there
+        isn't one which is still fresh.
+        """
+        if not s.cache['enabled'] or request.method != 'GET' \
+                or request.family not in self._setting('ttls'):
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry.response
+            if entry is not None:
+                self._remove(key)
+            self._misses += 1
+            return None
+
+    def put(self, request, key, response, generation):
+        """ Store the response to a request, unless the cache has been
+        invalidated since generation was read.
+        """
+        if not s.cache['enabled'] or request.method != 'GET' \
+                or getattr(response, 'status_code', None) != 200:
+            return
+        ttl = self._ttl(request, response)
+        if not ttl:
+            return
+        # The size of the body as received, rather than encoding the
+        # text again to measure it
+        size = len(getattr(response, 'content', response))
+        max_bytes = self._setting('max_bytes')
+        if size > max_bytes:
+            return
+        entry = _Entry(response, size, monotonic() + ttl,
+                       tags(request, response))
+        with self._lock:
+            if generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key).size
+
+    def invalidate(self, request):
+        """ Remove every response reading a customer or contract written
+        by a request.
+        """
+        if not s.cache['enabled']:
+            return
+        written = tags(request)
+        with self._lock:
+            self.generation += 1
+            stale = [
+                key for key, entry in self._entries.items()
+                if entry.tags & written
+            ]
+            for key in stale:
+                self._remove(key)
+
+    def clear(self):
+        """ Remove every response from the cache.
+        """
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """ Return the number of hits, misses and evictions of the
+        cache, and the number and size of the responses it holds.
+
+        :Example:
+        stats()
+
+        :Returns:
+        {'hits': 30, 'misses': 10, 'evictions': 0, 'entries': 10,
+         'bytes': 20480}
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
@@ -0,0 +1,174 @@
+"""
+eazysdk.circuit
+~~~~~~~~~~~~~~~
+
+This module contains the circuit breaker applied by the EazySDK session.
+A circuit is kept for each environment and family of endpoints. After a
+run of failures the circuit opens, and requests fail fast with a
+CircuitOpenError rather than waiting on EazyCustomerManager. Once the
+recovery timeout has passed, a trial request is let through, closing
+the circuit again if it succeeds.
+"""
+from threading import Lock
+from time import monotonic
+from .settings import Settings as s
+from .exceptions import CircuitOpenError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class Circuit:
+    __slots__ = ('state', 'failures', 'opened_at', 'trials')
+
+    def __init__(self):
+        self.state = CLOSED
+        # The number of failures in a row while closed
+        self.failures = 0
+        self.opened_at = None
+        # The number of trial requests in flight while half-open
+        self.trials = 0
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=None, recovery_timeout=None,
+                 half_open_max_calls=None):
+        """
+        Creates a circuit breaker with a circuit for each environment
+        and family of endpoints. A request fails if it could not be
+        sent, timed out, or EazyCustomerManager responded with a 5xx
+        status.
+
+        :Optional args:
+        - failure_threshold - The number of failures in a row which
+            open a circuit. By default, this is read from
+            settings.circuit_breaker
+        - recovery_timeout - The number of seconds a circuit stays open
+            before a trial request is let through. By default, this is
+            read from settings.circuit_breaker
+        - half_open_max_calls - The number of trial requests let through
+            at once while a circuit is half-open. By default, this is
+            read from settings.circuit_breaker
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._lock = Lock()
+        self._circuits = {}
+
+    def _setting(self, name):
+        value = getattr(self, name)
+        if value is None:
+            value = s.circuit_breaker[name]
+        return value
+
+    def _circuit(self, family):
+        key = (s.current_environment['env'].lower(), family)
+        if key not in self._circuits:
+            self._circuits[key] = Circuit()
+        return key, self._circuits[key]
+
+    def allow(self, family):
+        """ Check a request to a family of endpoints may be sent.
+
+        :Raises:
+        CircuitOpenError if the circuit is open, or half-open with every
+        trial request already in flight
+        """
+        if not s.circuit_breaker['enabled']:
+            return
+        with self._lock:
+            key, circuit = self._circuit(family)
+            if circuit.state == CLOSED:
+                return
+            retry_in = self._setting('recovery_timeout') \
+                - (monotonic() - circuit.opened_at)
+            if circuit.state == OPEN and retry_in <= 0:
+                circuit.state = HALF_OPEN
+                circuit.trials = 0
+            if circuit.state == HALF_OPEN \
+                    and circuit.trials < self._setting('half_open_max_calls'):
+                circuit.trials += 1
+                return
+        raise CircuitOpenError(
+            'EazyCustomerManager has been failing for %s requests in %s,'
+            ' so this request was not sent. Please try again in %.0f'
+            ' seconds.' % (family, key[0], max(retry_in, 0)),
+            key[0], family, max(retry_in, 0),
+        )
+
+    def record(self, family, status=None):
+        """ Record the outcome of a request to a family of endpoints.
+
+        :Args:
+        family - The family of endpoints the request was sent to
+        status - The HTTP status of the response, or None if no
+            response was received
+        """
+        if not s.circuit_breaker['enabled']:
+            return
+        failed = status is None or status >= 500
+        with self._lock:
+            key, circuit = self._circuit(family)
+            if circuit.state == HALF_OPEN:
+                circuit.trials = max(circuit.trials - 1, 0)
+                if failed:
+                    self._open(circuit)
+                else:
+                    circuit.state = CLOSED
+                    circuit.failures = 0
+            elif circuit.state == CLOSED:
+                if not failed:
+                    circuit.failures = 0
+                    return
+                circuit.failures += 1
+                if circuit.failures >= self._setting('failure_threshold'):
+                    self._open(circuit)
+
+    def release(self, family):
+        """ Give back a request let through by allow which was never
+        sent, without recording an outcome for it.
+
+        :Args:
+        family - The family of endpoints the request was for
+        """
+        if not s.circuit_breaker['enabled']:
+            return
+        with self._lock:
+            key, circuit = self._circuit(family)
+            if circuit.state == HALF_OPEN:
+                circuit.trials = max(circuit.trials - 1, 0)
+
+    @staticmethod
+    def _open(circuit):
+        circuit.state = OPEN
+        circuit.opened_at = monotonic()
+        circuit.failures = 0
+        circuit.trials = 0
+
+    def stats(self):
+        """ Return the state of every circuit, by environment and family
+        of endpoints.
+
+        :Example:
+        stats()
+
+        :Returns:
+        {'sandbox': {'customer': {'state': 'open', 'failures': 0,
+                                  'retry_in': 12.5}}}
+        """
+        now = monotonic()
+        stats = {}
+        with self._lock:
+            for (environment, family), circuit in self._circuits.items():
+                retry_in = None
+                if circuit.state == OPEN:
+                    retry_in = max(self._setting('recovery_timeout')
+                                   - (now - circuit.opened_at), 0)
+                stats.setdefault(environment, {})[family] = {
+                    'state': circuit.state,
+                    'failures': circuit.failures,
+                    'retry_in': retry_in,
+                }
+        return stats
@@ -0,0 +1,97 @@
+"""
+eazysdk.coalesce
+~~~~~~~~~~~~~~~~
+
+This module contains the single-flight group used by the EazySDK
+session. While a GET request is in flight, identical GET requests wait
+for its response rather than sending their own. The group used by the
+AsyncEazySDK is in eazysdk.aio, so asyncio is only imported with it.
+"""
+from threading import Event
+from threading import Lock
+from .exceptions import RequestTimeoutError
+from .timeouts import remaining
+
+
+def deadline_exceeded():
+    """ Return the error raised when the deadline of a call passes while
+    it waits for an identical request already in flight.
+    """
+    return RequestTimeoutError(
+        'The deadline for this call was exceeded waiting for an identical'
+        ' request already in flight.'
+    )
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Creates a group in which only one call for each key is in flight
+        at once, shared by every thread
+        """
+        self._lock = Lock()
+        self._calls = {}
+        self._sent = 0
+        self._shared = 0
+
+    def do(self, key, function):
+        """ Call function, unless a call for the same key is already in
+        flight, in which case wait for its result instead.
+
+        :Args:
+        key - The key identical calls share
+        function - The function to be called without arguments
+
+        :Returns:
+        The result of function, or raises its exception
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._sent += 1
+                leader = True
+            else:
+                self._shared += 1
+                leader = False
+
+        if not leader:
+            if not call.done.wait(remaining()):
+                raise deadline_exceeded()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        """ Return the number of requests sent, and the number of
+        requests which shared the response of one already in flight.
+
+        :Example:
+        stats()
+
+        :Returns:
+        {'sent': 10, 'shared': 25}
+        """
+        with self._lock:
+            return {'sent': self._sent, 'shared': self._shared}
+
@@ -0,0 +1,111 @@
+"""
+eazysdk.codec
+~~~~~~~~~~~~~
+
+This module contains the JSON codec used by the EazySDK to parse
+responses and to write the metadata store. The backend is chosen by
+other['json_backend']. With 'auto', orjson is used when it is
+installed, and the json module of the standard library otherwise.
+Other backends can be added with register().
+"""
+from collections import namedtuple
+import json
+from .settings import Settings as s
+
+# A JSON backend. loads accepts bytes or a string, and dumps returns a
+# string.
+Backend = namedtuple('Backend', 'name loads dumps')
+
+
+def _stdlib():
+    return Backend(
+        'json', json.loads,
+        lambda obj: json.dumps(obj, separators=(',', ':')),
+    )
+
+
+def _orjson():
+    try:
+        import orjson
+    except ImportError:
+        raise ImportError(
+            'The orjson JSON backend requires orjson. It can be installed'
+            ' with pip install orjson'
+        )
+
+    return Backend(
+        'orjson', orjson.loads, lambda obj: orjson.dumps(obj).decode(),
+    )
+
+
+def _auto():
+    try:
+        return _orjson()
+    except ImportError:
+        return _stdlib()
+
+
+# The function creating each backend, by name
+_factories = {
+    'auto': _auto,
+    'json': _stdlib,
+    'orjson': _orjson,
+}
+# The backends created so far, by name
+_backends = {}
+
+
+def register(name, loads, dumps):
+    """ Add a JSON backend, which is used when other['json_backend'] is
+    set to its name.
+
+    :Args:
+    name - The name of the backend
+    loads - A function parsing bytes or a string of JSON
+    dumps - A function returning the JSON of an object as a string
+    """
+    _factories[name] = lambda: Backend(name, loads, dumps)
+    _backends.pop(name, None)
+
+
+def backend():
+    """ Return the Backend chosen by other['json_backend'], creating it
+    on first use.
+    """
+    name = s.other['json_backend']
+    try:
+        return _backends[name]
+    except KeyError:
+        pass
+    if name not in _factories:
+        from .exceptions import InvalidSettingsConfiguration
+        raise InvalidSettingsConfiguration(
+            '%s is not a JSON backend. The available backends are %s.'
+            % (name, ', '.join(sorted(_factories)))
+        )
+    _backends[name] = _factories[name]()
+    return _backends[name]
+
+
+def loads(data):
+    """ Parse JSON from bytes or a string with the chosen backend. A
+    response is parsed from the bytes it was received as, which every
+    backend reads without decoding them first.
+
+    :Args:
+    data - The JSON, as bytes, a string, or a response of the EazySDK
+    """
+    content = getattr(data, 'content', None)
+    if content is not None:
+        data = content
+    return backend().loads(data)
+
+
+def dumps(obj):
+    """ Return the JSON of an object as a string with the chosen
+    backend.
+
+    :Args:
+    obj - The object to be written as JSON
+    """
+    return backend().dumps(obj)
@@ -1,17 +1,21 @@
-from .session import Session
+from .session import default_session
+from .session import request_steps
 from .exceptions import common_exceptions_decorator, InvalidParameterError
 from .exceptions import ResourceNotFoundError
 
 
 class Delete:
-    def __init__(self):
+    def __init__(self, session=None):
         """
         A collection of DELETE requests made to the EazyCustomerManager
         API
         """
-        self.sdk = Session()
+        if session is None:
+            session = default_session()
+        self.sdk = session
 
     @common_exceptions_decorator
+    @request_steps
     def callback_url(self, entity):
         """
         Delete the current callback URL for given entity
@@ -29,8 +33,7 @@ class Delete:
                                         "one of either 'contract', 'customer' "
                                         "or 'payment'.".format(entity))
 
-        self.sdk.endpoint = 'BACS/{}/callback'.format(entity)
-        response = self.sdk.delete()
+        response = yield self.sdk.delete('BACS/{}/callback'.format(entity))
         # NULL will be returned if a callback URL does not exist
         if str(response) == '{"Message":null}':
             return 'An unknown error has occurred.'
@@ -39,6 +42,7 @@ class Delete:
             return 'Callback URL deleted.'
 
     @common_exceptions_decorator
+    @request_steps
     def payment(self, contract, payment, comment):
         """
         Delete a payment from EazyCustomerManager, as long as it hasn't
@@ -60,9 +64,9 @@ class Delete:
         parameters = {
             'comment': comment
         }
-        self.sdk.params = parameters
-        self.sdk.endpoint = 'contract/%s/payment/%s' % (contract, payment)
-        response = self.sdk.delete()
+        response = yield self.sdk.delete(
+            'contract/%s/payment/%s' % (contract, payment), parameters
+        )
 
         if 'Payment not found' in response:
             raise ResourceNotFoundError(
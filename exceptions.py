@@ -5,12 +5,20 @@ eazysdk.excepions
 This module contains the set of EazySDK's exceptions
 """
 from functools import wraps
+from .codec import loads
 
 
 class EazySDKException(IOError):
     """ There was an unknown error that occurred while handling your
     request.
     """
+    # The HTTP status, method and endpoint of the response which caused
+    # the error, and the seconds taken to receive it, if there was one
+    status_code = None
+    method = None
+    endpoint = None
+    elapsed = None
+
     def __init__(self, message, *args):
         self.message = message
         super(EazySDKException, self).__init__(message, *args)
@@ -72,41 +80,147 @@ class InvalidSettingsConfiguration(EazySDKException):
     """
 
 
+class RequestTimeoutError(EazySDKException):
+    """ EazyCustomerManager did not respond in time, or the deadline for
+    the call was exceeded.
+    """
+
+
+class RateLimitExceededError(EazySDKException):
+    """ The client-side rate limit for the endpoint has been reached.
+    """
+
+
+class ServerError(EazySDKException):
+    """ EazyCustomerManager failed to handle the request, and was still
+    failing after it was retried.
+    """
+
+
+class CircuitOpenError(EazySDKException):
+    """ EazyCustomerManager has been failing for the family of endpoints,
+    so the request was not sent.
+    """
+    def __init__(self, message, environment=None, family=None,
+                 retry_in=None, *args):
+        self.environment = environment
+        self.family = family
+        self.retry_in = retry_in
+        super(CircuitOpenError, self).__init__(message, *args)
+
+
+# The generic errors described in the body of an error response
+_unsupported_message = (
+    'This is a generic error. This error can be caused by'
+    'several events, including\n'
+    '- The incorrect HTTP method is being used. Ex. You cannot use'
+    ' the GET method when attempting to cancel a Direct Debit\n'
+    '- The correct HTTP method is being used, but a mandatory '
+    'field has been missed'
+)
+_not_enabled_message = (
+    'This is a generic error. This can be caused by several '
+    'events, including\n'
+    '- The API key is not correct.\n'
+    '- The API is correct, but the client is not API enabled\n'
+    '- The client code is not correct\n'
+    '- If performing a POST, this could mean the record you\'re'
+    ' trying to post against does not exist.'
+)
+_not_found_message = (
+    'The requested resource could not be found. This is a'
+    ' generic error which could be caused by several events,'
+    ' including\n'
+    '- You are searching against a record that does not exist\n'
+    '- You are missing a mandatory parameter in your API call\n'
+    '- You are trying to send invalid data to'
+    ' EazyCustomerManager.\n'
+    '- The provided client code or API key is incorrect.'
+)
+
+
+def error_message(body):
+    """ Return the message of an error response from
+    EazyCustomerManager, which is sent as {"Message": "..."}, or the
+    body itself if it is not JSON.
+    """
+    try:
+        error = loads(body)
+    except (TypeError, ValueError):
+        return str(body)
+    if isinstance(error, dict):
+        message = error.get('ExceptionMessage') or error.get('Message')
+        if message is not None:
+            return str(message)
+    return str(body)
+
+
+def classify_error(status, message):
+    """ Return the EazySDK exception and message matching an error
+    response from EazyCustomerManager, or (None, None) if the response
+    should be handled by the request method.
+
+    :Args:
+    status - The HTTP status of the response
+    message - The message of the response, see error_message()
+    """
+    if 'not supported' in message:
+        return UnsupportedHTTPMethodError, _unsupported_message
+    elif 'API not enabled' in message or 'does not support' in message:
+        return SDKNotEnabledError, _not_enabled_message
+    elif 'IIS 8.5 Detailed Error - 404.0 - Not Found' in message\
+            or 'No HTTP resource was found' in message:
+        return ResourceNotFoundError, _not_found_message
+    elif status in (401, 403):
+        return SDKNotEnabledError, _not_enabled_message
+    elif status == 404:
+        return ResourceNotFoundError, _not_found_message
+    elif status == 405:
+        return UnsupportedHTTPMethodError, _unsupported_message
+    elif status == 429:
+        return RateLimitExceededError, (
+            'EazyCustomerManager is limiting the rate of requests, and'
+            ' was still doing so after the request was retried: %s'
+            % message
+        )
+    elif status >= 500:
+        return ServerError, (
+            'EazyCustomerManager failed to handle the request, and was'
+            ' still failing after it was retried: %s' % message
+        )
+    return None, None
+
+
+def describe_error(error, response):
+    """ Record the status, method, endpoint and elapsed time of the
+    response which caused an error on the error, unless it already
+    holds them.
+    """
+    if error.status_code is None and error.endpoint is None:
+        for name in ('status_code', 'method', 'endpoint', 'elapsed'):
+            setattr(error, name, getattr(response, name, None))
+    return error
+
+
+def check_common_exceptions(response):
+    """ Raise the matching EazySDK exception if a response returned from
+    EazyCustomerManager failed with one of its generic errors, otherwise
+    return the response as a string. A successful response is returned
+    without its body being read, so only error responses are scanned.
+    """
+    status = getattr(response, 'status_code', None)
+    if status is None or 200 <= status < 300:
+        if isinstance(response, str):
+            return response
+        return str(response)
+    error, message = classify_error(status, error_message(response))
+    if error is None:
+        return response
+    raise describe_error(error(message), response)
+
+
 def common_exceptions_decorator(funct):
     @wraps(funct)
     def wrapper(self, *args, **kwargs):
-        func = str(funct(self, *args, **kwargs))
-        if 'not supported' in func:
-            raise UnsupportedHTTPMethodError(
-                'This is a generic error. This error can be caused by'
-                'several events, including\n'
-                '- The incorrect HTTP method is being used. Ex. You cannot use'
-                ' the GET method when attempting to cancel a Direct Debit\n'
-                '- The correct HTTP method is being used, but a mandatory '
-                'field has been missed'
-            )
-        elif 'API not enabled' in func or 'does not support' in func:
-            raise SDKNotEnabledError(
-                'This is a generic error. This can be caused by several '
-                'events, including\n'
-                '- The API key is not correct.\n'
-                '- The API is correct, but the client is not API enabled\n'
-                '- The client code is not correct\n'
-                '- If performing a POST, this could mean the record you\'re'
-                ' trying to post against does not exist.'
-            )
-        elif 'IIS 8.5 Detailed Error - 404.0 - Not Found' in func\
-                or 'No HTTP resource was found' in func:
-            raise ResourceNotFoundError(
-                'The requested resource could not be found. This is a'
-                ' generic error which could be caused by several events,'
-                ' including\n'
-                '- You are searching against a record that does not exist\n'
-                '- You are missing a mandatory parameter in your API call\n'
-                '- You are trying to send invalid data to'
-                ' EazyCustomerManager.\n'
-                '- The provided client code or API key is incorrect.'
-            )
-        else:
-            return func
+        return check_common_exceptions(funct(self, *args, **kwargs))
     return wrapper
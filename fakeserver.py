@@ -0,0 +1,775 @@
+"""
+eazysdk.fakeserver
+~~~~~~~~~~~~~~~~~~
+
+This module contains FakeECM3, an in-process stand-in for version 3 of
+the EazyCustomerManager API. It answers every route used by the EazySDK
+from records kept in memory, and can add latency, server errors,
+throttling and timeouts to its responses, so that an integration can be
+tested, load-tested and benchmarked without sending requests to
+EazyCollect.
+
+Requests can be answered without a socket through FakeTransport or
+AsyncFakeTransport, or over HTTP once the server has been started:
+
+    with FakeECM3(latency=uniform(0.01, 0.05), error_rate=0.01) as ecm3:
+        s.other['base_url'] = ecm3.base_url
+        s.other['bank_holidays_url'] = ecm3.bank_holidays_url
+        client.get.customers(surname='Test')
+"""
+import json
+import re
+from collections import namedtuple
+from datetime import datetime
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from math import ceil
+from math import log
+from random import Random
+from threading import Event
+from threading import Lock
+from threading import Thread
+from time import sleep
+from urllib.parse import parse_qsl
+from urllib.parse import urlsplit
+from uuid import UUID
+from zlib import crc32
+from .ratelimit import TokenBucket
+from .session import Request
+
+# A response from the stand-in server
+FakeResponse = namedtuple('FakeResponse', 'status_code headers text')
+
+# The schedules offered by the stand-in server, unless others are given
+default_schedules = [
+    {'Name': 'Weekly Free', 'Description': 'Weekly payments',
+     'Frequency': 'Weekly'},
+    {'Name': 'Monthly Free', 'Description': 'Monthly payments',
+     'Frequency': 'Monthly'},
+    {'Name': 'Annual Free', 'Description': 'Annual payments',
+     'Frequency': 'Annually'},
+    {'Name': 'Ad-Hoc Free', 'Description': 'AD-HOC Payments',
+     'Frequency': 'Monthly'},
+]
+
+# The most payments returned by a single payments request
+max_rows = 100
+
+# The routes of the API, matched against the path after the client code
+_routes = [
+    ('customer', 'customer',
+     {'GET': '_get_customers', 'POST': '_post_customer'}),
+    ('customer/{id}', 'customer/([^/]+)', {'PATCH': '_patch_customer'}),
+    ('customer/{id}/contract', 'customer/([^/]+)/contract',
+     {'GET': '_get_contracts', 'POST': '_post_contract'}),
+    ('contract/{id}/{action}',
+     'contract/([^/]+)/(cancel|archive|reactivate|restart)',
+     {'POST': '_contract_action'}),
+    ('contract/{id}/{change}',
+     'contract/([^/]+)/(amount|weekly|monthly|annual)',
+     {'PATCH': '_patch_contract'}),
+    ('contract/{id}/payment', 'contract/([^/]+)/payment',
+     {'GET': '_get_payments', 'POST': '_post_payment'}),
+    ('contract/{id}/payment/{id}', 'contract/([^/]+)/payment/([^/]+)',
+     {'GET': '_get_payment', 'PATCH': '_patch_payment',
+      'DELETE': '_delete_payment'}),
+    ('schedules', 'schedules', {'GET': '_get_schedules'}),
+    ('BACS/{entity}/callback', 'BACS/(customer|contract|payment)/callback',
+     {'GET': '_get_callback', 'POST': '_post_callback',
+      'DELETE': '_delete_callback'}),
+]
+_routes = [(name, re.compile(pattern + '$', re.I), methods)
+           for name, pattern, methods in _routes]
+
+# The API path before the route, naming the client
+_prefix = re.compile(r'^(?:.*?/)?api/v3/client/[^/]+/')
+
+# The names of the fields searched by a customer search
+_customer_search = {
+    'email': 'Email',
+    'title': 'Title',
+    'dateOfBirth': 'DateOfBirth',
+    'customerRef': 'CustomerRef',
+    'firstName': 'FirstName',
+    'surname': 'Surname',
+    'companyName': 'CompanyName',
+    'postCode': 'PostCode',
+    'accountNumber': 'AccountNumber',
+    'bankSortCode': 'BankSortCode',
+    'accountHolderName': 'AccountHolderName',
+    'homePhoneNumber': 'HomePhone',
+    'workPhoneNumber': 'WorkPhone',
+    'mobilePhoneNumber': 'MobilePhone',
+}
+
+
+def constant(seconds):
+    """ A latency distribution which always waits the given number of
+    seconds.
+    """
+    return lambda random: seconds
+
+
+def uniform(low, high):
+    """ A latency distribution drawn uniformly between low and high
+    seconds.
+    """
+    return lambda random: random.uniform(low, high)
+
+
+def lognormal(median, sigma=0.5):
+    """ A latency distribution with the given median number of seconds,
+    and the long tail of a real server.
+    """
+    return lambda random: random.lognormvariate(log(median), sigma)
+
+
+class FakeECM3:
+    def __init__(self, latency=None, error_rate=0.0,
+                 error_statuses=(500, 502, 503), throttle=None,
+                 timeout_rate=0.0, hang=60, api_key=None, schedules=None,
+                 bank_holidays=(), seed=None):
+        """
+        Creates a stand-in for the EazyCustomerManager API, holding no
+        records until they are posted or populate() is called
+
+        :Optional args:
+        - latency - The number of seconds each response is delayed by,
+            or a distribution such as uniform(0.01, 0.05), called with a
+            random.Random for each request
+        - error_rate - The share of requests, from 0 to 1, answered with
+            a server error without being processed
+        - error_statuses - The HTTP statuses server errors are drawn
+            from
+        - throttle - A dictionary of endpoint families and their rate
+            and burst, in the format of settings.rate_limits['buckets'].
+            Requests beyond the limit are answered with 429 and a
+            Retry-After header.
+        - timeout_rate - The share of requests, from 0 to 1, which are
+            processed but never answered, as when a response is lost
+        - hang - The number of seconds an unanswered request is held
+            open over HTTP before its connection is closed
+        - api_key - The only API key accepted. By default, any API key
+            is accepted.
+        - schedules - The schedules offered, in the format of
+            default_schedules
+        - bank_holidays - The bank holidays served by
+            bank_holidays_url, as ISO dates
+        - seed - The seed of the random faults and latencies, so that
+            a run can be repeated
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.throttle = throttle
+        self.timeout_rate = timeout_rate
+        self.hang = hang
+        self.api_key = api_key
+        if schedules is None:
+            schedules = default_schedules
+        self.schedules = list(schedules)
+        self.bank_holidays = list(bank_holidays)
+        self.customers = {}
+        self.contracts = {}
+        self.payments = {}
+        self.callbacks = {}
+        # The Ids of the customers, by customer reference
+        self._references = {}
+        self._random = Random(seed)
+        self._lock = Lock()
+        self._buckets = {}
+        self._counts = {}
+        self._http = None
+        self._stopped = Event()
+
+    def _count(self, name):
+        self._counts[name] = self._counts.get(name, 0) + 1
+
+    def _draw(self):
+        # Decide the latency and faults of a request in one step, so a
+        # seeded run always draws in the same order
+        with self._lock:
+            latency = self.latency
+            if callable(latency):
+                latency = latency(self._random)
+            return (
+                max(latency or 0.0, 0.0),
+                self._random.random() < self.error_rate,
+                self._random.choice(self.error_statuses or (500,)),
+                self._random.random() < self.timeout_rate,
+            )
+
+    def _throttled(self, family):
+        # Return the number of seconds to wait if a request is throttled
+        limits = (self.throttle or {}).get(family)
+        if not limits:
+            return 0
+        with self._lock:
+            if family not in self._buckets:
+                self._buckets[family] = TokenBucket(
+                    limits['rate'], limits['burst']
+                )
+            bucket = self._buckets[family]
+        return bucket.take()
+
+    def handle(self, method, path, params=None, headers=None):
+        """
+        Answer a request to the API, applying the faults of the server
+
+        :Required args:
+        - method - The HTTP method of the request
+        - path - The path or full URL of the request
+
+        :Optional args:
+        - params - The parameters of the request, as a dictionary or
+            (name, value) pairs
+        - headers - The headers of the request
+
+        :Example:
+        handle('GET', '/api/v3/client/test/customer', {'surname': 'Test'})
+
+        :Returns:
+        (latency, FakeResponse), where the response is None if the
+        request should never be answered
+        """
+        latency, error, status, lost = self._draw()
+        route = _prefix.sub('', urlsplit(path).path, 1).strip('/')
+        family = Request(method, route).family
+        with self._lock:
+            self._count('requests')
+        wait = self._throttled(family)
+        if wait:
+            with self._lock:
+                self._count('throttled')
+            return latency, self._reply(
+                429, {'Message': 'Too many requests.'},
+                {'Retry-After': str(int(ceil(wait)))},
+            )
+        if error:
+            with self._lock:
+                self._count('errors')
+            return latency, self._reply(
+                status, {'Message': 'An error has occurred.'}
+            )
+        response = self.respond(method, route, params, headers)
+        if lost:
+            with self._lock:
+                self._count('timeouts')
+            return latency, None
+        return latency, response
+
+    def respond(self, method, route, params=None, headers=None):
+        """
+        Answer a request to the API without applying any faults. The
+        route is the path of the request after the client code.
+
+        :Returns:
+        FakeResponse(status_code, headers, text)
+        """
+        if route == 'bank-holidays.json':
+            return self._bank_holidays(headers or {})
+        api_key = (headers or {}).get('apiKey')
+        if self.api_key is not None and api_key != self.api_key:
+            return self._reply(401, {
+                'Message': 'API not enabled for this client.'
+            })
+        params = _params(params)
+        for name, pattern, methods in _routes:
+            match = pattern.match(route)
+            if match is None:
+                continue
+            if method not in methods:
+                return self._reply(405, {
+                    'Message': 'The requested resource does not support'
+                               ' http method \'%s\'.' % method
+                })
+            with self._lock:
+                self._count(method + ' ' + name)
+                return getattr(self, methods[method])(
+                    params, *match.groups()
+                )
+        return self._reply(404, {
+            'Message': 'No HTTP resource was found that matches the'
+                       ' request URI \'%s\'.' % route
+        })
+
+    @staticmethod
+    def _reply(status, body, headers=None):
+        # ECM3 answers with compact JSON
+        return FakeResponse(
+            status, dict(headers or {}, **{
+                'Content-Type': 'application/json; charset=utf-8'
+            }),
+            json.dumps(body, separators=(',', ':')),
+        )
+
+    def _bank_holidays(self, headers):
+        etag = '"%08x"' % crc32(','.join(self.bank_holidays).encode())
+        if headers.get('If-None-Match') == etag:
+            return FakeResponse(304, {'ETag': etag}, '')
+        return self._reply(200, {'england-and-wales': {
+            'division': 'england-and-wales',
+            'events': [{'title': 'Bank holiday', 'date': day}
+                       for day in self.bank_holidays],
+        }}, {'ETag': etag})
+
+    def _new_id(self):
+        return str(UUID(int=self._random.getrandbits(128), version=4))
+
+    def _add_customer(self, params, added=None):
+        record = _record(params)
+        record['Id'] = self._new_id()
+        record['DateAdded'] = (added or datetime.now()).isoformat()
+        self.customers[record['Id']] = record
+        self._references[record.get('CustomerRef')] = record['Id']
+        return record
+
+    def _add_contract(self, customer, params, added=None):
+        record = _record(params)
+        record['Id'] = self._new_id()
+        record['CustomerId'] = customer
+        record['Status'] = 'Active'
+        record['DirectDebitRef'] = params.get(
+            'customDirectDebitRef', 'DD%08d' % len(self.contracts)
+        )
+        record['DateAdded'] = (added or datetime.now()).isoformat()
+        self.contracts[record['Id']] = record
+        return record
+
+    def _add_payment(self, contract, params, added=None):
+        record = _record(params)
+        record['Id'] = self._new_id()
+        record['ContractId'] = contract
+        record['Status'] = 'Pending'
+        record['DateAdded'] = (added or datetime.now()).isoformat()
+        self.payments[record['Id']] = record
+        return record
+
+    def _get_customers(self, params):
+        search = {
+            _customer_search[name]: value.lower()
+            for name, value in params.items() if name in _customer_search
+        }
+        start = params.get('from')
+        end = params.get('to')
+        found = []
+        for record in self.customers.values():
+            added = record['DateAdded'][:10]
+            if start and added < start[:10] or end and added > end[:10]:
+                continue
+            if all(str(record.get(name, '')).lower() == value
+                   for name, value in search.items()):
+                found.append(record)
+        return self._reply(200, {'Customers': found})
+
+    def _post_customer(self, params):
+        if params.get('customerRef') in self._references:
+            return self._reply(400, {
+                'Message': 'There is an existing Customer with the same'
+                           ' Client and Customer ref in the database'
+                           ' already.'
+            })
+        return self._reply(200, {'Customer': self._add_customer(params)})
+
+    def _patch_customer(self, params, customer):
+        record = self.customers.get(customer)
+        if record is None:
+            return self._reply(404, {'Message': 'Customer not found'})
+        record.update(_record(params))
+        return self._reply(200, {'Message': 'Customer updated'})
+
+    def _get_contracts(self, params, customer):
+        return self._reply(200, {'Contracts': [
+            record for record in self.contracts.values()
+            if record['CustomerId'] == customer
+        ]})
+
+    def _post_contract(self, params, customer):
+        if customer not in self.customers:
+            return self._reply(404, {'Message': 'Customer not found'})
+        names = {schedule['Name'].lower() for schedule in self.schedules}
+        if params.get('scheduleName', '').lower() not in names:
+            return self._reply(400, {'Message': 'Schedule not found'})
+        return self._reply(200, {
+            'Contract': self._add_contract(customer, params)
+        })
+
+    def _contract_action(self, params, contract, action):
+        record = self.contracts.get(contract)
+        if record is None:
+            return self._reply(404, {'Message': 'Contract not found'})
+        action = action.lower()
+        if action == 'archive':
+            if record['Status'] == 'Archived':
+                return self._reply(400, {
+                    'Message': 'Contract is already archived'
+                })
+            record['Status'] = 'Archived'
+        elif action == 'restart':
+            if record['Status'] != 'Expired':
+                return self._reply(400, {
+                    'Message': 'Contract is not expired.'
+                })
+            record.update(_record(params))
+            record['Status'] = 'Active'
+        elif action == 'cancel':
+            record['Status'] = 'Cancelled'
+        else:
+            record['Status'] = 'Active'
+        return self._reply(200, {'Contract': record})
+
+    def _patch_contract(self, params, contract, change):
+        record = self.contracts.get(contract)
+        if record is None:
+            return self._reply(404, {'Message': 'Contract not found'})
+        record.update(_record(params))
+        return self._reply(200, {'Message': 'Contract updated'})
+
+    def _get_payments(self, params, contract):
+        try:
+            rows = min(int(params.get('rows', max_rows)), max_rows)
+        except ValueError:
+            rows = max_rows
+        found = [
+            record for record in self.payments.values()
+            if record['ContractId'] == contract
+        ]
+        return self._reply(200, {'Payments': found[:max(rows, 0)]})
+
+    def _post_payment(self, params, contract):
+        if contract not in self.contracts:
+            return self._reply(404, {'Message': 'Contract not found'})
+        return self._reply(200, {
+            'Payment': self._add_payment(contract, params)
+        })
+
+    def _payment(self, contract, payment):
+        record = self.payments.get(payment)
+        if record is None or record['ContractId'] != contract:
+            return None
+        return record
+
+    def _get_payment(self, params, contract, payment):
+        record = self._payment(contract, payment)
+        if record is None:
+            return self._reply(404, {'Message': 'Payment not found'})
+        return self._reply(200, {'Payment': record})
+
+    def _patch_payment(self, params, contract, payment):
+        record = self._payment(contract, payment)
+        if record is None:
+            return self._reply(404, {'Message': 'Payment not found'})
+        record.update(_record(params))
+        return self._reply(200, {'Payment': record})
+
+    def _delete_payment(self, params, contract, payment):
+        if self._payment(contract, payment) is None:
+            return self._reply(404, {'Message': 'Payment not found'})
+        del self.payments[payment]
+        return self._reply(200, {'Message': 'Payment deleted'})
+
+    def _get_schedules(self, params):
+        return self._reply(200, {'Services': [{
+            'Name': 'Default Service',
+            'Schedules': self.schedules,
+        }]})
+
+    def _get_callback(self, params, entity):
+        return self._reply(200, {
+            'Message': self.callbacks.get(entity.lower())
+        })
+
+    def _post_callback(self, params, entity):
+        self.callbacks[entity.lower()] = params.get('url')
+        return self._reply(200, {'Message': 'Updated'})
+
+    def _delete_callback(self, params, entity):
+        if self.callbacks.pop(entity.lower(), None) is None:
+            return self._reply(200, {'Message': None})
+        return self._reply(200, {'Message': 'Deleted'})
+
+    def populate(self, customers=0, contracts=0, payments=0, days=365,
+                 schedule_name='Monthly Free'):
+        """
+        Add generated records to the server, with customers added over
+        the given number of days up to now
+
+        :Optional args:
+        - customers - The number of customers added
+        - contracts - The number of contracts added to each customer
+        - payments - The number of payments added to each contract
+        - days - The number of days the customers were added over
+        - schedule_name - The schedule of every contract added
+
+        :Example:
+        populate(customers=1000, contracts=1, payments=12)
+
+        :Returns:
+        A list of the Ids of the customers added
+        """
+        now = datetime.now()
+        added = []
+        with self._lock:
+            for number in range(customers):
+                when = now - timedelta(
+                    seconds=self._random.uniform(0, days * 86400)
+                )
+                customer = self._add_customer({
+                    'email': 'customer%d@example.com' % number,
+                    'title': 'Mx',
+                    'customerRef': 'FAKE%08d' % len(self.customers),
+                    'firstName': 'Test',
+                    'surname': 'Customer%d' % number,
+                    'line1': '1 Test Street',
+                    'postCode': 'GL52 2NF',
+                    'accountNumber': '%08d' % self._random.randrange(10**8),
+                    'bankSortCode': '123456',
+                    'accountHolderName': 'Test Customer',
+                }, when)
+                added.append(customer['Id'])
+                for _ in range(contracts):
+                    contract = self._add_contract(customer['Id'], {
+                        'scheduleName': schedule_name,
+                        'start': when.date().isoformat(),
+                        'amount': '10.00',
+                    }, when)
+                    for month in range(payments):
+                        self._add_payment(contract['Id'], {
+                            'amount': '10.00',
+                            'date': (when + timedelta(days=30 * month))
+                            .date().isoformat(),
+                            'comment': 'Payment %d' % (month + 1),
+                        }, when)
+        return added
+
+    def stats(self):
+        """
+        Return the number of requests answered by the server, in total,
+        by route, and by the faults applied to them
+
+        :Example:
+        stats()
+
+        :Returns:
+        {'requests': 10, 'throttled': 1, 'errors': 1, 'timeouts': 0,
+         'routes': {'GET customer': 8}}
+        """
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            'requests': counts.pop('requests', 0),
+            'throttled': counts.pop('throttled', 0),
+            'errors': counts.pop('errors', 0),
+            'timeouts': counts.pop('timeouts', 0),
+            'routes': counts,
+        }
+
+    def start(self, host='127.0.0.1', port=0):
+        """
+        Serve the API over HTTP from a background thread, until stop()
+        is called
+
+        :Optional args:
+        - host - The address the server listens on
+        - port - The port the server listens on. By default, a free
+            port is chosen.
+
+        :Returns:
+        The base URL of the API, for settings.other['base_url']
+        """
+        if self._http is None:
+            self._stopped.clear()
+            self._http = ThreadingHTTPServer((host, port), _Handler)
+            self._http.daemon_threads = True
+            self._http.ecm3 = self
+            Thread(target=self._http.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        """
+        Stop serving the API over HTTP, releasing any unanswered
+        requests
+        """
+        if self._http is not None:
+            self._stopped.set()
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+
+    @property
+    def url(self):
+        """
+        The root URL of the server, while it is serving over HTTP
+        """
+        if self._http is None:
+            return None
+        host, port = self._http.server_address[:2]
+        return 'http://%s:%d/' % (host, port)
+
+    @property
+    def base_url(self):
+        """
+        The base URL of the API, for settings.other['base_url']
+        """
+        if self._http is None:
+            return None
+        return self.url + 'api/v3/client/{client_code}/'
+
+    @property
+    def bank_holidays_url(self):
+        """
+        The URL of the bank holidays, for
+        settings.other['bank_holidays_url']
+        """
+        if self._http is None:
+            return None
+        return self.url + 'bank-holidays.json'
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep connections alive, as EazyCustomerManager does
+    protocol_version = 'HTTP/1.1'
+    # Send small responses at once, rather than waiting for an ACK
+    disable_nagle_algorithm = True
+
+    def _answer(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        url = urlsplit(self.path)
+        ecm3 = self.server.ecm3
+        latency, response = ecm3.handle(
+            self.command, url.path, parse_qsl(url.query), self.headers
+        )
+        if response is None:
+            # Hold the request open, then drop it without an answer
+            ecm3._stopped.wait(ecm3.hang)
+            self.close_connection = True
+            return
+        if latency and ecm3._stopped.wait(latency):
+            self.close_connection = True
+            return
+        body = response.text.encode('utf-8')
+        self.send_response(response.status_code)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _answer
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeTransport:
+    def __init__(self, server):
+        """
+        Creates a transport answering requests from a FakeECM3 in the
+        same process, without opening any sockets. It can replace the
+        transport of an EazySDK session.
+
+        :Required args:
+        - server - The FakeECM3 requests are answered by
+
+        :Example:
+        client.session.transport = FakeTransport(FakeECM3())
+        """
+        self.server = server
+
+    def request(self, method, url, params=None, headers=None, timeout=None,
+                **kwargs):
+        """
+        Answer a request from the stand-in server, waiting for its
+        latency, and raising ReadTimeout if it would not be answered
+        within the read timeout
+
+        :Returns:
+        FakeResponse(status_code, headers, text)
+        """
+        from requests.exceptions import ReadTimeout
+        latency, response = self.server.handle(method, url, params, headers)
+        read = timeout[1] if timeout else None
+        if response is None or read is not None and latency > read:
+            if response is None:
+                latency = self.server.hang
+            sleep(latency if read is None else min(latency, read))
+            raise ReadTimeout(
+                'The stand-in server did not respond to %s %s in time.'
+                % (method, url)
+            )
+        if latency:
+            sleep(latency)
+        return response
+
+    def stats(self):
+        """
+        Return the number of requests answered by the stand-in server.
+        See FakeECM3.stats.
+        """
+        return self.server.stats()
+
+
+class AsyncFakeTransport:
+    def __init__(self, server):
+        """
+        Creates a transport answering requests from a FakeECM3 in the
+        same process, which can replace the transport of an
+        AsyncEazySDK session. See FakeTransport.
+
+        :Required args:
+        - server - The FakeECM3 requests are answered by
+
+        :Example:
+        client.session.transport = AsyncFakeTransport(FakeECM3())
+        """
+        self.server = server
+
+    async def request(self, method, url, params=None, headers=None,
+                      timeout=None, deadline=None, **kwargs):
+        """
+        Answer a request from the stand-in server, waiting for its
+        latency
+
+        :Returns:
+        AsyncResponse(status_code, headers, text)
+        """
+        from asyncio import sleep as async_sleep
+        from .aio import AsyncResponse
+        latency, response = self.server.handle(method, url, params, headers)
+        if latency:
+            await async_sleep(latency)
+        return AsyncResponse(*response)
+
+    async def close(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _params(params):
+    # Parameters are sent as strings, the same way requests encodes them
+    if not params:
+        return {}
+    if isinstance(params, dict):
+        params = params.items()
+    return {
+        name: value if isinstance(value, str) else str(value)
+        for name, value in params if value is not None
+    }
+
+
+def _record(params):
+    # ECM3 returns the fields it was sent with their first letter raised
+    return {name[:1].upper() + name[1:]: value
+            for name, value in params.items()}
@@ -1,17 +1,36 @@
-from .session import Session
+from .session import default_session
+from .session import request_steps
 from .settings import Settings as s
 from warnings import warn
 from .exceptions import common_exceptions_decorator
 from .exceptions import InvalidParameterError
+from .exceptions import RequestTimeoutError
+from .exceptions import ServerError
+from .timeouts import timeout
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from contextvars import copy_context
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from .codec import loads
+
+# The most payments EazyCustomerManager returns for a contract
+max_payment_rows = 100
 
 class Get:
-    def __init__(self):
+    def __init__(self, session=None):
         """
         A collection of GET requests made to the ECM3 API
         """
-        self.sdk = Session()
+        if session is None:
+            session = default_session()
+        self.sdk = session
 
     @common_exceptions_decorator
+    @request_steps
     def callback_url(self, entity):
         """
         Get the current callback URL for given entity from ECM3
@@ -28,8 +47,7 @@ class Get:
                                         "of either 'contract', 'customer' or "
                                         "'payment'.".format(entity))
 
-        self.sdk.endpoint = 'BACS/{}/callback'.format(entity)
-        response = self.sdk.get()
+        response = yield self.sdk.get('BACS/{}/callback'.format(entity))
         # NULL will be returned if a callback URL does not exist
         if str(response) == '{"Message":null}':
             return 'A callback URL has not been set'
@@ -38,6 +56,7 @@ class Get:
             return 'The callback URL is {}'.format(response['Message'])
 
     @common_exceptions_decorator
+    @request_steps
     def customers(self, email='', title='', search_from='', search_to='',
                   date_of_birth='', customer_reference='', first_name='',
                   surname='', company_name='', post_code='', account_number='',
@@ -93,47 +112,13 @@ class Get:
         method_arguments = locals()
         # We will not be passing self into ECM3
         del method_arguments['self']
-        # A set of pythonic arguments and their ECM3 counterparts
-        conversions = {
-            'email': 'email',
-            'title': 'title',
-            'date_of_birth': 'dateOfBirth',
-            'search_from': 'from',
-            'search_to': 'to',
-            'customer_reference': 'customerRef',
-            'first_name': 'firstName',
-            'surname': 'surname',
-            'company_name': 'companyName',
-            'post_code': 'postCode',
-            'account_number': 'accountNumber',
-            'sort_code': 'bankSortCode',
-            'account_holder_name': 'accountHolderName',
-            'home_phone': 'homePhoneNumber',
-            'work_phone': 'workPhoneNumber',
-            'mobile_phone': 'mobilePhoneNumber',
-        }
-
-        parameters = {}
-        key = None
         if s.warnings['customer_search'] and all(
                 value == '' for value in method_arguments.values()):
             warn('Retrieving customers without using any search times '
                  'may take some time.')
+        parameters = customer_search_parameters(method_arguments)
 
-        try:
-            for key, value in method_arguments.items():
-                if value != '':
-                    parameters.update({conversions[key]: value})
-        except KeyError:
-            # Raise custom error if the passed parameter is not defined
-            raise InvalidParameterError(
-                '%s is not an acceptable argument for this call, refer'
-                'to the man page for all available arguments' % key
-            )
-
-        self.sdk.endpoint = 'customer'
-        self.sdk.params = parameters
-        response = self.sdk.get()
+        response = yield self.sdk.get('customer', parameters)
 
         if str(response) != '{"Customers":[]}':
             return response
@@ -141,7 +126,117 @@ class Get:
             return 'No customers could be found using the search terms:' \
                    '%s' % parameters
 
+    def stream_customers(self, chunk_size=65536, **criteria):
+        """
+        Search for customers in ECM3, yielding each customer as a
+        dictionary as the response arrives. Only the customer being read
+        is held in memory, so a full customer book can be read without
+        holding the whole response. Streamed searches are never cached.
+        With the AsyncEazySDK, the customers are read with async for.
+
+        :Args:
+        - chunk_size - The number of bytes read from the response at a
+            time. By default, this is set to 65536.
+        - criteria - Any argument of customers(), such as surname. By
+            default, every customer is returned.
+
+        :Example:
+        for customer in stream_customers(search_from='2019-01-01'):
+            print(customer['Id'])
+
+        :Returns:
+        an iterator of customer dictionaries
+        """
+        return self.sdk.stream(
+            self.sdk.get('customer', customer_search_parameters(criteria)),
+            'Customers', chunk_size,
+        )
+
+    def iter_customers(self, search_from, search_to='', workers=4,
+                       windows=None, max_customers=1000, window_seconds=30,
+                       **criteria):
+        """
+        Search for the customers added between two dates, splitting the
+        dates into windows which are searched concurrently. Each
+        customer is yielded as a dictionary as soon as its window has
+        been searched, and only once.
+
+        A window which times out or fails on EazyCustomerManager is
+        split in two, and each half is searched instead. If a window
+        holds max_customers or more customers, the windows not yet
+        searched are split in two, as they are likely to be as large.
+
+        :Args:
+        - search_from - The date of the first customers searched for
+        - search_to - The date the search stops at. By default, every
+            customer added up to today is searched for.
+        - workers - The number of windows searched at once. By
+            default, this is set to 4.
+        - windows - The number of windows the dates are split into at
+            first. By default, this is four times the number of workers.
+        - max_customers - The number of customers in a window after
+            which the remaining windows are split. By default, this is
+            set to 1000.
+        - window_seconds - The number of seconds a window may take
+            before it is split. By default, this is set to 30.
+        - criteria - Any other argument of customers(), such as surname
+
+        :Example:
+        for customer in iter_customers('2019-01-01', '2020-01-01'):
+            print(customer['Id'])
+
+        :Returns:
+        an iterator of customer dictionaries
+        """
+        pending = deque(customer_windows(
+            search_from, search_to, windows or workers * 4
+        ))
+        seen = set()
+        running = {}
+        pool = ThreadPoolExecutor(workers)
+        try:
+            while pending or running:
+                # Fill the free workers, each searching in the context
+                # of the caller, so its timeouts apply
+                while pending and len(running) < workers:
+                    window = pending.popleft()
+                    running[pool.submit(
+                        copy_context().run, self._customer_window, window,
+                        window_seconds, criteria,
+                    )] = window
+                done = wait(running, return_when=FIRST_COMPLETED)[0]
+                for future in done:
+                    window = running.pop(future)
+                    try:
+                        customers = future.result()
+                    except (RequestTimeoutError, ServerError):
+                        halves = bisect_window(window)
+                        if halves is None:
+                            raise
+                        pending.extendleft(reversed(halves))
+                        continue
+                    if len(customers) >= max_customers:
+                        pending = split_windows(pending)
+                    for customer in customers:
+                        if customer['Id'] not in seen:
+                            seen.add(customer['Id'])
+                            yield customer
+        finally:
+            # A caller which stops early does not wait for the windows
+            # still being searched
+            for future in running:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def _customer_window(self, window, seconds, criteria):
+        with timeout(deadline=seconds):
+            return customer_records(self.customers(
+                search_from=str(window[0]), search_to=str(window[1]),
+                **criteria
+            ))
+
     @common_exceptions_decorator
+    @request_steps
     def contracts(self, customer):
         """
         Return all contracts belonging to a specified customer.
@@ -155,8 +250,7 @@ class Get:
         :Returns:
         contract json objects
         """
-        self.sdk.endpoint = 'customer/%s/contract' % customer
-        response = self.sdk.get()
+        response = yield self.sdk.get('customer/%s/contract' % customer)
 
         if '"Contracts":[]' in str(response):
             return 'The customer %s does not own any contracts' % customer
@@ -164,6 +258,7 @@ class Get:
             return response
 
     @common_exceptions_decorator
+    @request_steps
     def payments(self, contract, number_of_rows=100):
         """
         Return all payments belonging to a contract.
@@ -180,16 +275,71 @@ class Get:
         :Returns:
         payment json objects
         """
-        self.sdk.endpoint = '/contract/%s/payment' % contract
-        self.sdk.params = {'rows': number_of_rows}
-        response = self.sdk.get()
+        response = yield self.sdk.get(
+            '/contract/%s/payment' % contract, {'rows': number_of_rows}
+        )
 
         if response == '{"Payments":[]}':
             return 'This contract does not own any payments.'
 
         return response
 
+    def iter_payments(self, contracts, prefetch=1):
+        """
+        Iterate over at most 100 payments of each of one or more
+        contracts. This does not page: EazyCustomerManager has no way to
+        ask for the payments after the first 100 of a contract.
+
+        Each payment is yielded as a dictionary. While the payments of a
+        contract are being read, the payments of the next contracts are
+        fetched in the background. If a contract returns 100 payments,
+        older payments may be missing, and you will be warned if
+        settings.warnings['payment_rows'] is set to True.
+
+        :Args:
+        - contracts - The GUID of a contract, or an iterable of GUIDs
+        - prefetch - The number of contracts fetched ahead of the
+            contract being read. By default, this is set to 1.
+
+        :Example:
+        for payment in iter_payments(['ab09362d-...', '36bb4f4f-...']):
+            print(payment['Amount'])
+
+        :Returns:
+        an iterator of payment dictionaries
+        """
+        if isinstance(contracts, str):
+            contracts = [contracts]
+        contracts = iter(contracts)
+        pending = deque()
+        pool = ThreadPoolExecutor(max(prefetch, 1))
+        try:
+            while True:
+                # Keep the next contracts in flight, each fetched in the
+                # context of the caller, so its timeouts apply
+                while len(pending) <= prefetch:
+                    contract = next(contracts, None)
+                    if contract is None:
+                        break
+                    pending.append((contract, pool.submit(
+                        copy_context().run, self._payment_records, contract,
+                    )))
+                if not pending:
+                    return
+                contract, future = pending.popleft()
+                yield from check_payment_rows(contract, future.result())
+        finally:
+            # A caller which stops early does not wait for the contracts
+            # fetched ahead of it
+            for contract, future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def _payment_records(self, contract):
+        return payment_records(self.payments(contract, max_payment_rows))
+
     @common_exceptions_decorator
+    @request_steps
     def payments_single(self, contract, payment):
         """
         Return an individual payment from a specific contract
@@ -205,12 +355,14 @@ class Get:
         :Returns:
         payment json objects
         """
-        self.sdk.endpoint = '/contract/%s/payment/%s/' % (contract, payment)
-        response = self.sdk.get()
+        response = yield self.sdk.get(
+            '/contract/%s/payment/%s/' % (contract, payment)
+        )
 
         return response
 
     @common_exceptions_decorator
+    @request_steps
     def schedules(self):
         """
         Return all available schedules from ECM3
@@ -218,7 +370,7 @@ class Get:
         NOTE: You should not need to run this command manually without
         exceptional circumstance. The SDK will automatically get a list
         of available schedules when first ran, and place them in the
-        /includes folder, named sandbox.csv and ecm3.csv respectively.
+        cache directory, named sandbox.csv and ecm3.csv respectively.
 
         :Example:
         schedules()
@@ -226,6 +378,145 @@ class Get:
         :Returns:
         schedule json objects
         """
-        self.sdk.endpoint = 'schedules'
-        response = self.sdk.get()
+        response = yield self.sdk.get('schedules')
         return response
+
+
+def payment_records(response):
+    """ Return the payments in a response to Get.payments as a list of
+    dictionaries.
+
+    :Args:
+    response - The response of Get.payments
+    """
+    if response == 'This contract does not own any payments.':
+        return []
+    return loads(response)['Payments']
+
+
+def check_payment_rows(contract, payments):
+    """ Warn if a contract may hold more payments than were returned,
+    as EazyCustomerManager returns at most 100 payments for a contract.
+    """
+    if len(payments) >= max_payment_rows and s.warnings['payment_rows']:
+        warn('Contract %s returned %d payments, the most'
+             ' EazyCustomerManager returns for a contract. Older payments'
+             ' may be missing.' % (contract, len(payments)))
+    return payments
+
+
+# The arguments of a customer search and their ECM3 counterparts
+customer_search_conversions = {
+    'email': 'email',
+    'title': 'title',
+    'date_of_birth': 'dateOfBirth',
+    'search_from': 'from',
+    'search_to': 'to',
+    'customer_reference': 'customerRef',
+    'first_name': 'firstName',
+    'surname': 'surname',
+    'company_name': 'companyName',
+    'post_code': 'postCode',
+    'account_number': 'accountNumber',
+    'sort_code': 'bankSortCode',
+    'account_holder_name': 'accountHolderName',
+    'home_phone': 'homePhoneNumber',
+    'work_phone': 'workPhoneNumber',
+    'mobile_phone': 'mobilePhoneNumber',
+}
+
+
+def customer_search_parameters(arguments):
+    """ Return the ECM3 parameters of a customer search, leaving out
+    arguments which are empty.
+
+    :Args:
+    arguments - A dictionary of the arguments of Get.customers
+    """
+    parameters = {}
+    for key, value in arguments.items():
+        if key not in customer_search_conversions:
+            # Raise custom error if the passed parameter is not defined
+            raise InvalidParameterError(
+                '%s is not an acceptable argument for this call, refer'
+                'to the man page for all available arguments' % key
+            )
+        if value != '':
+            parameters[customer_search_conversions[key]] = value
+    return parameters
+
+
+def customer_records(response):
+    """ Return the customers in a response to Get.customers as a list of
+    dictionaries.
+
+    :Args:
+    response - The response of Get.customers
+    """
+    if response.startswith('No customers could be found'):
+        return []
+    return loads(response)['Customers']
+
+
+def customer_windows(search_from, search_to='', count=1):
+    """ Split the dates of a customer search into a number of windows
+    of about the same length. Each window is a (start, end) pair of
+    dates, and ends on the date the next window starts, so a customer
+    added on that date may be found by both windows.
+
+    :Args:
+    search_from - The date the search starts at
+    search_to - The date the search ends at. By default, this is
+        tomorrow, so customers added today are found.
+    count - The number of windows, if the dates are long enough
+    """
+    start = _search_date(search_from)
+    if search_to:
+        end = _search_date(search_to)
+    else:
+        end = date.today() + timedelta(days=1)
+    if end <= start:
+        raise InvalidParameterError(
+            'search_to must be after search_from.'
+        )
+    days = (end - start).days
+    count = max(min(count, days), 1)
+    bounds = [start + timedelta(days=days * i // count)
+              for i in range(count)] + [end]
+    return list(zip(bounds, bounds[1:]))
+
+
+def bisect_window(window):
+    """ Split a window of a customer search in two, or return None if
+    it is a single day and cannot be split.
+    """
+    start, end = window
+    days = (end - start).days
+    if days < 2:
+        return None
+    middle = start + timedelta(days=days // 2)
+    return [(start, middle), (middle, end)]
+
+
+def split_windows(windows):
+    """ Split every window of a customer search which can be split in
+    two.
+    """
+    split = deque()
+    for window in windows:
+        split.extend(bisect_window(window) or [window])
+    return split
+
+
+def _search_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    elif isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+    except ValueError:
+        raise InvalidParameterError(
+            '%s is not a valid date. Dates must be in the format'
+            ' YYYY-MM-DD.' % value
+        )
@@ -1,10 +1,32 @@
 from __future__ import unicode_literals
 from __future__ import absolute_import
-from .get import Get
-from .post import Post
-from .patch import Patch
-from .delete import Delete
+from threading import RLock
 from .settings import Settings
+from .timeouts import timeout
+
+
+class lazy:
+    """
+    A property built on first access and then kept on the instance, so
+    the modules behind it are only imported when it is first used
+    """
+    # Shared by every instance, so two threads never build the same
+    # property twice
+    _lock = RLock()
+
+    def __init__(self, function):
+        self.function = function
+        self.name = function.__name__
+        self.__doc__ = function.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        with self._lock:
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.function(instance)
+        return instance.__dict__[self.name]
+
 
 class EazySDK:
     """
@@ -12,7 +34,144 @@ class EazySDK:
     """
     def __init__(self):
         self.settings = Settings()
-        self.get = Get()
-        self.post = Post()
-        self.patch = Patch()
-        self.delete = Delete()
+
+    @lazy
+    def transport(self):
+        """
+        A single pooled transport shared by every request method
+        """
+        from .transport import Transport
+        return Transport()
+
+    @lazy
+    def session(self):
+        """
+        Requests are built per call, so one session is safely shared by
+        every request method and thread using this instance
+        """
+        from .session import Session
+        return Session(self.transport)
+
+    @lazy
+    def get(self):
+        """
+        A collection of GET requests made to the ECM3 API
+        """
+        from .get import Get
+        return Get(self.session)
+
+    @lazy
+    def post(self):
+        """
+        A collection of POST requests made to the ECM3 API
+        """
+        from .post import Post
+        return Post(self.session)
+
+    @lazy
+    def patch(self):
+        """
+        A collection of PATCH requests made to the ECM3 API
+        """
+        from .patch import Patch
+        return Patch(self.session)
+
+    @lazy
+    def delete(self):
+        """
+        A collection of DELETE requests made to the ECM3 API
+        """
+        from .delete import Delete
+        return Delete(self.session)
+
+    def pool_stats(self):
+        """
+        Return the usage statistics of the connection pool shared by
+        this instance of the EazySDK
+
+        :Example:
+        pool_stats()
+
+        :Returns:
+        {'hosts': {...}, 'connections': 1, 'requests': 10,
+         'idle_connections': 1, 'reuse_ratio': 0.9}
+        """
+        return self.transport.stats()
+
+    def retry_stats(self):
+        """
+        Return the number of requests retried by this instance of the
+        EazySDK after a transient error, in total and by HTTP method,
+        and the number of retryable failures it gave up on
+
+        :Example:
+        retry_stats()
+
+        :Returns:
+        {'retries': 3, 'by_method': {'GET': 3}, 'gave_up': 1}
+        """
+        return self.session.retry_policy.stats()
+
+    def circuit_stats(self):
+        """
+        Return the state of the circuit breaker of this instance of the
+        EazySDK for each environment and family of endpoints. A circuit
+        is closed while requests succeed, open while requests fail fast
+        with a CircuitOpenError, and half-open while a trial request is
+        deciding whether to close it again.
+
+        :Example:
+        circuit_stats()
+
+        :Returns:
+        {'sandbox': {'customer': {'state': 'open', 'failures': 0,
+                                  'retry_in': 12.5}}}
+        """
+        return self.session.circuit_breaker.stats()
+
+    def coalescing_stats(self):
+        """
+        Return the number of GET requests sent by this instance of the
+        EazySDK, and the number of identical GET requests which shared
+        the response of one already in flight rather than being sent
+
+        :Example:
+        coalescing_stats()
+
+        :Returns:
+        {'sent': 10, 'shared': 25}
+        """
+        return self.session.flights.stats()
+
+    def cache_stats(self):
+        """
+        Return the number of GET requests answered from the response
+        cache of this instance of the EazySDK, the number which missed
+        it, and the number and total size of the responses it holds
+
+        :Example:
+        cache_stats()
+
+        :Returns:
+        {'hits': 30, 'misses': 10, 'evictions': 0, 'entries': 10,
+         'bytes': 20480}
+        """
+        return self.session.cache.stats()
+
+    def timeout(self, connect=None, read=None, deadline=None):
+        """
+        Override the timeouts in settings.timeouts for every call made
+        inside the block. The deadline is shared by the validation and
+        the requests of those calls.
+
+        :Optional args:
+        - connect - The number of seconds to wait for a connection
+        - read - The number of seconds to wait between bytes of a
+            response
+        - deadline - The total number of seconds the calls may take
+
+        :Example:
+        with timeout(deadline=10):
+            post.contract(...)
+        """
+        return timeout(connect, read, deadline)
@@ -1,4 +1,5 @@
-from .session import Session
+from .session import default_session
+from .session import request_steps
 from .exceptions import common_exceptions_decorator
 from .exceptions import InvalidParameterError
 from .exceptions import ResourceNotFoundError
@@ -9,14 +10,17 @@ from .utils import payment_checks
 
 
 class Patch:
-    def __init__(self):
+    def __init__(self, session=None):
         """
         A collection of PATCH requests made to the EazyCustomerManager
         API
         """
-        self.sdk = Session()
+        if session is None:
+            session = default_session()
+        self.sdk = session
 
     @common_exceptions_decorator
+    @request_steps
     def customer(self, customer, email='', title='', date_of_birth='',
                  first_name='', surname='', company_name='', line1='',
                  post_code='', account_number='', sort_code='',
@@ -122,9 +126,7 @@ class Patch:
                 '12345678', '123456', account_holder_name
             )
 
-        self.sdk.endpoint = 'customer/%s' % customer
-        self.sdk.params = parameters
-        response = self.sdk.patch()
+        response = yield self.sdk.patch('customer/%s' % customer, parameters)
 
         if 'Customer updated' in response:
             return 'customer %s updated successfully' % customer
@@ -132,6 +134,7 @@ class Patch:
         return response
 
     @common_exceptions_decorator
+    @request_steps
     def contract_amount(self, contract, collection_amount, comment):
         """
         Modify a contract_amount in EazyCustomerManager. It is
@@ -171,9 +174,9 @@ class Patch:
                 )
         payment_checks.check_collection_amount(collection_amount)
 
-        self.sdk.endpoint = 'contract/%s/amount' % contract
-        self.sdk.params = parameters
-        response = self.sdk.patch()
+        response = yield self.sdk.patch(
+            'contract/%s/amount' % contract, parameters
+        )
 
         if 'Contract updated' in response:
             return 'Contract %s collection amount has been updated to %s' \
@@ -185,6 +188,7 @@ class Patch:
         return response
 
     @common_exceptions_decorator
+    @request_steps
     def contract_day_weekly(self, contract, new_day, comment,
                             amend_next_payment, next_payment_amount=''):
         # Get all method arguments
@@ -211,9 +215,9 @@ class Patch:
             )
 
         #contract_checks.check_payment_day_in_week(new_day)
-        self.sdk.endpoint = 'contract/%s/weekly' % contract
-        self.sdk.params = parameters
-        response = self.sdk.patch()
+        response = yield self.sdk.patch(
+            'contract/%s/weekly' % contract, parameters
+        )
 
         if 'Contract updated' in response:
             return 'Contract %s day updated to %s' % (contract, str(new_day))
@@ -225,6 +229,7 @@ class Patch:
         return response
 
     @common_exceptions_decorator
+    @request_steps
     def contract_date_monthly(self, contract, new_day, comment,
                               amend_next_payment, next_payment_amount=''):
         """
@@ -278,9 +283,9 @@ class Patch:
             )
 
         contract_checks.check_payment_day_in_month(new_day)
-        self.sdk.endpoint = 'contract/%s/monthly' % contract
-        self.sdk.params = parameters
-        response = self.sdk.patch()
+        response = yield self.sdk.patch(
+            'contract/%s/monthly' % contract, parameters
+        )
 
         if 'Contract updated' in response:
             return 'Contract %s day updated to %s' % (contract, str(new_day))
@@ -291,6 +296,7 @@ class Patch:
         return response
 
     @common_exceptions_decorator
+    @request_steps
     def contract_date_annually(self, contract, new_day, new_month, comment,
                                amend_next_payment, next_payment_amount=''):
         """
@@ -346,9 +352,9 @@ class Patch:
                 ' set to true.'
             )
         contract_checks.check_payment_day_in_month(new_day)
-        self.sdk.endpoint = 'contract/%s/annual' % contract
-        self.sdk.params = parameters
-        response = self.sdk.patch()
+        response = yield self.sdk.patch(
+            'contract/%s/annual' % contract, parameters
+        )
 
         if 'Contract updated' in response:
             return 'Contract %s day updated to %s and month updated to %s' \
@@ -360,6 +366,7 @@ class Patch:
         return response
 
     @common_exceptions_decorator
+    @request_steps
     def payment(self, contract, payment, collection_amount, collection_date,
                 comment):
         """
@@ -404,8 +411,8 @@ class Patch:
             del parameters['date']
             parameters.update({'date': collection})
 
-        self.sdk.endpoint = 'contract/%s/payment/%s' % (contract, payment)
-        self.sdk.params = parameters
-        response = self.sdk.patch()
+        response = yield self.sdk.patch(
+            'contract/%s/payment/%s' % (contract, payment), parameters
+        )
 
         return response
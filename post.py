@@ -1,6 +1,12 @@
-from .session import Session
+from .session import default_session
+from .session import request_steps
 from .settings import Settings as s
 from warnings import warn
+from hashlib import sha1
+from .codec import dumps
+from .codec import loads
+from .bulk import created_id
+from .bulk import pipeline
 from .utils import customer_checks
 from .utils import contract_checks
 from .utils import payment_checks
@@ -13,13 +19,16 @@ from .exceptions import RecordAlreadyExistsError
 
 
 class Post:
-    def __init__(self):
+    def __init__(self, session=None):
         """
         A collection of POST requests made to the ECM3 API
         """
-        self.sdk = Session()
+        if session is None:
+            session = default_session()
+        self.sdk = session
 
     @common_exceptions_decorator
+    @request_steps
     def callback_url(self, entity, callback_url):
         """
         Create or update the endpoint for given entity data returned from ECM3
@@ -39,11 +48,11 @@ class Post:
                                         "one of either 'contract', 'customer' "
                                         "or 'payment'.".format(entity))
 
-        self.sdk.endpoint = 'BACS/{}/callback'.format(entity)
-        self.sdk.params = {
-            'url': callback_url
-        }
-        response = self.sdk.post()
+        # Setting the same callback URL twice has no further effect
+        response = yield self.sdk.post(
+            'BACS/{}/callback'.format(entity), {'url': callback_url},
+            retry=True,
+        )
 
         if 'ExceptionMessage' in str(response):
             raise EazySDKException(
@@ -58,6 +67,7 @@ class Post:
         return 'The new callback URL is %s' % callback_url
 
     @common_exceptions_decorator
+    @request_steps
     def customer(self, email, title, customer_reference, first_name, surname,
                  line1, post_code, account_number, sort_code,
                  account_holder_name, line2='', line3='', line4='',
@@ -107,69 +117,83 @@ class Post:
         method_arguments = locals()
         # We will not be passing self into ECM3
         del method_arguments['self']
-        # A set of pythonic arguments and their ECM3 counterparts
-        conversions = {
-            'email': 'email',
-            'title': 'title',
-            'customer_reference': 'customerRef',
-            'first_name': 'firstName',
-            'surname': 'surname',
-            'line1': 'line1',
-            'post_code': 'postCode',
-            'account_number': 'accountNumber',
-            'sort_code': 'bankSortCode',
-            'account_holder_name': 'accountHolderName',
-            'line2': 'line2',
-            'line3': 'line3',
-            'line4': 'line4',
-            'company_name': 'companyName',
-            'date_of_birth': 'dateOfBirth',
-            'initials': 'initials',
-            'home_phone': 'homePhone',
-            'work_phone': 'workPhone',
-            'mobile_phone': 'mobilePhone',
-        }
-        parameters = {}
+        parameters = customer_parameters(method_arguments)
+        return (yield from self._create_customer(parameters))
 
-        required_parameters = [
-            'email',
-            'title',
-            'customer_reference',
-            'first_name',
-            'surname',
-            'line1',
-            'post_code',
-            'account_number',
-            'sort_code',
-            'account_holder_name',
-        ]
+    @common_exceptions_decorator
+    @request_steps
+    def validated_customer(self, parameters):
+        """
+        Create a customer in ECM3 from parameters which have already
+        been validated by customer_parameters(), such as by the
+        validation stage of bulk_customers()
 
-        key = None
-        try:
-            for key, value in method_arguments.items():
-                if key in required_parameters and value == '':
-                    raise InvalidParameterError(
-                        '%s cannot be empty.' % key
-                    )
-                elif value != '':
-                    parameters.update({conversions[key]: value})
-        except KeyError:
-            raise ParameterNotAllowedError(
-                '%s is not an acceptable argument for this call, refer'
-                'to the man page for all available arguments' % key
-            )
+        :Required args:
+        - parameters - The ECM3 parameters of the new customer
+
+        :Example:
+        validated_customer(customer_parameters(row))
+
+        :Returns:
+        customer json object
+        """
+        return (yield from self._create_customer(parameters))
 
-        # A collection of tests against required params
-        customer_checks.check_postcode_is_valid_uk_format(post_code)
-        customer_checks.check_email_address_format(email)
-        customer_checks.check_bank_details_format(
-            account_number, sort_code, account_holder_name
+    def bulk_customers(self, rows, workers=4, checkpoint=None):
+        """
+        Create many customers in ECM3, yielding the result of each row as
+        soon as it is known. Every row is validated before it is
+        submitted, and valid rows are submitted concurrently, so results
+        are not in the order of the rows.
+
+        :Required args:
+        - rows - An iterable of dictionaries holding the arguments of
+            customer(), or the path of a CSV file with a column for
+            each argument
+
+        :Optional args:
+        - workers - The number of customers created at once. By
+            default, this is set to 4.
+        - checkpoint - The path of a checkpoint file. The customer
+            reference of every customer created is recorded in it, and
+            rows already recorded are not submitted again, so an
+            interrupted run can be started again.
+
+        :Example:
+        for result in bulk_customers('customers.csv', workers=8,
+                                     checkpoint='customers.checkpoint'):
+            if not result.ok:
+                print(result.row, result.key, result.error)
+
+        :Returns:
+        an iterator of RowResult(row, key, id, error, resumed)
+        """
+        return pipeline(
+            rows, customer_parameters,
+            lambda parameters: created_id(
+                self.validated_customer(parameters), 'Customer'
+            ),
+            customer_key, workers, checkpoint,
         )
-        self.sdk.endpoint = 'customer'
-        self.sdk.params = parameters
-        response = self.sdk.post()
+
+    def _create_customer(self, parameters):
+        customer_reference = parameters['customerRef']
+        # Customer references are unique, so a retried request which
+        # reports a duplicate can be matched to the customer it created
+        response = yield self.sdk.post('customer', parameters, retry=True)
         if 'There is an existing Customer with the same Client and Customer' \
            ' ref in the database already' in str(response):
+            if getattr(response, 'attempts', 1) > 1:
+                existing = yield self.sdk.get(
+                    'customer', {'customerRef': customer_reference}
+                )
+                try:
+                    for record in loads(existing)['Customers']:
+                        if record['CustomerRef'] == customer_reference \
+                                and record['Email'] == parameters['email']:
+                            return dumps({'Customer': record})
+                except (TypeError, ValueError, KeyError):
+                    pass
             raise RecordAlreadyExistsError(
                 'A customer with the given customer_reference already exists.'
                 ' Please change the customer reference and re-submit.'
@@ -177,6 +201,7 @@ class Post:
         return response
 
     @common_exceptions_decorator
+    @request_steps
     def contract(self, customer, schedule_name, start_date, gift_aid,
                  termination_type, at_the_end, number_of_debits='',
                  frequency='', initial_amount='', extra_initial_amount='',
@@ -217,7 +242,7 @@ class Post:
         - final_amount - Used if the final collection amount is
             different from the rest. Not to be used on ad-hoc contracts.
         - payment_month_in_year - The collection month for annual
-            contracts. Jan = 0, Dec = 11
+            contracts. Jan = 1, Dec = 12
         - payment_day_in_month - The collection day for monthly
             contracts. Accepts 1-28 or 'last day of month'
         - payment_day_in_week - The collection day for weekly contracts.
@@ -242,210 +267,81 @@ class Post:
         # We will not need self or customer when passing parameters
         del method_arguments['self']
         del method_arguments['customer']
-        # A set of pythonic arguments and their ECM3 counterparts
-        conversions = {
-            'schedule_name': 'scheduleName',
-            'start_date': 'start',
-            'gift_aid': 'isGiftAid',
-            'termination_type': 'terminationType',
-            'at_the_end': 'atTheEnd',
-            'number_of_debits': 'numberOfDebits',
-            'frequency': 'every',
-            'initial_amount': 'initialAmount',
-            'extra_initial_amount': 'extraInitialAmount',
-            'payment_amount': 'amount',
-            'final_amount': 'finalAmount',
-            'payment_month_in_year': 'paymentMonthInYear',
-            'payment_day_in_month': 'paymentDayInMonth',
-            'payment_day_in_week': 'paymentDayInWeek',
-            'termination_date': 'terminationDate',
-            'additional_reference': 'additionalReference',
-            'custom_dd_reference': 'customDirectDebitRef',
-        }
-        parameters = {}
-        # Contract validations
-        sched = contract_checks.check_schedule_name(schedule_name)
-        ad_hoc = contract_checks.ad_hoc_checker(schedule_name)
-        start = contract_checks.check_start_date(start_date)
-        term = contract_checks.check_termination_type(termination_type)
-        ate = contract_checks.check_at_the_end(at_the_end)
+        parameters = contract_parameters(method_arguments)
+        return (yield from self._create_contract(customer, parameters))
 
-        # Avoid non-assignment warnings
-        key = None
-        try:
-            for key, value in method_arguments.items():
-                if value != '':
-                    parameters.update({conversions[key]: value})
-        except KeyError:
-            raise ParameterNotAllowedError(
-                '%s is not an acceptable argument for this call, refer'
-                ' to the man page for all available arguments' % key
-            )
+    @common_exceptions_decorator
+    @request_steps
+    def validated_contract(self, customer, parameters):
+        """
+        Create a contract in ECM3 from parameters which have already
+        been validated by contract_parameters(), such as by the
+        validation stage of bulk_contracts()
 
-        if start:
-            del parameters['start']
-            parameters.update({'start': start})
-
-        if not ad_hoc:
-            if termination_type.lower() != 'until further notice':
-                if s.contracts['auto_fix_ad_hoc_termination_type']:
-                    warn('Termination type must be Until Further Notice on'
-                         ' ad_hoc contracts. This has been automatically '
-                         'applied.')
-                    del parameters['terminationType']
-                    parameters.update(
-                        {'terminationType': 'until further notice'}
-                    )
-                else:
-                    raise InvalidParameterError(
-                        'termination_type must be set to Until Further Notice'
-                        ' on ad_hoc contracts'
-                    )
-            if at_the_end.lower() != 'switch to further notice':
-                if s.contracts['auto_fix_ad_hoc_at_the_end']:
-                    warn('At the end must be Switch To Further Notice on'
-                         ' ad_hoc contracts. This has been automatically '
-                         'applied.')
-                    del parameters['atTheEnd']
-                    parameters.update(
-                        {'atTheEnd': 'switch to further notice'}
-                    )
-                else:
-                    raise InvalidParameterError(
-                        'at_the_end must be set to Switch to further notice on'
-                        'ad_hoc contracts'
-                    )
-            if initial_amount != '':
-                raise ParameterNotAllowedError(
-                    'initial_amount cannot be passed on ad_hoc contracts.'
-                )
-            elif extra_initial_amount != '':
-                raise ParameterNotAllowedError(
-                    'extra_initial_amount cannot be passed on ad_hoc contracts'
-                )
-            elif final_amount != '':
-                raise ParameterNotAllowedError(
-                    'final_amount cannot be passed on ad_hoc contracts'
-                )
-            else:
-                pass
-        else:
-            freq = contract_checks.payment_time_frame_checker(schedule_name)
-            if frequency == '':
-                raise InvalidParameterError(
-                    'frequency must be passed on non-ad_hoc contracts'
-                )
-            elif payment_amount == '':
-                raise InvalidParameterError(
-                    'payment amount must be passed on non-ad_hoc contracts'
-                )
-            elif freq == 0:
-                if payment_day_in_week == '':
-                    raise InvalidParameterError(
-                        'payment_day_in_week must be passed on weekly'
-                        ' contracts'
-                    )
-                else:
-                    contract_checks.check_payment_day_in_week(
-                        payment_day_in_week
-                    )
-            elif freq == 1:
-                if str(payment_day_in_month) != parameters['start'][8:10]:
-                    if s.contracts['auto_fix_payment_day_in_month']:
-                        pdim = parameters['start'][8:10]
-                        del parameters['paymentDayInMonth']
-                        parameters.update({'paymentDayInMonth': pdim})
-                    elif payment_day_in_month == '':
-                        raise InvalidParameterError(
-                            'payment_day_in_month must be passed on monthly'
-                            ' contracts'
-                        )
-                    else:
-                        raise InvalidParameterError(
-                            'payment_day_in_month must be set to %s if the'
-                            ' start date is set to %s'
-                            % (parameters['start'][8:10], parameters['start'])
-                        )
-                else:
-                    contract_checks.check_payment_day_in_month(
-                        payment_day_in_month
-                    )
-            elif freq == 2:
-                if str(payment_month_in_year) not in parameters['start'][5:7]:
-                    if s.contracts['auto_fix_payment_month_in_year']:
-                        pmiy = int(parameters['start'][4:6])
-                        del parameters['paymentMonthInYear']
-                        parameters.update({'paymentMonthInYear': pmiy})
-                    elif payment_month_in_year == '':
-                        raise InvalidParameterError(
-                            'payment_month_in_year must be passed on monthly'
-                            ' contracts'
-                        )
-                    else:
-                        raise InvalidParameterError(
-                            'payment_month_in_year must be set to %s if the'
-                            ' start date is set to %s'
-                            % (parameters['start'][5:7], parameters['start'])
-                        )
-                else:
-                    contract_checks.check_payment_month_in_year(
-                        payment_month_in_year
-                    )
+        :Required args:
+        - customer - The GUID of the customer the new contract will
+            belong to
+        - parameters - The ECM3 parameters of the new contract
 
-                if str(payment_day_in_month) != parameters['start'][8:10]:
-                    if s.contracts['auto_fix_payment_day_in_month']:
-                        pdim = parameters['start'][8:10]
-                        del parameters['paymentDayInMonth']
-                        parameters.update({'paymentDayInMonth': pdim})
-                    elif payment_day_in_month == '':
-                        raise InvalidParameterError(
-                            'payment_day_in_month must be passed on monthly'
-                            ' contracts'
-                        )
-                    else:
-                        raise InvalidParameterError(
-                            'payment_day_in_month must be set to %s if the'
-                            ' start date is set to %s'
-                            % (parameters['start'][8:10], parameters['start'])
-                        )
-            else:
-                contract_checks.check_payment_day_in_month(
-                    payment_day_in_month
-                )
+        :Example:
+        validated_contract('42217d45-cf22-4430-ab02-acc1f8a2d020',
+        contract_parameters(row))
 
-            if term == 0:
-                if number_of_debits == '':
-                    raise InvalidParameterError(
-                        'number_of_debits must be passed if termination_type'
-                        ' is take certain number of debits.'
-                    )
-                else:
-                    contract_checks.check_number_of_debits(number_of_debits)
-            elif term == 1:
-                if ate != 1:
-                    raise InvalidParameterError(
-                        'at_the_end must be set to Switch to Further Notice if'
-                        ' termination_type is set to Until Further Notice'
-                    )
-            elif term == 2:
-                if termination_date == '':
-                    raise InvalidParameterError(
-                        'termination_date must be passed if termination_type'
-                        ' is set to End on Exact Date.'
-                    )
-                else:
-                    date = contract_checks.check_termination_date_is_in_future(
-                        termination_date, start_date
-                    )
-                    if date:
-                        pass
+        :Returns:
+        contract json object
+        """
+        return (yield from self._create_contract(customer, parameters))
+
+    def bulk_contracts(self, rows, workers=4, checkpoint=None, as_of=None):
+        """
+        Create many contracts in ECM3, yielding the result of each row as
+        soon as it is known. The schedules and the earliest start date
+        are looked up once for the whole batch, and every row is
+        validated against them before it is submitted. Valid rows are
+        submitted concurrently, so results are not in the order of the
+        rows.
+
+        :Required args:
+        - rows - An iterable of dictionaries holding the arguments of
+            contract(), including customer, or the path of a CSV file
+            with a column for each argument
+
+        :Optional args:
+        - workers - The number of contracts created at once. By
+            default, this is set to 4.
+        - checkpoint - The path of a checkpoint file. The key of every
+            contract created is recorded in it, and rows already
+            recorded are not submitted again, so an interrupted run can
+            be started again with the same rows in the same order.
+        - as_of - The date the earliest start date is counted from, as a
+            date or an ISO date. By default, this is today.
+
+        :Example:
+        for result in bulk_contracts('contracts.csv',
+                                     checkpoint='contracts.checkpoint'):
+            if not result.ok:
+                print(result.row, result.key, result.error)
+
+        :Returns:
+        an iterator of RowResult(row, key, id, error, resumed)
+        """
+        context = contract_checks.ContractContext(as_of)
+        return pipeline(
+            rows, lambda row: contract_row(row, context),
+            lambda item: created_id(
+                self.validated_contract(*item), 'Contract'
+            ),
+            contract_key, workers, checkpoint,
+        )
 
-        self.sdk.endpoint = 'customer/%s/contract' % customer
-        self.sdk.params = parameters
-        response = self.sdk.post()
+    def _create_contract(self, customer, parameters):
+        response = yield self.sdk.post(
+            'customer/%s/contract' % customer, parameters
+        )
         return response
 
     @common_exceptions_decorator
+    @request_steps
     def cancel_direct_debit(self, contract,):
         """
         Cancel a Direct Debit within ECM3
@@ -467,8 +363,10 @@ class Post:
         :Returns:
         contract json object
         """
-        self.sdk.endpoint = 'contract/%s/cancel' % contract
-        response = self.sdk.post()
+        # Cancelling a cancelled Direct Debit has no further effect
+        response = yield self.sdk.post(
+            'contract/%s/cancel' % contract, retry=True
+        )
 
         if 'Contract not found' in response:
             raise ResourceNotFoundError(
@@ -478,6 +376,7 @@ class Post:
             return response
 
     @common_exceptions_decorator
+    @request_steps
     def archive_contract(self, contract):
         """
         Archive a Direct Debit within ECM3
@@ -501,8 +400,7 @@ class Post:
         :Returns:
         contract json object
         """
-        self.sdk.endpoint = 'contract/%s/archive' % contract
-        response = self.sdk.post()
+        response = yield self.sdk.post('contract/%s/archive' % contract)
 
         if 'Contract is already archived' in response:
             return(
@@ -512,6 +410,7 @@ class Post:
         return response
 
     @common_exceptions_decorator
+    @request_steps
     def reactivate_direct_debit(self, contract):
         """
         Reactivate a Direct Debit within ECM3
@@ -529,11 +428,11 @@ class Post:
         :Returns:
         contract json object
         """
-        self.sdk.endpoint = 'contract/%s/reactivate' % contract
-        response = self.sdk.post()
+        response = yield self.sdk.post('contract/%s/reactivate' % contract)
         return response
 
     @common_exceptions_decorator
+    @request_steps
     def restart_contract(self, contract, termination_type, at_the_end,
                          collection_amount='', initial_amount='',
                          final_amount='', payment_day_in_month='',
@@ -612,9 +511,9 @@ class Post:
                 '%s is not an acceptable argument for this call, refer'
                 ' to the man page for all available arguments' % key
             )
-        self.sdk.params = parameters
-        self.sdk.endpoint = 'contract/%s/restart' % contract
-        response = self.sdk.post()
+        response = yield self.sdk.post(
+            'contract/%s/restart' % contract, parameters
+        )
 
         if 'Contract is not expired.' in response:
             return(
@@ -625,6 +524,7 @@ class Post:
         return response
 
     @common_exceptions_decorator
+    @request_steps
     def payment(self, contract, collection_amount, collection_date,
                 comment, is_credit=False):
         """
@@ -688,9 +588,9 @@ class Post:
             del parameters['date']
             parameters.update({'date': collection})
 
-        self.sdk.endpoint = 'contract/%s/payment' % contract
-        self.sdk.params = parameters
-        response = self.sdk.post()
+        response = yield self.sdk.post(
+            'contract/%s/payment' % contract, parameters
+        )
 
         if 'Contract not found' in response:
             raise InvalidParameterError(
@@ -698,4 +598,357 @@ class Post:
                 ' within ECM3.'
             )
 
-        return response
\ No newline at end of file
+        return response
+
+
+# The arguments of Post.customer and their ECM3 counterparts
+customer_conversions = {
+    'email': 'email',
+    'title': 'title',
+    'customer_reference': 'customerRef',
+    'first_name': 'firstName',
+    'surname': 'surname',
+    'line1': 'line1',
+    'post_code': 'postCode',
+    'account_number': 'accountNumber',
+    'sort_code': 'bankSortCode',
+    'account_holder_name': 'accountHolderName',
+    'line2': 'line2',
+    'line3': 'line3',
+    'line4': 'line4',
+    'company_name': 'companyName',
+    'date_of_birth': 'dateOfBirth',
+    'initials': 'initials',
+    'home_phone': 'homePhone',
+    'work_phone': 'workPhone',
+    'mobile_phone': 'mobilePhone',
+}
+
+# The arguments of Post.customer which cannot be empty
+required_customer_arguments = [
+    'email',
+    'title',
+    'customer_reference',
+    'first_name',
+    'surname',
+    'line1',
+    'post_code',
+    'account_number',
+    'sort_code',
+    'account_holder_name',
+]
+
+
+def customer_key(row, number=None):
+    """ Return the key of a customer row in a checkpoint, its customer
+    reference, which is unique in ECM3
+    """
+    return row.get('customer_reference', '')
+
+
+def customer_parameters(arguments):
+    """ Validate the arguments of a new customer, and return them as the
+    parameters of the ECM3 request. Empty optional arguments are left
+    out.
+
+    :Args:
+    arguments - A dictionary of the arguments of Post.customer
+    """
+    parameters = {}
+    key = None
+    try:
+        for key, value in arguments.items():
+            if key in required_customer_arguments and value == '':
+                raise InvalidParameterError(
+                    '%s cannot be empty.' % key
+                )
+            elif value != '':
+                parameters.update({customer_conversions[key]: value})
+    except KeyError:
+        raise ParameterNotAllowedError(
+            '%s is not an acceptable argument for this call, refer'
+            'to the man page for all available arguments' % key
+        )
+    for key in required_customer_arguments:
+        if key not in arguments:
+            raise InvalidParameterError('%s cannot be empty.' % key)
+
+    # A collection of tests against required params
+    customer_checks.check_postcode_is_valid_uk_format(
+        arguments['post_code']
+    )
+    customer_checks.check_email_address_format(arguments['email'])
+    customer_checks.check_bank_details_format(
+        arguments['account_number'], arguments['sort_code'],
+        arguments['account_holder_name'],
+    )
+    return parameters
+
+
+# The arguments of Post.contract and their ECM3 counterparts
+contract_conversions = {
+    'schedule_name': 'scheduleName',
+    'start_date': 'start',
+    'gift_aid': 'isGiftAid',
+    'termination_type': 'terminationType',
+    'at_the_end': 'atTheEnd',
+    'number_of_debits': 'numberOfDebits',
+    'frequency': 'every',
+    'initial_amount': 'initialAmount',
+    'extra_initial_amount': 'extraInitialAmount',
+    'payment_amount': 'amount',
+    'final_amount': 'finalAmount',
+    'payment_month_in_year': 'paymentMonthInYear',
+    'payment_day_in_month': 'paymentDayInMonth',
+    'payment_day_in_week': 'paymentDayInWeek',
+    'termination_date': 'terminationDate',
+    'additional_reference': 'additionalReference',
+    'custom_dd_reference': 'customDirectDebitRef',
+}
+
+
+def contract_parameters(arguments, context=None):
+    """ Validate the arguments of a new contract, and return them as the
+    parameters of the ECM3 request. Empty optional arguments are left
+    out.
+
+    :Args:
+    arguments - A dictionary of the arguments of Post.contract, other
+        than customer
+    context - The ContractContext of the batch the contract belongs to.
+        By default, the schedule and the earliest start date are looked
+        up for this contract alone.
+    """
+    if context is None:
+        context = contract_checks.ContractContext()
+    # Arguments which are not given are empty
+    values = dict.fromkeys(contract_conversions, '')
+    values.update(arguments)
+    schedule_name = values['schedule_name']
+    start_date = values['start_date']
+    termination_type = values['termination_type']
+    at_the_end = values['at_the_end']
+    number_of_debits = values['number_of_debits']
+    frequency = values['frequency']
+    initial_amount = values['initial_amount']
+    extra_initial_amount = values['extra_initial_amount']
+    payment_amount = values['payment_amount']
+    final_amount = values['final_amount']
+    payment_month_in_year = values['payment_month_in_year']
+    payment_day_in_month = values['payment_day_in_month']
+    payment_day_in_week = values['payment_day_in_week']
+    termination_date = values['termination_date']
+
+    parameters = {}
+    # Contract validations
+    context.schedule(schedule_name)
+    ad_hoc = context.not_ad_hoc(schedule_name)
+    start = context.check_start_date(start_date)
+    term = contract_checks.check_termination_type(termination_type)
+    ate = contract_checks.check_at_the_end(at_the_end)
+
+    # Avoid non-assignment warnings
+    key = None
+    try:
+        for key, value in arguments.items():
+            if value != '':
+                parameters.update({contract_conversions[key]: value})
+    except KeyError:
+        raise ParameterNotAllowedError(
+            '%s is not an acceptable argument for this call, refer'
+            ' to the man page for all available arguments' % key
+        )
+
+    if start:
+        del parameters['start']
+        parameters.update({'start': start})
+
+    if not ad_hoc:
+        if termination_type.lower() != 'until further notice':
+            if s.contracts['auto_fix_ad_hoc_termination_type']:
+                warn('Termination type must be Until Further Notice on'
+                     ' ad_hoc contracts. This has been automatically '
+                     'applied.')
+                del parameters['terminationType']
+                parameters.update(
+                    {'terminationType': 'until further notice'}
+                )
+            else:
+                raise InvalidParameterError(
+                    'termination_type must be set to Until Further Notice'
+                    ' on ad_hoc contracts'
+                )
+        if at_the_end.lower() != 'switch to further notice':
+            if s.contracts['auto_fix_ad_hoc_at_the_end']:
+                warn('At the end must be Switch To Further Notice on'
+                     ' ad_hoc contracts. This has been automatically '
+                     'applied.')
+                del parameters['atTheEnd']
+                parameters.update(
+                    {'atTheEnd': 'switch to further notice'}
+                )
+            else:
+                raise InvalidParameterError(
+                    'at_the_end must be set to Switch to further notice on'
+                    'ad_hoc contracts'
+                )
+        if initial_amount != '':
+            raise ParameterNotAllowedError(
+                'initial_amount cannot be passed on ad_hoc contracts.'
+            )
+        elif extra_initial_amount != '':
+            raise ParameterNotAllowedError(
+                'extra_initial_amount cannot be passed on ad_hoc contracts'
+            )
+        elif final_amount != '':
+            raise ParameterNotAllowedError(
+                'final_amount cannot be passed on ad_hoc contracts'
+            )
+        else:
+            pass
+    else:
+        freq = context.time_frame(schedule_name)
+        if frequency == '':
+            raise InvalidParameterError(
+                'frequency must be passed on non-ad_hoc contracts'
+            )
+        elif payment_amount == '':
+            raise InvalidParameterError(
+                'payment amount must be passed on non-ad_hoc contracts'
+            )
+        elif freq == 0:
+            if payment_day_in_week == '':
+                raise InvalidParameterError(
+                    'payment_day_in_week must be passed on weekly'
+                    ' contracts'
+                )
+            else:
+                contract_checks.check_payment_day_in_week(
+                    payment_day_in_week
+                )
+        elif freq == 1:
+            if str(payment_day_in_month) != parameters['start'][8:10]:
+                if s.contracts['auto_fix_payment_day_in_month']:
+                    pdim = parameters['start'][8:10]
+                    parameters.pop('paymentDayInMonth', None)
+                    parameters.update({'paymentDayInMonth': pdim})
+                elif payment_day_in_month == '':
+                    raise InvalidParameterError(
+                        'payment_day_in_month must be passed on monthly'
+                        ' contracts'
+                    )
+                else:
+                    raise InvalidParameterError(
+                        'payment_day_in_month must be set to %s if the'
+                        ' start date is set to %s'
+                        % (parameters['start'][8:10], parameters['start'])
+                    )
+            else:
+                contract_checks.check_payment_day_in_month(
+                    payment_day_in_month
+                )
+        elif freq == 2:
+            # The month of the start date is zero padded, and month 1 is
+            # found in '10', '11' and '12'
+            if str(payment_month_in_year).zfill(2) \
+                    != parameters['start'][5:7]:
+                if s.contracts['auto_fix_payment_month_in_year']:
+                    pmiy = int(parameters['start'][5:7])
+                    parameters.pop('paymentMonthInYear', None)
+                    parameters.update({'paymentMonthInYear': pmiy})
+                elif payment_month_in_year == '':
+                    raise InvalidParameterError(
+                        'payment_month_in_year must be passed on monthly'
+                        ' contracts'
+                    )
+                else:
+                    raise InvalidParameterError(
+                        'payment_month_in_year must be set to %s if the'
+                        ' start date is set to %s'
+                        % (parameters['start'][5:7], parameters['start'])
+                    )
+            else:
+                contract_checks.check_payment_month_in_year(
+                    payment_month_in_year
+                )
+
+            if str(payment_day_in_month) != parameters['start'][8:10]:
+                if s.contracts['auto_fix_payment_day_in_month']:
+                    pdim = parameters['start'][8:10]
+                    parameters.pop('paymentDayInMonth', None)
+                    parameters.update({'paymentDayInMonth': pdim})
+                elif payment_day_in_month == '':
+                    raise InvalidParameterError(
+                        'payment_day_in_month must be passed on monthly'
+                        ' contracts'
+                    )
+                else:
+                    raise InvalidParameterError(
+                        'payment_day_in_month must be set to %s if the'
+                        ' start date is set to %s'
+                        % (parameters['start'][8:10], parameters['start'])
+                    )
+        else:
+            contract_checks.check_payment_day_in_month(
+                payment_day_in_month
+            )
+
+        if term == 0:
+            if number_of_debits == '':
+                raise InvalidParameterError(
+                    'number_of_debits must be passed if termination_type'
+                    ' is take certain number of debits.'
+                )
+            else:
+                contract_checks.check_number_of_debits(number_of_debits)
+        elif term == 1:
+            if ate != 1:
+                raise InvalidParameterError(
+                    'at_the_end must be set to Switch to Further Notice if'
+                    ' termination_type is set to Until Further Notice'
+                )
+        elif term == 2:
+            if termination_date == '':
+                raise InvalidParameterError(
+                    'termination_date must be passed if termination_type'
+                    ' is set to End on Exact Date.'
+                )
+            else:
+                date = contract_checks.check_termination_date_is_in_future(
+                    termination_date, start_date
+                )
+                if date:
+                    pass
+    return parameters
+
+
+def contract_key(row, number):
+    """ Return the key of a contract row in a checkpoint. A contract has
+    no unique reference, and identical rows may each be meant to create
+    a contract, so the key is made of the number of the row, its
+    customer and a fingerprint of all of its arguments. An interrupted
+    run resumes when it is started again with the same rows in the same
+    order.
+
+    :Args:
+    row - A dictionary of the arguments of Post.contract
+    number - The number of the row in the input, from 0
+    """
+    arguments = sorted((name, str(value)) for name, value in row.items())
+    fingerprint = sha1(repr(arguments).encode('utf-8')).hexdigest()[:16]
+    return '%d/%s/%s' % (number, row.get('customer', ''), fingerprint)
+
+
+def contract_row(row, context=None):
+    """ Validate a row of bulk_contracts(), and return the customer of
+    the row with the parameters of the ECM3 request.
+
+    :Args:
+    row - A dictionary of the arguments of Post.contract
+    context - The ContractContext of the batch the row belongs to
+    """
+    arguments = dict(row)
+    customer = arguments.pop('customer', '')
+    if customer == '':
+        raise InvalidParameterError('customer cannot be empty.')
+    return customer, contract_parameters(arguments, context)
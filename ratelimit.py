@@ -0,0 +1,184 @@
+"""
+eazysdk.ratelimit
+~~~~~~~~~~~~~~~~~
+
+This module contains the client-side rate limiter applied by the EazySDK
+session. Each family of endpoints (customer, contract, payment and
+schedules) draws from its own token bucket. When a state directory is
+configured, buckets are stored there so that every process on the host
+using the same client code shares them.
+"""
+import os
+from struct import Struct
+from threading import Lock
+from time import sleep, time
+from .settings import Settings as s
+from .exceptions import RateLimitExceededError
+from .exceptions import RequestTimeoutError
+from .timeouts import remaining
+
+try:
+    import fcntl
+except ImportError:
+    # Buckets can only be shared between processes where fcntl exists
+    fcntl = None
+
+# The number of tokens left, and when they were counted
+_state = Struct('<dd')
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, path=None):
+        """
+        Creates a token bucket refilled at rate tokens a second, holding
+        at most burst tokens
+
+        :Required args:
+        - rate - The number of tokens added to the bucket a second
+        - burst - The number of tokens the bucket holds when full
+
+        :Optional args:
+        - path - The file the bucket is stored in, shared by every
+            process using the same path. By default, the bucket is only
+            shared by threads in this process.
+        """
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.path = path if fcntl is not None else None
+        self._lock = Lock()
+        self._tokens = self.burst
+        self._updated = time()
+
+    def take(self):
+        """ Take a token from the bucket if one is available.
+
+        :Returns:
+        0 if a token was taken, otherwise the number of seconds until
+        one will be available
+        """
+        with self._lock:
+            if self.path is None:
+                self._tokens, self._updated, wait = self._refill(
+                    self._tokens, self._updated
+                )
+                return wait
+            return self._take_shared()
+
+    def _refill(self, tokens, updated):
+        now = time()
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            return tokens - 1, now, 0
+        return tokens, now, (1 - tokens) / self.rate
+
+    def _take_shared(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            data = os.pread(fd, _state.size, 0)
+            if len(data) == _state.size:
+                tokens, updated = _state.unpack(data)
+            else:
+                # A new bucket starts full
+                tokens, updated = self.burst, time()
+            tokens, updated, wait = self._refill(tokens, updated)
+            os.pwrite(fd, _state.pack(tokens, updated), 0)
+            return wait
+        finally:
+            os.close(fd)
+
+
+class RateLimiter:
+    def __init__(self, buckets=None, block=None, state_directory=None):
+        """
+        Creates a rate limiter with a token bucket for each family of
+        endpoints
+
+        :Optional args:
+        - buckets - A dictionary of endpoint families and their rate and
+            burst. By default, this is read from settings.rate_limits
+        - block - Whether a request waits for a token, rather than
+            raising RateLimitExceededError. By default, this is read
+            from settings.rate_limits
+        - state_directory - The directory buckets are shared through by
+            every process on the host. By default, this is read from
+            settings.rate_limits
+        """
+        self.buckets = buckets
+        self.block = block
+        self.state_directory = state_directory
+        self._lock = Lock()
+        self._buckets = {}
+
+    def _setting(self, name):
+        value = getattr(self, name)
+        if value is None:
+            value = s.rate_limits[name]
+        return value
+
+    def bucket(self, family):
+        """ Return the token bucket for a family of endpoints in the
+        current environment, or None if the family is not limited.
+        """
+        if not s.rate_limits['enabled']:
+            return None
+        limits = self._setting('buckets').get(family)
+        if not limits:
+            return None
+        environment = s.current_environment['env'].lower()
+        if environment == 'ecm3':
+            client_code = s.ecm3_client_details['client_code']
+        else:
+            client_code = s.sandbox_client_details['client_code']
+        key = (environment, client_code, family)
+        with self._lock:
+            if key not in self._buckets:
+                path = None
+                directory = self._setting('state_directory')
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                    path = os.path.join(
+                        directory, '%s-%s-%s.bucket' % key
+                    )
+                self._buckets[key] = TokenBucket(
+                    limits['rate'], limits['burst'], path
+                )
+            return self._buckets[key]
+
+    def reserve(self, family):
+        """ Take a token for a request to a family of endpoints.
+
+        :Returns:
+        0 if the request may be sent, otherwise the number of seconds to
+        wait before calling reserve again
+
+        :Raises:
+        RateLimitExceededError if the request should fail fast, or
+        RequestTimeoutError if waiting would exceed the deadline
+        """
+        bucket = self.bucket(family)
+        if bucket is None:
+            return 0
+        wait = bucket.take()
+        if not wait:
+            return 0
+        if not self._setting('block'):
+            raise RateLimitExceededError(
+                'The rate limit for %s requests has been reached. Please'
+                ' try again in %.2f seconds.' % (family, wait)
+            )
+        left = remaining()
+        if left is not None and wait >= left:
+            raise RequestTimeoutError(
+                'The deadline for this call would be exceeded waiting for'
+                ' the rate limit of %s requests.' % family
+            )
+        return wait
+
+    def acquire(self, family):
+        """ Wait until a request to a family of endpoints may be sent.
+        """
+        wait = self.reserve(family)
+        while wait:
+            sleep(wait)
+            wait = self.reserve(family)
@@ -0,0 +1,136 @@
+"""
+eazysdk.retry
+~~~~~~~~~~~~~
+
+This module contains the retry policy applied by the EazySDK session to
+requests which fail with a transient error.
+"""
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from random import uniform
+from threading import Lock
+from .settings import Settings as s
+from .timeouts import remaining
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=None, backoff_base=None,
+                 backoff_max=None, statuses=None):
+        """
+        Creates a retry policy using exponential backoff with full
+        jitter. Requests which may have reached EazyCustomerManager are
+        only retried if they are safe to replay, either because their
+        method is idempotent (GET and DELETE) or because the request
+        method detects a duplicate itself.
+
+        :Optional args:
+        - max_attempts - The total number of attempts made for a
+            request. By default, this is read from settings.retries
+        - backoff_base - The number of seconds the first backoff is
+            drawn from. By default, this is read from settings.retries
+        - backoff_max - The largest number of seconds waited before an
+            attempt. By default, this is read from settings.retries
+        - statuses - The HTTP status codes which are retried. By
+            default, this is read from settings.retries
+        """
+        if max_attempts is None:
+            max_attempts = s.retries['max_attempts']
+        if backoff_base is None:
+            backoff_base = s.retries['backoff_base']
+        if backoff_max is None:
+            backoff_max = s.retries['backoff_max']
+        if statuses is None:
+            statuses = s.retries['statuses']
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.statuses = frozenset(statuses)
+        # Counters for metrics, shared by every thread using the policy
+        self._lock = Lock()
+        self._retries = {}
+        self._gave_up = 0
+
+    def is_replayable(self, request, status=None):
+        """ Return whether a request which may have reached
+        EazyCustomerManager can safely be sent again.
+        """
+        # A throttled request was rejected before being processed
+        return request.retry or status == 429
+
+    def backoff(self, attempt):
+        """ Return a random wait before the next attempt, between zero
+        and the exponential backoff for the given attempt.
+        """
+        ceiling = min(self.backoff_max,
+                      self.backoff_base * 2 ** (attempt - 1))
+        return uniform(0, ceiling)
+
+    def delay(self, request, attempt, status=None, retry_after=None,
+              sent=True):
+        """ Return the number of seconds to wait before sending a request
+        again, or None if it should not be retried.
+
+        :Args:
+        request - The Request which failed
+        attempt - The number of the attempt which failed, from 1
+        status - The HTTP status of the response, if one was received
+        retry_after - The Retry-After header of the response
+        sent - Whether the request may have reached EazyCustomerManager
+        """
+        if status is not None and status not in self.statuses:
+            return None
+        if sent and not self.is_replayable(request, status):
+            return None
+
+        wait = self.backoff(attempt)
+        retry_after = parse_retry_after(retry_after)
+        if retry_after is not None:
+            wait = max(wait, retry_after)
+        left = remaining()
+        if attempt >= self.max_attempts or wait > self.backoff_max \
+                or (left is not None and wait >= left):
+            with self._lock:
+                self._gave_up += 1
+            return None
+
+        with self._lock:
+            self._retries[request.method] = \
+                self._retries.get(request.method, 0) + 1
+        return wait
+
+    def stats(self):
+        """ Return the number of retries made, in total and by HTTP
+        method, and the number of retryable failures given up on.
+
+        :Example:
+        stats()
+
+        :Returns:
+        {'retries': 3, 'by_method': {'GET': 3}, 'gave_up': 1}
+        """
+        with self._lock:
+            return {
+                'retries': sum(self._retries.values()),
+                'by_method': dict(self._retries),
+                'gave_up': self._gave_up,
+            }
+
+
+def parse_retry_after(retry_after):
+    """ Return the number of seconds a Retry-After header asks to wait,
+    or None if there isn't one.
+    """
+    if retry_after is None:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        # A -0000 zone is parsed as a naive date, but is still UTC
+        date = date.replace(tzinfo=timezone.utc)
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
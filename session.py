@@ -1,147 +1,626 @@
-import requests
-from requests import session
 from .settings import Settings as s
+from .transport import default_transport
 from .exceptions import UnsupportedHTTPMethodError
 from .exceptions import InvalidEnvironmentError
-from json import JSONDecodeError
+from .exceptions import RequestTimeoutError
+from .exceptions import EazySDKException
+from .exceptions import describe_error
+from .exceptions import check_common_exceptions
+from .exceptions import error_message
+from .stream import iter_array
+from .timeouts import call_deadline
+from .timeouts import request_timeout
+from .retry import RetryPolicy
+from .ratelimit import RateLimiter
+from .circuit import CircuitBreaker
+from .coalesce import SingleFlight
+from .cache import ResponseCache
+from requests.exceptions import ConnectionError
+from requests.exceptions import ConnectTimeout
+from requests.exceptions import RequestException
+from requests.exceptions import Timeout
+from urllib3.exceptions import NewConnectionError
+from time import monotonic
+from time import sleep
+from .codec import loads
+from functools import wraps
+from collections import namedtuple
+from threading import Lock
 
 
-class Session:
-    def __init__(self):
-        """
-        Creates a new instance of the EazySDK session
-        """
-        # The environment used for requests sent to EazyCustomerManager
-        self.environment = None
-        # The client settings for the client, stores API and client code
-        self.client_settings = None
-        # The client code stored within client_settings
-        self.client_code = None
-        # The API key stored within client_settings
-        self.api_key = None
-        # The base URL for requests sent to EazyCustomerManager
-        self.base_url = None
-        # The headers sent along with the request to EazyCustomerManager
-        self.headers = None
-        # The parameters sent with the request to EazyCustomerManager
-        self.params = None
-        # The endpoint (x.com{{/end/point}} of the request URL
-        self.endpoint = None
-        # The HTTP method of the request sent to EazyCustomerManager
-        self.method = None
-        # The URL to be sent to EazyCustomerManager
-        self.request_url = None
-        self.session = session()
-
-    def request(self, method, endpoint, headers=None, params=None):
+# The base URL of EazyCustomerManager, unless other['base_url'] is set
+_base_url = 'https://{environment}.eazycollect.co.uk/api/v3/client/' \
+            '{client_code}/'
+
+
+class Request(namedtuple('Request', 'method endpoint params retry')):
+    """
+    An immutable request to be sent to EazyCustomerManager. Each call
+    builds its own, so nothing about a request is stored on the session
+    that sends it.
+
+    :Args:
+    - method - The HTTP method of the request
+    - endpoint - The path of the request URL
+    - params - The parameters of the request, as (name, value) pairs
+    - retry - Whether the request can be sent again after it may have
+        reached EazyCustomerManager. By default, only GET and DELETE
+        requests are retried.
+    """
+    __slots__ = ()
+
+    def __new__(cls, method, endpoint, params=None, retry=None):
+        if params is None:
+            params = ()
+        elif isinstance(params, dict):
+            params = tuple(params.items())
+        else:
+            params = tuple(params)
+        if retry is None:
+            retry = method in ('GET', 'DELETE')
+        return super(Request, cls).__new__(
+            cls, method, endpoint, params, retry
+        )
+
+    @property
+    def family(self):
         """
-        Create a request to be sent to EazyCustomerManager
+        The family of endpoints the request belongs to; one of
+        customer, contract, payment, schedules or callback
+        """
+        parts = self.endpoint.strip('/').split('/')
+        if parts[0] == 'customer':
+            if len(parts) > 2 and parts[2] == 'contract':
+                return 'contract'
+            return 'customer'
+        elif parts[0] == 'contract':
+            if len(parts) > 2 and parts[2] == 'payment':
+                return 'payment'
+            return 'contract'
+        elif parts[0] == 'BACS':
+            return 'callback'
+        return parts[0].lower()
 
-        :Required args:
-        - method - The HTTP method of the request to be sent to
-            EazyCustomerManager
-        - endpoint - The path of the request URL
+
+class Response(str):
+    """
+    The body of a response from EazyCustomerManager, along with its HTTP
+    status and the number of attempts it took. The bytes the body was
+    decoded from are kept as content, and are what JSON is parsed from.
+    """
+    def __new__(cls, text, content=None):
+        response = super(Response, cls).__new__(cls, text)
+        if content is None:
+            # A transport which only returns the text
+            content = text.encode('utf-8')
+        response.content = content
+        return response
+
+    status_code = None
+    attempts = 1
+    # The request the response answers, and the seconds taken to
+    # receive it, including any retries
+    method = None
+    endpoint = None
+    elapsed = None
+
+    def json(self):
+        """
+        Parse the body with the JSON backend chosen by
+        other['json_backend']
+        """
+        return loads(self.content)
+
+
+class RawResponse:
+    def __init__(self, content, status_code, headers):
+        """
+        The body of a response from EazyCustomerManager as the bytes
+        received, along with its HTTP status, headers and the number of
+        attempts it took. The body is not decoded or copied.
+
+        :Example:
+        response = session.request('GET', 'customer', raw=True)
+        with open('customers.json', 'wb') as file:
+            file.write(response.content)
+        """
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers
+
+    attempts = 1
+    # The request the response answers, and the seconds taken to
+    # receive it, including any retries
+    method = None
+    endpoint = None
+    elapsed = None
+
+    @property
+    def view(self):
+        """
+        A memoryview of the body, which can be sliced without copying
+        """
+        return memoryview(self.content)
+
+    def json(self):
+        """
+        Parse the body with the JSON backend chosen by
+        other['json_backend']
+        """
+        return loads(self.content)
+
+    def __bytes__(self):
+        return self.content
+
+    def __len__(self):
+        return len(self.content)
+
+
+class Session:
+    # The single-flight group identical GET requests are coalesced in
+    single_flight = SingleFlight
+
+    def __init__(self, transport=None, retry_policy=None, rate_limiter=None,
+                 circuit_breaker=None, cache=None):
+        """
+        Creates a new instance of the EazySDK session. A session holds no
+        state about the requests it sends, so a single session can be
+        shared by every request method and by any number of threads.
 
         :Optional args:
-        - headers - Headers sent to EazyCustomerManager along with the
-            request
-        - params - Parameters to be sent to EazyCustomerManager with the
-            request
+        - transport - The pooled transport requests are sent through.
+            By default, the process-wide transport is used.
+        - retry_policy - The policy deciding whether a failed request is
+            sent again. By default, a RetryPolicy built from
+            settings.retries is used.
+        - rate_limiter - The rate limiter requests wait on before being
+            sent. By default, a RateLimiter built from
+            settings.rate_limits is used.
+        - circuit_breaker - The circuit breaker failing requests fast
+            while EazyCustomerManager is failing. By default, a
+            CircuitBreaker built from settings.circuit_breaker is used.
+        - cache - The cache GET responses are kept in. By default, a
+            ResponseCache built from settings.cache is used.
+        """
+        # The pooled keep-alive transport requests are sent through
+        if transport is None:
+            transport = default_transport()
+        self.transport = transport
+        # The policy applied to requests failing with a transient error
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+        self.retry_policy = retry_policy
+        # The token buckets shared by every request using the session
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter
+        # The circuits shared by every request using the session
+        if circuit_breaker is None:
+            circuit_breaker = CircuitBreaker()
+        self.circuit_breaker = circuit_breaker
+        # The GET requests in flight, shared by every thread
+        self.flights = self.single_flight()
+        # The responses shared by every thread, invalidated by writes
+        if cache is None:
+            cache = ResponseCache()
+        self.cache = cache
 
+    def prepare(self, request):
+        """
+        Build the URL and headers of a request to be sent to
+        EazyCustomerManager, validating the environment and HTTP method
+
+        :Required args:
+        - request - The Request to be sent to EazyCustomerManager
 
         :Example:
-        request('GET', 'customers')
+        prepare(Request('GET', 'customers'))
 
         :Returns:
-        request JSON objects
+        (request_url, headers)
         """
         # Get the current environment from the settings file
-        self.environment = s.current_environment['env'].lower()
+        environment = s.current_environment['env'].lower()
 
         # Ensure the environment is valid
         acceptable_environments = {
             'ecm3',
             'sandbox',
         }
-        if self.environment not in acceptable_environments:
+        if environment not in acceptable_environments:
             raise InvalidEnvironmentError(
                 '%s is not a valid environment. The acceptable environments'
                 ' are \n- sandbox - A server for testing the functionality of'
                 ' EazyCustomerManager\n - ecm3 - The production'
-                ' EazyCustomerManager environment' % self.environment
+                ' EazyCustomerManager environment' % environment
             )
         # Get the client settings from the settings file
-        elif self.environment == 'ecm3':
-            self.client_settings = s.ecm3_client_details
+        elif environment == 'ecm3':
+            client_settings = s.ecm3_client_details
         else:
-            self.client_settings = s.sandbox_client_details
+            client_settings = s.sandbox_client_details
 
         # Get the client code from the settings file
-        self.client_code = self.client_settings['client_code']
-        # Get the API key from the settings file
-        self.api_key = self.client_settings['api_key']
+        client_code = client_settings['client_code']
         # The base URL for all requests to EazyCustomerManager
-        self.base_url = 'https://%s.eazycollect.co.uk/api/v3/client/%s/' \
-                        % (self.environment, self.client_code)
-        # we need to instantiate the headers object
-        self.headers = headers
-        # Get the API key from the settings file
-        self.api_key = self.client_settings['api_key']
-        # Create the headers object
-        self.headers = {
-            'apiKey': self.api_key,
+        base_url = s.other['base_url'] or _base_url
+        base_url = base_url.format(
+            environment=environment, client_code=client_code
+        )
+        # Create the headers object, using the API key from the settings
+        headers = {
+            'apiKey': client_settings['api_key'],
             'Content-Length': '0',
         }
 
-        # Get the endpoint and append it to the base URL
-        self.request_url = self.base_url + endpoint
-        # Get the HTTP method of the request
-        self.method = method
         # Raise an error if an unsupported HTTP method is used
-        if method not in (['GET', 'POST', 'PATCH', 'DELETE']):
+        if request.method not in (['GET', 'POST', 'PATCH', 'DELETE']):
             raise UnsupportedHTTPMethodError(
                 '%s is not a supported HTTP method when communicating'
                 ' with EazyCustomerManager. Valid methods are GET,'
-                ' POST, PATCH and DELETE' % method
+                ' POST, PATCH and DELETE' % request.method
             )
 
-        # Get the params if there are any
-        self.params = self.params
-        request_call = getattr(requests, self.method.lower())
-        response = request_call(
-            self.request_url,
-            params=self.params,
-            headers=self.headers,
+        # Get the endpoint and append it to the base URL
+        return base_url + request.endpoint, headers
+
+    def request_key(self, request):
+        """
+        Return the key identical requests share, made of the URL,
+        parameters and API key of the request
+        """
+        request_url, headers = self.prepare(request)
+        return request_url, request.params, headers['apiKey']
+
+    def send(self, request):
+        """
+        Send a request to EazyCustomerManager. A GET request is answered
+        from the cache if possible, and while an identical GET request
+        is in flight, its response is shared rather than sending
+        another. Any other request invalidates the cached responses of
+        the records it writes.
+
+        :Required args:
+        - request - The Request to be sent to EazyCustomerManager
+
+        :Example:
+        send(Request('GET', 'customers'))
+
+        :Returns:
+        request JSON objects
+        """
+        if request.method != 'GET':
+            try:
+                return self._send(request)
+            finally:
+                # A write which failed may still have been applied
+                self.cache.invalidate(request)
+        key = self.request_key(request)
+        response = self.cache.get(request, key)
+        if response is not None:
+            return response
+        generation = self.cache.generation
+        if not s.coalescing['enabled']:
+            return self._fetch(request, key, generation)
+        return self.flights.do(
+            key, lambda: self._fetch(request, key, generation)
         )
-        try:
-            if response.text:
-                response_json = response.text
-            else:
-                response_json = {}
-        except JSONDecodeError:
-            response_json = {}
+
+    def _fetch(self, request, key, generation):
+        response = self._send(request)
+        self.cache.put(request, key, response, generation)
+        return response
+
+    def _send(self, request):
+        response, status, attempt, started = self._exchange(request)
+        text = response_text(response)
+        if not text:
+            return {}
+        response_json = describe_request(
+            Response(text, getattr(response, 'content', None)),
+            request, started,
+        )
+        response_json.status_code = status
+        response_json.attempts = attempt
         return response_json
 
-    def get(self):
+    def _exchange(self, request, **kwargs):
+        # Send a request until it succeeds or should not be retried,
+        # returning the last response, its status, the number of
+        # attempts made, and when the first attempt was made
+        request_url, headers = self.prepare(request)
+        started = monotonic()
+        attempt = 1
+        while True:
+            status = retry_after = error = None
+            # The circuit is checked first, so requests failing fast
+            # never wait for or use up a rate limit token
+            self.circuit_breaker.allow(request.family)
+            try:
+                self.rate_limiter.acquire(request.family)
+                timeouts = request_timeout()
+            except BaseException:
+                self.circuit_breaker.release(request.family)
+                raise
+            try:
+                response = self.transport.request(
+                    request.method,
+                    request_url,
+                    params=list(request.params),
+                    headers=headers,
+                    timeout=timeouts,
+                    **kwargs
+                )
+            except Timeout as e:
+                error = RequestTimeoutError(
+                    'EazyCustomerManager did not respond to %s %s in time.'
+                    % (request.method, request.endpoint)
+                )
+                sent = not isinstance(e, ConnectTimeout)
+            except ConnectionError as e:
+                error = e
+                sent = _may_have_been_sent(e)
+            except RequestException:
+                self.circuit_breaker.record(request.family)
+                raise
+            except BaseException:
+                # Not a failure of EazyCustomerManager
+                self.circuit_breaker.release(request.family)
+                raise
+            else:
+                status = response.status_code
+            self.circuit_breaker.record(request.family, status)
+            if error is None:
+                if status not in self.retry_policy.statuses:
+                    break
+                retry_after = response.headers.get('Retry-After')
+                sent = True
+
+            delay = self.retry_policy.delay(
+                request, attempt, status, retry_after, sent
+            )
+            if delay is None:
+                if error is not None:
+                    raise describe_request(error, request, started)
+                break
+            if error is None:
+                release_response(response)
+            sleep(delay)
+            attempt += 1
+        return response, status, attempt, started
+
+    def stream(self, request, key, chunk_size=65536):
+        """
+        Send a GET request to EazyCustomerManager, and yield the records
+        of an array in the response as the body arrives, rather than
+        waiting for the whole body. Streamed requests are never cached
+        or coalesced.
+
+        :Required args:
+        - request - The Request to be sent to EazyCustomerManager
+        - key - The key of the array whose records are yielded
+
+        :Optional args:
+        - chunk_size - The number of bytes read from the response at a
+            time
+
+        :Example:
+        stream(Request('GET', 'customer'), 'Customers')
+
+        :Returns:
+        an iterator of record dictionaries
+        """
+        response, status, attempt, started = self._exchange(
+            request, stream=True
+        )
+        try:
+            if not 200 <= status < 300:
+                raise_for_response(
+                    response_text(response), status, attempt, request,
+                    started,
+                )
+            yield from iter_array(_chunks(response, chunk_size), key)
+        finally:
+            release_response(response)
+
+    def raw(self, request):
+        """
+        Send a request to EazyCustomerManager, and return the body of
+        the response as the bytes received, without decoding it. Raw
+        requests are never cached or coalesced, and unsuccessful
+        responses raise the same exceptions as any other request.
+
+        :Required args:
+        - request - The Request to be sent to EazyCustomerManager
+
+        :Example:
+        raw(Request('GET', 'customer'))
+
+        :Returns:
+        RawResponse(content, status_code, headers)
+        """
+        try:
+            response, status, attempt, started = self._exchange(request)
+        finally:
+            if request.method != 'GET':
+                self.cache.invalidate(request)
+        if not 200 <= status < 300:
+            raise_for_response(
+                response_text(response), status, attempt, request, started
+            )
+        raw = describe_request(RawResponse(
+            response_content(response), status, response.headers,
+        ), request, started)
+        raw.attempts = attempt
+        return raw
+
+    def request(self, method, endpoint, params=None, *, raw=False):
+        """
+        Create a request to be sent to EazyCustomerManager
+
+        :Required args:
+        - method - The HTTP method of the request to be sent to
+            EazyCustomerManager
+        - endpoint - The path of the request URL
+
+        :Optional args:
+        - params - Parameters to be sent to EazyCustomerManager with the
+            request
+        - raw - Return the body as the bytes received in a RawResponse,
+            rather than decoding it. This must be passed by keyword. See
+            raw().
+
+        :Example:
+        request('GET', 'customers')
+
+        :Returns:
+        request JSON objects, or a RawResponse if raw is set
+        """
+        if raw:
+            return self.raw(Request(method, endpoint, params))
+        return self.send(Request(method, endpoint, params))
+
+    def get(self, endpoint, params=None):
         """
-        Send a GET request to EazyCustomerManager
+        Create a GET request to EazyCustomerManager, to be yielded by a
+        request method
         """
-        return self.request('GET', self.endpoint, self.params)
+        return Request('GET', endpoint, params)
 
-    def post(self):
+    def post(self, endpoint, params=None, retry=False):
         """
-        Send a POST request to EazyCustomerManager
+        Create a POST request to EazyCustomerManager, to be yielded by a
+        request method. Pass retry=True only if the request method can
+        detect a duplicate created by an earlier attempt.
         """
-        return self.request('POST', self.endpoint, self.params)
+        return Request('POST', endpoint, params, retry)
 
-    def patch(self):
+    def patch(self, endpoint, params=None, retry=False):
         """
-        Send a PATCH request to EazyCustomerManager
+        Create a PATCH request to EazyCustomerManager, to be yielded by a
+        request method. Pass retry=True only if the request method can
+        detect a duplicate created by an earlier attempt.
         """
-        return self.request('PATCH', self.endpoint, self.params)
+        return Request('PATCH', endpoint, params, retry)
 
-    def delete(self):
+    def delete(self, endpoint, params=None):
         """
-        Send a DELETE request to EazyCustomerManager
+        Create a DELETE request to EazyCustomerManager, to be yielded by a
+        request method
         """
-        return self.request('DELETE', self.endpoint, self.params)
+        return Request('DELETE', endpoint, params)
+
+
+_default_session = None
+_default_session_lock = Lock()
+
+
+def default_session():
+    """
+    Return the process-wide session, used by request methods created
+    without an explicit session, such as the schedule lookups performed
+    during validation. Sharing it lets concurrent lookups be coalesced.
+    """
+    global _default_session
+    if _default_session is None:
+        with _default_session_lock:
+            if _default_session is None:
+                _default_session = Session()
+    return _default_session
+
+
+def _may_have_been_sent(error):
+    # A connection which could not be established never sent a request
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return not isinstance(reason, NewConnectionError)
+
+
+def response_text(response):
+    """
+    Return the body of a response as a string. requests guesses the
+    encoding of a body sent without a charset by reading all of it, so
+    such a body is decoded as UTF-8, which EazyCustomerManager sends.
+    """
+    if getattr(response, 'encoding', True) is None:
+        return str(response.content, 'utf-8', 'replace')
+    return response.text
+
+
+def response_content(response):
+    """
+    Return the body of a response as bytes, without copying it, or
+    encoded from a transport which only returns the text
+    """
+    content = getattr(response, 'content', None)
+    if content is None:
+        return response.text.encode('utf-8')
+    return content
+
+
+def _chunks(response, chunk_size):
+    # Read a streamed response a chunk at a time, or all at once from a
+    # transport which does not stream
+    if hasattr(response, 'iter_content'):
+        return response.iter_content(chunk_size)
+    return [response.text]
+
+
+def release_response(response):
+    """
+    Return the connection of a response which was not fully read to the
+    pool
+    """
+    close = getattr(response, 'close', None)
+    if close is not None:
+        close()
+
+
+def raise_for_response(text, status, attempt, request, started):
+    """
+    Raise the EazySDK exception matching an unsuccessful response which
+    is not returned to a request method, such as a streamed response
+    """
+    response = describe_request(Response(text), request, started)
+    response.status_code = status
+    response.attempts = attempt
+    check_common_exceptions(response)
+    raise describe_error(EazySDKException(error_message(text)), response)
+
+
+def describe_request(result, request, started):
+    """
+    Record the method and endpoint of a request on its response or
+    error, along with the seconds since it was first sent
+    """
+    if getattr(result, 'endpoint', False) is None:
+        result.method = request.method
+        result.endpoint = request.endpoint
+        result.elapsed = monotonic() - started
+    return result
+
+
+def request_steps(funct):
+    """
+    Run a request method written as a generator. The method yields each
+    Request created by its session and is sent back the response, which
+    lets the same validation and response handling run with blocking
+    calls here, or be awaited by the AsyncEazySDK.
+    """
+    @wraps(funct)
+    def wrapper(self, *args, **kwargs):
+        # The deadline covers the validation and every request of a call
+        with call_deadline():
+            steps = funct(self, *args, **kwargs)
+            response = None
+            try:
+                while True:
+                    request = steps.send(response)
+                    response = self.sdk.send(request)
+            except StopIteration as e:
+                return e.value
+            except EazySDKException as e:
+                # Errors raised on reading a response describe it
+                raise describe_error(e, response)
+    # Kept so the AsyncEazySDK can drive the same steps
+    wrapper.steps = funct
+    return wrapper
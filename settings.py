@@ -37,9 +37,69 @@ class Settings:
 
     warnings = {
         'customer_search': True,
+        'payment_rows': True,
     }
 
     other = {
         'bank_holidays_update_days': 30,
+        'bank_holidays_url': 'https://www.gov.uk/bank-holidays.json',
         'force_schedule_updates': False,
+        'schedules_update_days': 365,
+        'cache_directory': None,
+        'base_url': None,
+        'json_backend': 'auto',
+    }
+
+    connection_pool = {
+        'pool_connections': 10,
+        'pool_maxsize': 10,
+        'pool_block': False,
+        'async_concurrency': 10,
+    }
+
+    timeouts = {
+        'connect': 5,
+        'read': 30,
+        'deadline': None,
+    }
+
+    retries = {
+        'max_attempts': 3,
+        'backoff_base': 0.5,
+        'backoff_max': 30,
+        'statuses': [429, 502, 503, 504],
+    }
+
+    rate_limits = {
+        'enabled': False,
+        'block': True,
+        'state_directory': None,
+        'buckets': {
+            'customer': {'rate': 10, 'burst': 20},
+            'contract': {'rate': 10, 'burst': 20},
+            'payment': {'rate': 10, 'burst': 20},
+            'schedules': {'rate': 1, 'burst': 5},
+        },
+    }
+
+    circuit_breaker = {
+        'enabled': True,
+        'failure_threshold': 5,
+        'recovery_timeout': 30,
+        'half_open_max_calls': 1,
+    }
+
+    coalescing = {
+        'enabled': True,
+    }
+
+    cache = {
+        'enabled': False,
+        'max_bytes': 8 * 1024 * 1024,
+        'ttls': {
+            'customer': 60,
+            'contract': 60,
+            'payment': 30,
+            'negative': 10,
+        },
     }
@@ -0,0 +1,130 @@
+"""
+eazysdk.store
+~~~~~~~~~~~~~
+
+This module contains the metadata store the EazySDK keeps its bank
+holidays and schedules in. The store is a directory of small files,
+other['cache_directory'], shared by every thread and process on the
+host. Files are replaced in one step, so they are never read half
+written, and refreshes are locked, so only one thread or process
+fetches a stale file while the others wait for its result.
+"""
+import os
+from contextlib import contextmanager
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from .settings import Settings as s
+
+try:
+    import fcntl
+except ImportError:
+    # Refreshes can only be locked between processes where fcntl exists
+    fcntl = None
+
+# The lock of each file, shared by every thread in the process
+_locks = {}
+_locks_lock = Lock()
+
+
+def default_directory():
+    """ Return the directory used when other['cache_directory'] is not
+    set, following the XDG base directory specification.
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') \
+        or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'eazysdk')
+
+
+class MetadataStore:
+    def __init__(self, directory=None):
+        """
+        Creates a store of metadata files in a writable directory
+
+        :Optional args:
+        - directory - The directory the files are kept in. By default,
+            this is read from other['cache_directory']
+        """
+        if directory is None:
+            directory = s.other['cache_directory'] or default_directory()
+        self.directory = os.path.abspath(directory)
+
+    def path(self, name):
+        """ Return the path of a file in the store.
+        """
+        return os.path.join(self.directory, name)
+
+    def read(self, name):
+        """ Return the contents of a file in the store, or None if it
+        does not exist.
+        """
+        try:
+            with open(self.path(name), 'r') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def write(self, name, text):
+        """ Replace the contents of a file in the store in one step.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with NamedTemporaryFile('w', dir=self.directory, prefix=name,
+                                suffix='.tmp', delete=False) as f:
+            try:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            except BaseException:
+                os.remove(f.name)
+                raise
+        os.replace(f.name, self.path(name))
+
+    @contextmanager
+    def lock(self, name):
+        """ Hold the lock of a file in the store, shared by every thread
+        and process using the same directory.
+        """
+        path = self.path(name)
+        with _locks_lock:
+            thread_lock = _locks.setdefault(path, Lock())
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            fd = os.open(path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                # Closing the file releases the lock
+                os.close(fd)
+
+    def refresh(self, name, fresh, fetch):
+        """ Return the contents of a file in the store, fetching them
+        again if they are not fresh. While one thread or process is
+        fetching, the others wait, and then use what it wrote.
+
+        :Args:
+        name - The name of the file
+        fresh - A function taking the contents of the file, or None if
+            there is no file, returning whether they can be used
+        fetch - A function taking the current contents of the file, or
+            None, returning new contents to be written
+        """
+        text = self.read(name)
+        if fresh(text):
+            return text
+        with self.lock(name):
+            text = self.read(name)
+            if fresh(text):
+                return text
+            text = fetch(text)
+            self.write(name, text)
+            return text
+
+
+def metadata_store():
+    """ Return the MetadataStore of the directory in
+    other['cache_directory'].
+    """
+    return MetadataStore()
@@ -0,0 +1,308 @@
+"""
+eazysdk.stream
+~~~~~~~~~~~~~~
+
+This module contains the incremental JSON parser used to stream large
+responses from EazyCustomerManager, such as a full customer book. The
+records of an array in the response are parsed one at a time as the
+body arrives, so only the record being parsed is held in memory.
+"""
+from codecs import getincrementaldecoder
+from json import JSONDecodeError
+from json import JSONDecoder
+import re
+
+# The whitespace allowed between JSON tokens
+_whitespace = re.compile(r'[ \t\n\r]*')
+# The characters which may end a value, outside and inside a string
+_structural = re.compile(r'[{}\[\]"]')
+_string_end = re.compile(r'["\\]')
+# The characters which end a number or a literal
+_scalar_end = re.compile(r'[ \t\n\r,\]}]')
+_decoder = JSONDecoder()
+# Returned in place of a value which has not been fully received
+_incomplete = object()
+# The most characters a single value of a response may hold, so a body
+# which never completes a value is rejected rather than held in memory
+max_value_size = 64 * 1024 * 1024
+
+
+class ArrayParser:
+    def __init__(self, key, max_size=None):
+        """
+        Creates a parser for the records of an array held under a key of
+        a JSON object, such as {"Customers": [...]}. Other keys of the
+        object are parsed and discarded.
+
+        :Required args:
+        - key - The key of the array whose records are returned
+
+        :Optional args:
+        - max_size - The most characters a single record may hold. By
+            default, this is max_value_size.
+
+        :Example:
+        parser = ArrayParser('Customers')
+        for chunk in chunks:
+            for customer in parser.feed(chunk):
+                print(customer['Id'])
+        parser.close()
+        """
+        self.key = key
+        self.max_size = max_value_size if max_size is None else max_size
+        self.found = False
+        self._buffer = ''
+        self._position = 0
+        self._state = 'object'
+        self._current = None
+        # The parts of a value which did not end in the buffer, kept as
+        # a list so each part is only copied once, and their length
+        self._parts = None
+        self._received = 0
+        # Where the value being received ends, once it is known
+        self._end = None
+        # The scan for the end of the value being received
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._scalar = False
+
+    def feed(self, text):
+        """ Parse the next part of the body.
+
+        :Args:
+        text - The next part of the body, as a string
+
+        :Returns:
+        A list of the records completed by this part of the body
+
+        :Raises:
+        ValueError if a record is larger than max_size
+        """
+        if self._parts is not None:
+            # Only the new part is scanned for the end of the value
+            end = self._find_end(text, 0)
+            self._parts.append(text)
+            if end is None:
+                self._received += len(text)
+                self._check_size(self._received)
+                return []
+            self._end = self._received + end
+            self._buffer = ''.join(self._parts)
+            self._parts = None
+        else:
+            # Drop what has been parsed before adding the next part, so
+            # the buffer only holds what follows the last value parsed
+            self._buffer = self._buffer[self._position:] + text
+        self._position = 0
+        return self._parse(False)
+
+    def close(self):
+        """ Finish parsing, once the whole body has been fed.
+
+        :Returns:
+        A list of the records completed by the end of the body
+
+        :Raises:
+        ValueError if the body was not a complete JSON object
+        """
+        records = self._parse(True)
+        if self._state != 'done' or self._parts is not None \
+                or _whitespace.match(self._buffer, self._position).end() \
+                != len(self._buffer):
+            raise ValueError('The response ended before it was complete.')
+        return records
+
+    def _token(self):
+        # Return the next character which is not whitespace
+        self._position = _whitespace.match(
+            self._buffer, self._position
+        ).end()
+        if self._position < len(self._buffer):
+            return self._buffer[self._position]
+        return None
+
+    def _value(self, final):
+        # Decode the next value, or return _incomplete and keep it aside
+        # until it has been fully received
+        if self._end is not None:
+            # The value has been received in parts, and is decoded once
+            end, self._end = self._end, None
+            try:
+                value, stop = _decoder.raw_decode(self._buffer, 0)
+            except JSONDecodeError:
+                stop = None
+            if stop != end:
+                raise ValueError('The response is not valid JSON.')
+            self._position = end
+            return value
+        try:
+            value, end = _decoder.raw_decode(self._buffer, self._position)
+        except JSONDecodeError:
+            if final:
+                raise ValueError('The response is not valid JSON.')
+        else:
+            # A number or literal is only complete once a character
+            # which ends it follows, as 1 may continue as 1.5 or 1e3 in
+            # the next part of the body
+            if final or self._buffer[self._position] in '{["' \
+                    or _scalar_end.match(self._buffer, end):
+                self._position = end
+                return value
+        # Scan the part received once, and only the new parts after it,
+        # for the end of the value
+        self._begin()
+        if self._find_end(self._buffer, self._position) is not None:
+            raise ValueError('The response is not valid JSON.')
+        self._parts = [self._buffer[self._position:]]
+        self._received = len(self._parts[0])
+        self._check_size(self._received)
+        self._buffer = ''
+        self._position = 0
+        return _incomplete
+
+    def _begin(self):
+        # Start scanning for the end of the value at the position
+        self._depth = 0
+        self._in_string = self._escape = False
+        self._scalar = self._buffer[self._position] not in '{["'
+
+    def _find_end(self, text, index):
+        # Continue the scan through text from index, returning the index
+        # after the end of the value, or None if it does not end in text
+        if self._scalar:
+            match = _scalar_end.search(text, index)
+            return None if match is None else match.start()
+        while True:
+            if self._escape:
+                if index >= len(text):
+                    return None
+                index += 1
+                self._escape = False
+            if self._in_string:
+                match = _string_end.search(text, index)
+                if match is None:
+                    return None
+                index = match.end()
+                if match.group() == '\\':
+                    self._escape = True
+                    continue
+                self._in_string = False
+                if self._depth == 0:
+                    return index
+                continue
+            match = _structural.search(text, index)
+            if match is None:
+                return None
+            index = match.end()
+            character = match.group()
+            if character == '"':
+                self._in_string = True
+            elif character in '{[':
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    return index
+
+    def _check_size(self, size):
+        if size > self.max_size:
+            raise ValueError('A record of the response is larger than %d'
+                             ' characters.' % self.max_size)
+
+    def _expect(self, token, allowed):
+        if token not in allowed:
+            raise ValueError('Expected %s at position %d of the response.'
+                             % (' or '.join(allowed), self._position))
+        self._position += 1
+        return token
+
+    def _parse(self, final):
+        records = []
+        while True:
+            token = self._token()
+            if token is None or self._state == 'done':
+                return records
+            state = self._state
+            if state == 'object':
+                self._expect(token, '{')
+                self._state = 'key'
+            elif state == 'key':
+                if token == '}':
+                    self._position += 1
+                    self._state = 'done'
+                    continue
+                key = self._value(final)
+                if key is _incomplete:
+                    return records
+                self._current = key
+                self._state = 'colon'
+            elif state == 'colon':
+                self._expect(token, ':')
+                self._state = 'value'
+            elif state == 'value':
+                if self._current == self.key and token == '[':
+                    self._position += 1
+                    self.found = True
+                    self._state = 'records'
+                    continue
+                if self._value(final) is _incomplete:
+                    return records
+                self._state = 'next'
+            elif state == 'next':
+                self._state = 'key' if self._expect(token, ',}') == ',' \
+                    else 'done'
+            elif state == 'records':
+                if token == ']':
+                    self._position += 1
+                    self._state = 'next'
+                    continue
+                record = self._value(final)
+                if record is _incomplete:
+                    return records
+                records.append(record)
+                self._state = 'separator'
+            elif state == 'separator':
+                self._state = 'records' if self._expect(token, ',]') == ',' \
+                    else 'next'
+
+
+def iter_array(chunks, key, encoding='utf-8'):
+    """ Yield the records of an array held under a key of a JSON object,
+    parsing the body as each chunk arrives.
+
+    :Args:
+    chunks - An iterable of the parts of the body, as bytes or strings
+    key - The key of the array whose records are returned
+    encoding - The encoding of chunks given as bytes
+    """
+    parser = ArrayParser(key)
+    decoder = getincrementaldecoder(encoding)()
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        yield from parser.feed(chunk)
+    parser.feed(decoder.decode(b'', True))
+    yield from parser.close()
+
+
+async def aiter_array(chunks, key, encoding='utf-8'):
+    """ Yield the records of an array held under a key of a JSON object,
+    parsing the body as each chunk arrives. See iter_array.
+
+    :Args:
+    chunks - An async iterable of the parts of the body, as bytes or
+        strings
+    key - The key of the array whose records are returned
+    encoding - The encoding of chunks given as bytes
+    """
+    parser = ArrayParser(key)
+    decoder = getincrementaldecoder(encoding)()
+    async for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        for record in parser.feed(chunk):
+            yield record
+    parser.feed(decoder.decode(b'', True))
+    for record in parser.close():
+        yield record
@@ -0,0 +1,78 @@
+from ...aio import AsyncEazySDK
+from ...aio import AsyncResponse
+from ...exceptions import ResourceNotFoundError
+from ...exceptions import InvalidParameterError
+from ...settings import Settings as s
+import asyncio
+import unittest
+
+
+class RecordingTransport:
+    """ Answers every request with a canned body, recording the calls
+    made against it.
+    """
+    def __init__(self, body, status=200):
+        self.body = body
+        self.status = status
+        self.calls = []
+
+    async def request(self, method, url, params=None, headers=None,
+                      timeout=None, deadline=None):
+        self.calls.append((method, url, params))
+        await asyncio.sleep(0)
+        return AsyncResponse(self.status, {}, self.body)
+
+    async def close(self):
+        pass
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        s.sandbox_client_details['client_code'] = 'SDKTST'
+        self.eazy = AsyncEazySDK()
+
+    def use(self, body, status=200):
+        transport = RecordingTransport(body, status)
+        for verb in (self.eazy.get, self.eazy.post, self.eazy.patch,
+                     self.eazy.delete):
+            verb.sdk.transport = transport
+        return transport
+
+    def test_get_contracts_is_awaited(self):
+        transport = self.use('{"Contracts":[{"Id":"1"}]}')
+        req = asyncio.run(self.eazy.get.contracts('abc'))
+        self.assertEqual(req, '{"Contracts":[{"Id":"1"}]}')
+        self.assertEqual(transport.calls[0][0], 'GET')
+        self.assertIn('/client/SDKTST/customer/abc/contract',
+                      transport.calls[0][1])
+
+    def test_response_handling_is_shared(self):
+        self.use('{"Contracts":[]}')
+        req = asyncio.run(self.eazy.get.contracts('abc'))
+        self.assertEqual(req, 'The customer abc does not own any contracts')
+
+    def test_common_exceptions_are_mapped(self):
+        self.use('{"Message":"No HTTP resource was found that matches the'
+                 ' request URI"}', 404)
+        with self.assertRaises(ResourceNotFoundError):
+            asyncio.run(self.eazy.get.contracts('abc'))
+
+    def test_validation_is_shared(self):
+        transport = self.use('{}')
+        with self.assertRaises(InvalidParameterError):
+            asyncio.run(self.eazy.get.callback_url('not_an_entity'))
+        self.assertEqual(transport.calls, [])
+
+    def test_concurrent_calls_keep_their_own_params(self):
+        transport = self.use('{"Payments":[{"Id":"1"}]}')
+
+        async def run():
+            await asyncio.gather(
+                self.eazy.get.payments('a', number_of_rows=1),
+                self.eazy.get.payments('b', number_of_rows=2),
+            )
+        asyncio.run(run())
+        rows = {url.split('/')[-2]: dict(params)['rows']
+                for method, url, params in transport.calls}
+        self.assertEqual(rows, {'a': 1, 'b': 2})
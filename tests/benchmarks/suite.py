@@ -0,0 +1,57 @@
+from ...benchmarks import suite
+from ...settings import Settings as s
+import json
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+
+def results(**medians):
+    return {'results': {
+        name: {'median': value} for name, value in medians.items()
+    }}
+
+
+class Test(unittest.TestCase):
+    def test_slower_benchmarks_are_regressions(self):
+        comparison = suite.compare(
+            results(fast=1.0, slow=1.0, gone=1.0),
+            results(fast=1.05, slow=1.5, new=1.0),
+            threshold=0.1,
+        )
+        self.assertEqual(
+            [(row['name'], row['regressed']) for row in comparison],
+            [('fast', False), ('slow', True)],
+        )
+
+    def test_measure_reports_seconds_per_operation(self):
+        result = suite.measure(lambda: None, rounds=3)
+        self.assertEqual(result['rounds'], 3)
+        self.assertGreater(result['number'], 1)
+        self.assertLessEqual(result['min'], result['median'])
+
+    def test_settings_are_restored_after_running(self):
+        base_url = s.other['base_url']
+        results = suite.run(['schedules.lookup', 'post.contract'],
+                            rounds=1, customers=1)
+        self.assertEqual(set(results['results']),
+                         {'schedules.lookup', 'post.contract'})
+        self.assertEqual(s.other['base_url'], base_url)
+
+    def test_startup_is_measured_in_a_fresh_interpreter(self):
+        results = suite.run(['startup.import'], rounds=1, customers=1)
+        result = results['results']['startup.import']
+        self.assertGreaterEqual(result['median'], result['min'])
+        self.assertGreater(result['min'], 0)
+
+    def test_regressions_fail_the_run(self):
+        with TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, 'baseline.json')
+            with open(baseline, 'w') as file:
+                json.dump(results(**{'schedules.lookup': 1e-12}), file)
+            status = suite.main([
+                '--only', 'schedules.lookup', '--rounds', '1',
+                '--output', os.path.join(directory, 'new.json'),
+                '--compare', baseline,
+            ])
+        self.assertEqual(status, 1)
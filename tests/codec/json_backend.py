@@ -0,0 +1,123 @@
+from ... import codec
+from ... import models
+from ...exceptions import InvalidSettingsConfiguration
+from ...session import Request
+from ...session import Response
+from ...session import Session
+from ...settings import Settings as s
+from json import JSONDecodeError
+import sys
+import unittest
+
+body = '{"Customers":[{"Id":"1","Surname":"Caf\\u00e9","Amount":10.00}]}'
+
+
+class Received:
+    """ A response as received by requests, with its body as bytes.
+    """
+    status_code = 200
+    headers = {}
+    encoding = 'utf-8'
+
+    def __init__(self, content):
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding)
+
+
+class Transport:
+    def __init__(self, content):
+        self.response = Received(content)
+
+    def request(self, *args, **kwargs):
+        return self.response
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.saved = s.other['json_backend']
+        codec._backends.clear()
+
+    def tearDown(self):
+        s.other['json_backend'] = self.saved
+        codec._backends.clear()
+        codec._factories.pop('recording', None)
+
+    def test_auto_prefers_orjson(self):
+        s.other['json_backend'] = 'auto'
+        try:
+            import orjson
+        except ImportError:
+            self.assertEqual(codec.backend().name, 'json')
+        else:
+            self.assertEqual(codec.backend().name, 'orjson')
+
+    def test_auto_falls_back_to_the_standard_library(self):
+        s.other['json_backend'] = 'auto'
+        saved = sys.modules.get('orjson')
+        # A None entry makes the import fail as if orjson was missing
+        sys.modules['orjson'] = None
+        try:
+            self.assertEqual(codec.backend().name, 'json')
+            codec._backends.clear()
+            s.other['json_backend'] = 'orjson'
+            with self.assertRaises(ImportError):
+                codec.backend()
+        finally:
+            if saved is None:
+                del sys.modules['orjson']
+            else:
+                sys.modules['orjson'] = saved
+
+    def test_backends_parse_bytes_and_text_alike(self):
+        backends = ['json']
+        try:
+            import orjson
+            backends.append('orjson')
+        except ImportError:
+            pass
+        for name in backends:
+            s.other['json_backend'] = name
+            parsed = codec.loads(body.encode('utf-8'))
+            self.assertEqual(parsed, codec.loads(body))
+            self.assertEqual(parsed, Response(body).json())
+            self.assertEqual(parsed['Customers'][0]['Surname'], 'Café')
+            self.assertEqual(codec.loads(codec.dumps(parsed)), parsed)
+            with self.assertRaises(JSONDecodeError):
+                codec.loads(b'{"Customers":')
+
+    def test_registered_backends_are_used_by_the_sdk(self):
+        calls = []
+
+        def recording_loads(data):
+            calls.append(data)
+            return codec._stdlib().loads(data)
+        codec.register('recording', recording_loads, codec._stdlib().dumps)
+        s.other['json_backend'] = 'recording'
+        self.assertEqual(models.customers(body)[0].id, '1')
+        self.assertEqual(Response(body).json()['Customers'][0]['Id'], '1')
+        self.assertEqual(calls, [body, body.encode('utf-8')])
+
+    def test_responses_are_parsed_from_the_bytes_received(self):
+        calls = []
+
+        def recording_loads(data):
+            calls.append(data)
+            return codec._stdlib().loads(data)
+        codec.register('recording', recording_loads, codec._stdlib().dumps)
+        s.other['json_backend'] = 'recording'
+        content = body.encode('utf-8')
+        session = Session(transport=Transport(content))
+        response = session.send(Request('GET', 'customer'))
+        self.assertIs(response.content, content)
+        self.assertEqual(codec.loads(response)['Customers'][0]['Id'], '1')
+        self.assertEqual(models.customers(response)[0].id, '1')
+        self.assertIs(calls[0], content)
+        self.assertIs(calls[1], content)
+
+    def test_unknown_backends_are_rejected(self):
+        s.other['json_backend'] = 'simplejson'
+        with self.assertRaises(InvalidSettingsConfiguration):
+            codec.loads(body)
@@ -0,0 +1,199 @@
+from ... import main
+from ...aio import AsyncEazySDK
+from ...benchmarks import suite
+from ...exceptions import InvalidParameterError
+from ...exceptions import InvalidStartDateError
+from ...exceptions import ParameterNotAllowedError
+from ...fakeserver import AsyncFakeTransport
+from ...fakeserver import FakeTransport
+from ...settings import Settings as s
+from ...utils import contract_checks
+from ...utils.contract_checks import ContractContext
+from ...utils.schedules import registry
+from datetime import date
+from datetime import timedelta
+from tempfile import TemporaryDirectory
+from threading import current_thread
+from threading import main_thread
+from unittest import mock
+import asyncio
+import os
+import unittest
+
+
+def row(customer, **changes):
+    return dict({
+        'customer': customer,
+        'schedule_name': 'Ad-Hoc Free',
+        'start_date': str(date.today() + timedelta(days=30)),
+        'gift_aid': False,
+        'termination_type': 'Until further notice',
+        'at_the_end': 'Switch to further notice',
+    }, **changes)
+
+
+def weekly(customer, **changes):
+    return row(customer, **dict({
+        'schedule_name': 'Weekly Free',
+        'frequency': 1,
+        'payment_amount': '10.00',
+        'payment_day_in_week': 'Monday',
+    }, **changes))
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        offline = suite.offline()
+        self.ecm3 = offline.__enter__()
+        self.addCleanup(offline.__exit__, None, None, None)
+        saved = dict(s.contracts)
+        self.addCleanup(s.contracts.update, saved)
+        s.contracts['auto_start_date'] = False
+        self.customers = self.ecm3.populate(customers=3)
+        self.eazy = main.EazySDK()
+        self.eazy.session.transport = FakeTransport(self.ecm3)
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def created(self):
+        return sum(
+            count for route, count in self.ecm3.stats()['routes'].items()
+            if route.startswith('POST customer/')
+        )
+
+    def test_shared_facts_are_resolved_once_per_batch(self):
+        rows = [
+            (weekly if i % 2 else row)(self.customers[i % 3],
+                                       additional_reference=str(i))
+            for i in range(12)
+        ]
+        lookup = mock.patch.object(
+            registry, 'lookup', wraps=registry.lookup
+        )
+        count = mock.patch.object(
+            contract_checks, 'check_working_days_in_future',
+            wraps=contract_checks.check_working_days_in_future,
+        )
+        with lookup as lookups, count as counts:
+            results = list(self.eazy.post.bulk_contracts(rows))
+        self.assertEqual(sorted(r.row for r in results), list(range(12)))
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual({r.id for r in results}, set(self.ecm3.contracts))
+        self.assertEqual(lookups.call_count, 2)
+        self.assertEqual(counts.call_count, 1)
+
+    def test_invalid_rows_are_reported_without_being_submitted(self):
+        customer = self.customers[0]
+        results = {r.row: r for r in self.eazy.post.bulk_contracts([
+            row(customer),
+            row(customer, schedule_name='Fortnightly Free'),
+            row(customer, start_date=str(date.today())),
+            row(customer, start_date='next week'),
+            row('', additional_reference='1'),
+            weekly(customer, payment_day_in_week='Sunday'),
+            row(customer, initial_amount='5.00'),
+            row(customer, additional_reference='2', nickname='Tester'),
+        ])}
+        self.assertTrue(results[0].ok)
+        self.assertIsInstance(results[1].error, InvalidParameterError)
+        self.assertIsInstance(results[2].error, InvalidStartDateError)
+        self.assertIsInstance(results[3].error, InvalidParameterError)
+        self.assertIsInstance(results[4].error, InvalidParameterError)
+        self.assertIsInstance(results[5].error, InvalidParameterError)
+        self.assertIsInstance(results[6].error, ParameterNotAllowedError)
+        self.assertIsInstance(results[7].error, ParameterNotAllowedError)
+        self.assertEqual(self.created(), 1)
+
+    def test_payment_month_in_year_is_fixed_from_the_start_date(self):
+        s.contracts['auto_fix_payment_month_in_year'] = True
+        start = (date.today() + timedelta(days=60)).replace(day=10)
+        results = list(self.eazy.post.bulk_contracts([row(
+            self.customers[0], schedule_name='Annual Free', frequency=1,
+            payment_amount='10.00', start_date=str(start),
+            payment_month_in_year=month, payment_day_in_month=10,
+            additional_reference=str(month),
+        ) for month in (start.month % 12 + 1, start.month)]))
+        for result in results:
+            self.assertTrue(result.ok, result.error)
+            contract = self.ecm3.contracts[result.id]
+            self.assertEqual(int(contract['PaymentMonthInYear']),
+                             start.month)
+
+    def test_start_dates_are_counted_from_the_batch_date(self):
+        start = date.today() + timedelta(days=30)
+        earliest = ContractContext(start).first_date()
+        self.assertGreater(earliest, start)
+        results = list(self.eazy.post.bulk_contracts(
+            [row(self.customers[0], start_date=str(start))], as_of=start,
+        ))
+        self.assertIsInstance(results[0].error, InvalidStartDateError)
+        self.assertIn(str(earliest), str(results[0].error))
+
+    def test_interrupted_runs_resume_from_the_checkpoint(self):
+        checkpoint = os.path.join(self.directory.name, 'checkpoint')
+        rows = [
+            row(customer, additional_reference=str(i))
+            for i, customer in enumerate(self.customers * 2)
+        ]
+        first = list(self.eazy.post.bulk_contracts(
+            rows[:4], checkpoint=checkpoint,
+        ))
+        results = list(self.eazy.post.bulk_contracts(
+            rows, checkpoint=checkpoint,
+        ))
+        self.assertEqual(self.created(), 6)
+        self.assertEqual(
+            {r.key: r.id for r in results if r.resumed},
+            {r.key: r.id for r in first},
+        )
+
+    def test_identical_rows_each_create_a_contract(self):
+        checkpoint = os.path.join(self.directory.name, 'checkpoint')
+        rows = [row(self.customers[0])] * 6
+        first = list(self.eazy.post.bulk_contracts(
+            rows, workers=1, checkpoint=checkpoint,
+        ))
+        self.assertTrue(all(r.ok and not r.resumed for r in first))
+        self.assertEqual(len(self.ecm3.contracts), 6)
+        results = list(self.eazy.post.bulk_contracts(
+            rows, checkpoint=checkpoint,
+        ))
+        self.assertTrue(all(r.resumed for r in results))
+        self.assertEqual({r.id for r in results}, set(self.ecm3.contracts))
+
+    def test_contracts_are_created_asynchronously(self):
+        eazy = AsyncEazySDK()
+        eazy.session.transport = AsyncFakeTransport(self.ecm3)
+
+        async def create():
+            return [result async for result in eazy.post.bulk_contracts(
+                [row(customer) for customer in self.customers]
+                + [row(self.customers[0], schedule_name='Unknown')],
+            )]
+        results = asyncio.run(create())
+        self.assertEqual(sum(r.ok for r in results), 3)
+        self.assertEqual(len(self.ecm3.contracts), 3)
+
+    def test_async_validation_does_not_block_the_event_loop(self):
+        threads = []
+        count = contract_checks.check_working_days_in_future
+
+        def recorded(*args):
+            threads.append(current_thread())
+            return count(*args)
+        eazy = AsyncEazySDK()
+        eazy.session.transport = AsyncFakeTransport(self.ecm3)
+
+        async def create():
+            contract = await eazy.post.contract(**row(self.customers[0]))
+            results = [result async for result in eazy.post.bulk_contracts(
+                [row(customer) for customer in self.customers[1:]],
+            )]
+            return contract, results
+        with mock.patch.object(contract_checks,
+                               'check_working_days_in_future', recorded):
+            contract, results = asyncio.run(create())
+        self.assertIn('Contract', contract)
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(main_thread(), threads)
@@ -0,0 +1,221 @@
+from ... import main
+from ...aio import AsyncEazySDK
+from ...bulk import Checkpoint
+from ...exceptions import InvalidParameterError
+from ...exceptions import ParameterNotAllowedError
+from ...exceptions import RecordAlreadyExistsError
+from ...exceptions import ServerError
+from ...fakeserver import AsyncFakeTransport
+from ...fakeserver import FakeECM3
+from ...fakeserver import FakeTransport
+from ...retry import RetryPolicy
+from ...settings import Settings as s
+from tempfile import TemporaryDirectory
+from threading import Lock
+from time import sleep
+import asyncio
+import csv
+import os
+import unittest
+
+
+def row(number, **changes):
+    return dict({
+        'email': 'customer%d@example.com' % number,
+        'title': 'Mx',
+        'customer_reference': 'BULK%06d' % number,
+        'first_name': 'Test',
+        'surname': 'Customer%d' % number,
+        'line1': '1 Test Road',
+        'post_code': 'GL52 2NF',
+        'account_number': '12345678',
+        'sort_code': '123456',
+        'account_holder_name': 'Mx Test Customer',
+    }, **changes)
+
+
+class CountingTransport(FakeTransport):
+    """ Records the most requests in flight at once.
+    """
+    def __init__(self, server):
+        super(CountingTransport, self).__init__(server)
+        self.lock = Lock()
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    def request(self, *args, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        try:
+            sleep(0.005)
+            return super(CountingTransport, self).request(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class FailingTransport(AsyncFakeTransport):
+    """ Fails the requests for one customer reference with an aiohttp
+    error.
+    """
+    def __init__(self, server, customer_reference):
+        super(FailingTransport, self).__init__(server)
+        self.customer_reference = customer_reference
+
+    async def request(self, method, url, params=None, **kwargs):
+        from aiohttp import ClientError
+        if ('customerRef', self.customer_reference) in (params or ()):
+            raise ClientError('Connection reset by peer')
+        return await super(FailingTransport, self).request(
+            method, url, params, **kwargs
+        )
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        s.sandbox_client_details['client_code'] = 'SDKTST'
+        self.ecm3 = FakeECM3(seed=1)
+        self.eazy = main.EazySDK()
+        self.transport = CountingTransport(self.ecm3)
+        self.eazy.session.transport = self.transport
+        self.directory = TemporaryDirectory()
+        self.checkpoint = os.path.join(self.directory.name, 'checkpoint')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def created(self):
+        return self.ecm3.stats()['routes'].get('POST customer', 0)
+
+    def test_every_valid_row_is_created(self):
+        results = list(self.eazy.post.bulk_customers(
+            [row(i) for i in range(20)], workers=4
+        ))
+        self.assertEqual(sorted(r.row for r in results), list(range(20)))
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual({r.id for r in results}, set(self.ecm3.customers))
+        self.assertLessEqual(self.transport.most_in_flight, 4)
+        self.assertGreater(self.transport.most_in_flight, 1)
+
+    def test_invalid_rows_are_reported_without_being_submitted(self):
+        results = {r.row: r for r in self.eazy.post.bulk_customers([
+            row(0), row(1, post_code='GL52'), row(2, email=''),
+            row(3, nickname='Tester'), row(4),
+        ])}
+        self.assertIsInstance(results[1].error, InvalidParameterError)
+        self.assertIsInstance(results[2].error, InvalidParameterError)
+        self.assertIsInstance(results[3].error, ParameterNotAllowedError)
+        self.assertTrue(results[0].ok and results[4].ok)
+        self.assertEqual(self.created(), 2)
+
+    def test_rows_are_read_from_csv(self):
+        path = os.path.join(self.directory.name, 'customers.csv')
+        with open(path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, list(row(0)) + ['line2'])
+            writer.writeheader()
+            for i in range(5):
+                writer.writerow(row(i))
+        results = list(self.eazy.post.bulk_customers(path))
+        self.assertEqual(sorted(r.key for r in results),
+                         ['BULK%06d' % i for i in range(5)])
+        self.assertTrue(all(r.ok for r in results))
+
+    def test_failed_submissions_are_returned_as_results(self):
+        self.eazy.session.retry_policy = RetryPolicy(max_attempts=1)
+        self.ecm3.populate(customers=0)
+        list(self.eazy.post.bulk_customers([row(0)]))
+        results = list(self.eazy.post.bulk_customers([row(0), row(1)]))
+        errors = {r.key: r.error for r in results}
+        self.assertIsInstance(errors['BULK000000'], RecordAlreadyExistsError)
+        self.assertIsNone(errors['BULK000001'])
+        self.ecm3.error_rate = 1
+        self.ecm3.error_statuses = (500,)
+        results = list(self.eazy.post.bulk_customers([row(2)]))
+        self.assertIsInstance(results[0].error, ServerError)
+
+    def test_interrupted_runs_resume_from_the_checkpoint(self):
+        results = self.eazy.post.bulk_customers(
+            [row(i) for i in range(10)], workers=2,
+            checkpoint=self.checkpoint,
+        )
+        first = [next(results) for i in range(4)]
+        results.close()
+        created = self.created()
+        self.assertGreaterEqual(created, 4)
+
+        results = list(self.eazy.post.bulk_customers(
+            [row(i) for i in range(10)], workers=2,
+            checkpoint=self.checkpoint,
+        ))
+        self.assertEqual(len(results), 10)
+        self.assertEqual(self.created(), 10)
+        self.assertEqual(len(self.ecm3.customers), 10)
+        resumed = {r.key: r.id for r in results if r.resumed}
+        self.assertEqual(len(resumed), created)
+        for result in first:
+            self.assertEqual(resumed[result.key], result.id)
+
+    def test_repeated_keys_are_reported_as_errors(self):
+        for run in range(2):
+            results = sorted(self.eazy.post.bulk_customers(
+                [row(0)] * 3, workers=3, checkpoint=self.checkpoint,
+            ))
+            self.assertTrue(results[0].ok)
+            self.assertEqual(results[0].resumed, run == 1)
+            for result in results[1:]:
+                self.assertIsInstance(result.error, InvalidParameterError)
+                self.assertFalse(result.resumed)
+        self.assertEqual(self.created(), 1)
+
+    def test_lines_cut_short_are_ignored(self):
+        with open(self.checkpoint, 'w') as file:
+            file.write('BULK000000,abc\nBULK000001,de')
+        with Checkpoint(self.checkpoint) as checkpoint:
+            self.assertEqual(len(checkpoint), 1)
+            checkpoint.record('BULK000002', 'fgh')
+        with Checkpoint(self.checkpoint) as checkpoint:
+            self.assertEqual(checkpoint['BULK000002'], 'fgh')
+            self.assertNotIn('BULK000001', checkpoint)
+
+    def test_rows_are_read_as_workers_become_free(self):
+        read = []
+
+        def rows():
+            for i in range(100):
+                read.append(i)
+                yield row(i)
+        results = self.eazy.post.bulk_customers(rows(), workers=2)
+        next(results)
+        self.assertLess(len(read), 10)
+        results.close()
+
+    def test_async_transport_errors_are_returned_as_results(self):
+        from aiohttp import ClientError
+        eazy = AsyncEazySDK()
+        eazy.session.transport = FailingTransport(self.ecm3, 'BULK000001')
+        eazy.session.retry_policy = RetryPolicy(max_attempts=1)
+
+        async def onboard():
+            return [result async for result in eazy.post.bulk_customers(
+                [row(i) for i in range(3)],
+            )]
+        results = {r.key: r for r in asyncio.run(onboard())}
+        self.assertIsInstance(results['BULK000001'].error, ClientError)
+        self.assertTrue(results['BULK000000'].ok)
+        self.assertTrue(results['BULK000002'].ok)
+
+    def test_customers_are_created_asynchronously(self):
+        eazy = AsyncEazySDK()
+        eazy.session.transport = AsyncFakeTransport(self.ecm3)
+
+        async def onboard():
+            return [result async for result in eazy.post.bulk_customers(
+                [row(i) for i in range(10)] + [row(10, sort_code='1')],
+                checkpoint=self.checkpoint,
+            )]
+        results = asyncio.run(onboard())
+        self.assertEqual(sum(r.ok for r in results), 10)
+        with Checkpoint(self.checkpoint) as checkpoint:
+            self.assertEqual(len(checkpoint), 10)
@@ -0,0 +1,136 @@
+from ... import main
+from ...aio import AsyncEazySDK
+from ...circuit import CircuitBreaker
+from ...exceptions import InvalidParameterError
+from ...fakeserver import AsyncFakeTransport
+from ...fakeserver import FakeECM3
+from ...fakeserver import FakeTransport
+from ...get import customer_windows
+from ...retry import RetryPolicy
+from ...settings import Settings as s
+from datetime import date
+from datetime import timedelta
+from requests.exceptions import ReadTimeout
+from threading import Event
+import asyncio
+import unittest
+
+
+def window_days(params):
+    params = dict(params)
+    start = date.fromisoformat(params['from'])
+    return (date.fromisoformat(params['to']) - start).days
+
+
+class SlowTransport(FakeTransport):
+    """ Times out searches of windows longer than a number of days, as
+    EazyCustomerManager does for searches returning many customers.
+    """
+    def __init__(self, server, max_days):
+        super(SlowTransport, self).__init__(server)
+        self.max_days = max_days
+        self.windows = []
+
+    def request(self, method, url, params=None, **kwargs):
+        self.windows.append(window_days(params))
+        if window_days(params) > self.max_days:
+            raise ReadTimeout()
+        return super(SlowTransport, self).request(
+            method, url, params, **kwargs
+        )
+
+
+class GatedTransport(FakeTransport):
+    """ Holds the search of the window starting on a given date until
+    the gate is opened.
+    """
+    def __init__(self, server, start):
+        super(GatedTransport, self).__init__(server)
+        self.start = start
+        self.gate = Event()
+
+    def request(self, method, url, params=None, **kwargs):
+        if dict(params)['from'] == self.start:
+            self.gate.wait(5)
+        return super(GatedTransport, self).request(
+            method, url, params, **kwargs
+        )
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        s.sandbox_client_details['client_code'] = 'SDKTST'
+        self.ecm3 = FakeECM3(seed=1)
+        self.ecm3.populate(customers=200, days=60)
+        self.since = date.today() - timedelta(days=61)
+        self.eazy = main.EazySDK()
+        self.eazy.session.transport = FakeTransport(self.ecm3)
+
+    def test_windows_cover_the_search_without_gaps(self):
+        windows = customer_windows('2020-01-01', '2020-01-11', 3)
+        self.assertEqual(windows[0][0], date(2020, 1, 1))
+        self.assertEqual(windows[-1][1], date(2020, 1, 11))
+        for first, second in zip(windows, windows[1:]):
+            self.assertEqual(first[1], second[0])
+
+    def test_invalid_dates_are_rejected(self):
+        with self.assertRaises(InvalidParameterError):
+            customer_windows('2020-01-11', '2020-01-01')
+        with self.assertRaises(InvalidParameterError):
+            customer_windows('11/01/2020')
+
+    def test_every_customer_is_yielded_once(self):
+        customers = list(self.eazy.get.iter_customers(self.since))
+        ids = [customer['Id'] for customer in customers]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), set(self.ecm3.customers))
+
+    def test_criteria_are_applied_to_every_window(self):
+        customers = list(self.eazy.get.iter_customers(
+            self.since, surname='Customer7'
+        ))
+        self.assertEqual([c['Surname'] for c in customers], ['Customer7'])
+
+    def test_slow_windows_are_bisected(self):
+        transport = SlowTransport(self.ecm3, max_days=5)
+        self.eazy.session.transport = transport
+        # Slow windows are failures, which would open the circuit
+        self.eazy.session.circuit_breaker = CircuitBreaker(100)
+        self.eazy.session.retry_policy = RetryPolicy(max_attempts=1)
+        customers = list(self.eazy.get.iter_customers(
+            self.since, workers=2, window_seconds=1,
+        ))
+        self.assertEqual(len(customers), 200)
+        self.assertGreater(max(transport.windows), 5)
+
+    def test_large_windows_split_the_remaining_windows(self):
+        transport = SlowTransport(self.ecm3, max_days=100)
+        self.eazy.session.transport = transport
+        list(self.eazy.get.iter_customers(
+            self.since, workers=1, windows=4, max_customers=10,
+        ))
+        self.assertEqual(transport.windows[:2], [15, 8])
+
+    def test_customers_are_streamed_as_windows_finish(self):
+        transport = GatedTransport(self.ecm3, str(self.since))
+        self.eazy.session.transport = transport
+        customers = self.eazy.get.iter_customers(
+            self.since, workers=2, windows=2
+        )
+        # The first window is held, so the second window is read first
+        self.assertGreater(
+            date.fromisoformat(next(customers)['DateAdded'][:10]),
+            self.since + timedelta(days=29),
+        )
+        transport.gate.set()
+        self.assertEqual(len(list(customers)), 199)
+
+    def test_customers_are_awaited(self):
+        eazy = AsyncEazySDK()
+        eazy.session.transport = AsyncFakeTransport(self.ecm3)
+
+        async def search():
+            return [customer async for customer
+                    in eazy.get.iter_customers(self.since)]
+        self.assertEqual(len(asyncio.run(search())), 200)
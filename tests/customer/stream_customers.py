@@ -0,0 +1,192 @@
+from ... import main
+from ...aio import AsyncEazySDK
+from ...exceptions import InvalidParameterError
+from ...exceptions import SDKNotEnabledError
+from ...exceptions import ServerError
+from ...fakeserver import AsyncFakeTransport
+from ...fakeserver import FakeECM3
+from ...fakeserver import FakeTransport
+from ...retry import RetryPolicy
+from ...settings import Settings as s
+from ... import stream
+from ...stream import ArrayParser
+from ...stream import iter_array
+from json import JSONDecoder
+from unittest import mock
+import asyncio
+import json
+import random
+import unittest
+
+
+class ChunkedResponse:
+    """ A streamed response whose body is read a chunk at a time,
+    recording how much of the body has been read.
+    """
+    def __init__(self, response, size):
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.text = response.text
+        self.body = response.text.encode('utf-8')
+        self.size = size
+        self.read = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        while self.read < len(self.body):
+            chunk = self.body[self.read:self.read + self.size]
+            self.read += len(chunk)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+class StreamingTransport(FakeTransport):
+    def __init__(self, server, size):
+        super(StreamingTransport, self).__init__(server)
+        self.size = size
+        self.responses = []
+
+    def request(self, method, url, params=None, stream=False, **kwargs):
+        response = super(StreamingTransport, self).request(
+            method, url, params, **kwargs
+        )
+        if stream:
+            response = ChunkedResponse(response, self.size)
+            self.responses.append(response)
+        return response
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        s.sandbox_client_details['client_code'] = 'SDKTST'
+        self.ecm3 = FakeECM3(seed=1)
+        self.ecm3.populate(customers=200)
+        self.eazy = main.EazySDK()
+        self.transport = StreamingTransport(self.ecm3, 100)
+        self.eazy.session.transport = self.transport
+
+    def test_every_customer_is_streamed(self):
+        customers = list(self.eazy.get.stream_customers())
+        self.assertEqual(
+            customers, json.loads(self.eazy.get.customers())['Customers']
+        )
+        self.assertTrue(self.transport.responses[0].closed)
+
+    def test_customers_are_yielded_before_the_body_is_read(self):
+        customers = self.eazy.get.stream_customers()
+        next(customers)
+        response = self.transport.responses[0]
+        self.assertLess(response.read, len(response.body) / 10)
+        customers.close()
+        self.assertTrue(response.closed)
+
+    def test_criteria_are_applied(self):
+        customers = list(self.eazy.get.stream_customers(
+            surname='Customer7'
+        ))
+        self.assertEqual([c['Surname'] for c in customers], ['Customer7'])
+
+    def test_invalid_criteria_are_rejected_before_sending(self):
+        with self.assertRaises(InvalidParameterError):
+            self.eazy.get.stream_customers(surnames='Customer7')
+        self.assertEqual(self.transport.responses, [])
+
+    def test_unsuccessful_responses_are_classified(self):
+        self.eazy.session.retry_policy = RetryPolicy(max_attempts=1)
+        self.ecm3.error_rate = 1
+        self.ecm3.error_statuses = (503,)
+        with self.assertRaises(ServerError):
+            list(self.eazy.get.stream_customers())
+        self.ecm3.error_rate = 0
+        self.ecm3.api_key = 'another key'
+        with self.assertRaises(SDKNotEnabledError):
+            list(self.eazy.get.stream_customers())
+
+    def test_parser_is_independent_of_chunking(self):
+        body = json.dumps({
+            'Meta': {'Count': [1, 2.5, None, False, True]},
+            'Customers': [{'Id': str(i), 'Name': 'Café "%d"' % i,
+                           'Balance': -i * 0.5}
+                          for i in range(50)],
+            'More': 'x',
+        }).encode('utf-8')
+        expected = json.loads(body)['Customers']
+        generator = random.Random(1)
+        for i in range(50):
+            cuts = sorted(generator.sample(range(1, len(body)), 20))
+            chunks = [body[a:b] for a, b
+                      in zip([0] + cuts, cuts + [len(body)])]
+            self.assertEqual(list(iter_array(chunks, 'Customers')),
+                             expected)
+
+    def test_strings_are_split_at_every_position(self):
+        body = json.dumps({'Customers': [
+            {'Note': 'a "quoted" ]}[{ \\ note', 'Tags': [[], {}, '\\']},
+            {'Note': '\\"', 'Count': 12345},
+        ]})
+        expected = json.loads(body)['Customers']
+        for cut in range(1, len(body)):
+            parser = ArrayParser('Customers')
+            records = parser.feed(body[:cut]) + parser.feed(body[cut:])
+            self.assertEqual(records + parser.close(), expected)
+
+    def test_bodies_are_split_at_every_byte(self):
+        body = json.dumps({
+            'Total': -25000000000.0,
+            'Customers': [
+                -25000000000.0, {'a': 1}, 1.5e-7, 2E+10, 0, -0.25, True,
+                False, None, 'Zoë ünïcode €', {'Note': 'a \\ "b"'},
+                [12, 3.25, 1e3], 123456789012345678901234567890,
+            ],
+            'Next': 1e300,
+        }, ensure_ascii=False).encode('utf-8')
+        expected = json.loads(body)['Customers']
+        for cut in range(1, len(body)):
+            records = list(iter_array([body[:cut], body[cut:]],
+                                      'Customers'))
+            self.assertEqual(records, expected, cut)
+
+    def test_large_records_are_decoded_once(self):
+        record = {'Id': '1', 'Notes': ['note %d' % i for i in range(20000)]}
+        body = json.dumps({'Customers': [record]})
+        decoded = []
+
+        class Decoder(JSONDecoder):
+            def raw_decode(self, text, index=0):
+                decoded.append(index)
+                return super(Decoder, self).raw_decode(text, index)
+        parser = ArrayParser('Customers')
+        with mock.patch.object(stream, '_decoder', Decoder()):
+            records = []
+            for i in range(0, len(body), 16):
+                records += parser.feed(body[i:i + 16])
+            records += parser.close()
+        self.assertEqual(records, [record])
+        # The key, then the record while it was incomplete, and once it
+        # was complete, rather than once for each part of the body
+        self.assertEqual(len(decoded), 3)
+
+    def test_values_which_never_end_are_rejected(self):
+        parser = ArrayParser('Customers', max_size=1000)
+        parser.feed('{"Customers":[{"Notes":"')
+        with self.assertRaises(ValueError):
+            for i in range(100):
+                parser.feed('x' * 100)
+
+    def test_incomplete_bodies_are_rejected(self):
+        parser = ArrayParser('Customers')
+        parser.feed('{"Customers":[{"Id":"1"},')
+        with self.assertRaises(ValueError):
+            parser.close()
+
+    def test_customers_are_streamed_asynchronously(self):
+        eazy = AsyncEazySDK()
+        eazy.session.transport = AsyncFakeTransport(self.ecm3)
+
+        async def search():
+            return [customer async for customer
+                    in eazy.get.stream_customers()]
+        self.assertEqual(len(asyncio.run(search())), 200)
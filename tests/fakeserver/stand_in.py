@@ -0,0 +1,136 @@
+from ... import main
+from ...exceptions import RequestTimeoutError
+from ...exceptions import ResourceNotFoundError
+from ...exceptions import ServerError
+from ...fakeserver import FakeECM3
+from ...fakeserver import FakeTransport
+from ...fakeserver import constant
+from ...retry import RetryPolicy
+from ...settings import Settings as s
+from ...utils.schedules import registry
+from datetime import date
+from datetime import timedelta
+from json import loads
+from tempfile import TemporaryDirectory
+from time import monotonic
+import unittest
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.saved = dict(s.other), dict(s.sandbox_client_details)
+        s.current_environment['env'] = 'sandbox'
+        s.sandbox_client_details['client_code'] = 'SDKTST'
+        s.sandbox_client_details['api_key'] = 'key'
+        self.ecm3 = FakeECM3(seed=1)
+        self.eazy = main.EazySDK()
+        self.eazy.session.transport = FakeTransport(self.ecm3)
+        self.eazy.session.retry_policy = RetryPolicy(
+            max_attempts=3, backoff_base=0.001, backoff_max=1,
+        )
+
+    def tearDown(self):
+        s.other.update(self.saved[0])
+        s.sandbox_client_details.update(self.saved[1])
+        registry.clear()
+
+    def customer(self, reference='test-000001'):
+        return loads(self.eazy.post.customer(
+            'test@email.com', 'Mr', reference, 'Test', 'Test',
+            '1 Test Lane', 'GL52 2NF', '12345678', '123456', 'MR TEST TEST',
+        ))['Customer']
+
+    def test_customers_are_kept_between_requests(self):
+        customer = self.customer()
+        found = loads(self.eazy.get.customers(
+            customer_reference='test-000001'
+        ))
+        self.assertEqual(found['Customers'], [customer])
+        self.assertEqual(
+            self.eazy.get.contracts(customer['Id']),
+            'The customer %s does not own any contracts' % customer['Id'],
+        )
+
+    def test_customers_are_searched_by_date_added(self):
+        self.ecm3.populate(customers=50, days=30)
+        since = str(date.today() - timedelta(days=10))
+        found = loads(self.eazy.get.customers(search_from=since))
+        self.assertTrue(found['Customers'])
+        for customer in found['Customers']:
+            self.assertGreaterEqual(customer['DateAdded'][:10], since)
+
+    def test_payments_are_returned_at_most_100_at_a_time(self):
+        self.ecm3.populate(customers=1, contracts=1, payments=150)
+        contract = next(iter(self.ecm3.contracts))
+        payments = loads(self.eazy.get.payments(contract, 500))
+        self.assertEqual(len(payments['Payments']), 100)
+
+    def test_callbacks_are_set_and_deleted(self):
+        self.eazy.post.callback_url('contract', 'https://example.com')
+        self.assertEqual(self.ecm3.callbacks, {
+            'contract': 'https://example.com'
+        })
+        self.assertEqual(self.eazy.delete.callback_url('contract'),
+                         'Callback URL deleted.')
+        self.assertEqual(self.ecm3.callbacks, {})
+
+    def test_unknown_contract_is_not_found(self):
+        with self.assertRaises(ResourceNotFoundError):
+            self.eazy.post.cancel_direct_debit('missing')
+
+    def test_server_errors_are_retried(self):
+        self.ecm3.error_rate = 1.0
+        self.ecm3.error_statuses = (503,)
+        with self.assertRaises(ServerError) as raised:
+            self.eazy.get.customers(surname='Test')
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(self.ecm3.stats()['errors'], 3)
+
+    def test_throttled_requests_wait_for_retry_after(self):
+        self.ecm3.throttle = {'customer': {'rate': 1000, 'burst': 1}}
+        self.eazy.get.customers(surname='A')
+        latency, response = self.ecm3.handle('GET', 'customer')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+    def test_lost_responses_time_out_after_being_processed(self):
+        self.ecm3.timeout_rate = 1.0
+        with self.eazy.timeout(read=0.05):
+            with self.assertRaises(RequestTimeoutError):
+                self.customer()
+        self.assertEqual(len(self.ecm3.customers), 1)
+
+    def test_latency_is_added_to_each_response(self):
+        self.ecm3.latency = constant(0.05)
+        started = monotonic()
+        self.eazy.get.customers(surname='Test')
+        self.assertGreaterEqual(monotonic() - started, 0.05)
+
+    def test_seeded_servers_draw_the_same_faults(self):
+        first = FakeECM3(error_rate=0.5, seed=7)
+        second = FakeECM3(error_rate=0.5, seed=7)
+        self.assertEqual(
+            [first.handle('GET', 'schedules')[1] for _ in range(20)],
+            [second.handle('GET', 'schedules')[1] for _ in range(20)],
+        )
+
+    def test_contract_is_created_over_http(self):
+        with TemporaryDirectory() as directory, \
+                FakeECM3(bank_holidays=['2030-12-25']) as ecm3:
+            s.other['cache_directory'] = directory
+            s.other['base_url'] = ecm3.base_url
+            s.other['bank_holidays_url'] = ecm3.bank_holidays_url
+            eazy = main.EazySDK()
+            customer = loads(eazy.post.customer(
+                'test@email.com', 'Mr', 'test-000002', 'Test', 'Test',
+                '1 Test Lane', 'GL52 2NF', '12345678', '123456',
+                'MR TEST TEST',
+            ))['Customer']
+            start = str(date.today() + timedelta(days=30))
+            contract = loads(eazy.post.contract(
+                customer['Id'], 'Ad-Hoc Free', start, False,
+                'Until further notice', 'Switch to further notice',
+            ))['Contract']
+            self.assertEqual(contract['CustomerId'], customer['Id'])
+            self.assertEqual(ecm3.stats()['routes']['GET schedules'], 1)
+            eazy.transport.close()
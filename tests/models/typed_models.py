@@ -0,0 +1,101 @@
+from ... import main
+from ... import models
+from ...fakeserver import FakeECM3
+from ...fakeserver import FakeTransport
+from ...settings import Settings as s
+import json
+import tracemalloc
+import unittest
+
+customer = {
+    'Id': '310a826b-d095-48e7-a55a-19dba82c566f',
+    'CustomerRef': 'test-000001',
+    'Title': 'Mr',
+    'FirstName': 'Test',
+    'Surname': 'Test',
+    'Email': 'test@email.com',
+    'DateOfBirth': None,
+    'AddressDetail': {'Line1': '1 Test Road', 'PostCode': 'GL52 2NF'},
+    'BankDetail': {'AccountHolderName': 'Mr Test Test',
+                   'AccountNumber': '12345678', 'BankSortCode': '123456'},
+}
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        s.sandbox_client_details['client_code'] = 'SDKTST'
+        self.ecm3 = FakeECM3(seed=1)
+        self.eazy = main.EazySDK()
+        self.eazy.session.transport = FakeTransport(self.ecm3)
+
+    def test_customers_are_typed(self):
+        typed = models.customers(json.dumps({'Customers': [customer]}))
+        self.assertEqual(typed[0].customer_reference, 'test-000001')
+        self.assertEqual(typed[0].bank_detail.account_number, '12345678')
+        self.assertEqual(typed[0].address_detail.post_code, 'GL52 2NF')
+        self.assertIsNone(typed[0].company_name)
+
+    def test_models_have_no_instance_dictionary(self):
+        typed = models.Customer.from_json(customer)
+        self.assertFalse(hasattr(typed, '__dict__'))
+        with self.assertRaises(AttributeError):
+            typed.nickname = 'Test'
+
+    def test_nested_details_are_models(self):
+        typed = models.Customer.from_json(customer)
+        self.assertIsInstance(typed.bank_detail, models.BankDetail)
+        self.assertFalse(hasattr(typed.bank_detail, '__dict__'))
+
+    def test_models_take_less_memory_than_parsed_json(self):
+        body = json.dumps({'Customers': [
+            dict(customer, CustomerRef='test-%06d' % i) for i in range(2000)
+        ]})
+
+        def allocated(parse):
+            tracemalloc.start()
+            try:
+                records = parse()
+                return tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+        parsed = allocated(lambda: json.loads(body)['Customers'])
+        typed = allocated(lambda: models.customers(body))
+        self.assertLess(typed, parsed * 0.9)
+
+    def test_unknown_fields_are_kept(self):
+        record = dict(customer, Nickname='Tester',
+                      BankDetail={'AccountNumber': '1', 'IBAN': 'GB1'})
+        typed = models.Customer.from_json(record)
+        self.assertEqual(typed.other, {'Nickname': 'Tester'})
+        self.assertEqual(typed.bank_detail.other, {'IBAN': 'GB1'})
+        record.pop('DateOfBirth')
+        self.assertEqual(typed.to_json(), record)
+
+    def test_responses_of_the_sdk_are_typed(self):
+        ids = self.ecm3.populate(customers=2, contracts=1, payments=3)
+        typed = models.customers(self.eazy.get.customers())
+        self.assertEqual({c.id for c in typed}, set(ids))
+        contracts = models.contracts(self.eazy.get.contracts(ids[0]))
+        self.assertEqual(contracts[0].customer, ids[0])
+        self.assertEqual(contracts[0].schedule_name, 'Monthly Free')
+        payments = models.payments(self.eazy.get.payments(contracts[0].id))
+        self.assertEqual([p.amount for p in payments], ['10.00'] * 3)
+        payment = models.payment(self.eazy.get.payments_single(
+            contracts[0].id, payments[0].id
+        ))
+        self.assertEqual(payment, payments[0])
+
+    def test_empty_responses_hold_no_models(self):
+        self.assertEqual(models.customers(self.eazy.get.customers(
+            surname='Nobody'
+        )), [])
+        self.assertEqual(models.contracts(self.eazy.get.contracts(
+            'ab09362d-f88e-4ee8-be85-e27e1a6ce06a'
+        )), [])
+
+    def test_schedules_are_typed_across_services(self):
+        typed = models.schedules(self.eazy.get.schedules())
+        self.assertEqual(typed[0].name, 'Weekly Free')
+        self.assertEqual(typed[0].service, 'Default Service')
+        self.assertEqual(len(typed), 4)
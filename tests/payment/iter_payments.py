@@ -0,0 +1,92 @@
+from ... import main
+from ...aio import AsyncEazySDK
+from ...fakeserver import AsyncFakeTransport
+from ...fakeserver import FakeECM3
+from ...fakeserver import FakeTransport
+from ...settings import Settings as s
+from threading import Event
+from time import sleep
+import asyncio
+import unittest
+import warnings
+
+
+class GatedTransport(FakeTransport):
+    """ Answers requests from a stand-in server, holding every request
+    for the payments of a gated contract until the gate is opened.
+    """
+    def __init__(self, server, gated):
+        super(GatedTransport, self).__init__(server)
+        self.gated = gated
+        self.gate = Event()
+        self.requested = []
+
+    def request(self, method, url, **kwargs):
+        self.requested.append(url)
+        if self.gated in url:
+            self.gate.wait(5)
+        return super(GatedTransport, self).request(method, url, **kwargs)
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        s.sandbox_client_details['client_code'] = 'SDKTST'
+        self.ecm3 = FakeECM3(seed=1)
+        self.ecm3.populate(customers=3, contracts=1, payments=5)
+        self.contracts = list(self.ecm3.contracts)
+        self.eazy = main.EazySDK()
+        self.eazy.session.transport = FakeTransport(self.ecm3)
+
+    def test_payments_of_every_contract_are_yielded_in_order(self):
+        payments = list(self.eazy.get.iter_payments(self.contracts))
+        self.assertEqual(len(payments), 15)
+        self.assertEqual(
+            [payment['ContractId'] for payment in payments],
+            [contract for contract in self.contracts for i in range(5)],
+        )
+
+    def test_a_single_contract_can_be_passed(self):
+        payments = list(self.eazy.get.iter_payments(self.contracts[0]))
+        self.assertEqual(len(payments), 5)
+
+    def test_next_contract_is_fetched_while_reading(self):
+        transport = GatedTransport(self.ecm3, self.contracts[1])
+        self.eazy.session.transport = transport
+        payments = self.eazy.get.iter_payments(self.contracts)
+        next(payments)
+        # The first contract is read while the second is in flight
+        for i in range(100):
+            if any(self.contracts[1] in url for url in transport.requested):
+                break
+            sleep(0.01)
+        self.assertIn(self.contracts[1], transport.requested[1])
+        transport.gate.set()
+        self.assertEqual(len(list(payments)), 14)
+
+    def test_contracts_without_payments_are_skipped(self):
+        customer = next(iter(self.ecm3.customers))
+        empty = self.ecm3._add_contract(customer, {})['Id']
+        payments = list(self.eazy.get.iter_payments(
+            [empty, self.contracts[0]]
+        ))
+        self.assertEqual(len(payments), 5)
+
+    def test_truncated_contracts_are_warned_about(self):
+        ecm3 = FakeECM3(seed=2)
+        ecm3.populate(customers=1, contracts=1, payments=150)
+        self.eazy.session.transport = FakeTransport(ecm3)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            payments = list(self.eazy.get.iter_payments(list(ecm3.contracts)))
+        self.assertEqual(len(payments), 100)
+        self.assertIn('Older payments may be missing', str(caught[0].message))
+
+    def test_payments_are_awaited(self):
+        eazy = AsyncEazySDK()
+        eazy.session.transport = AsyncFakeTransport(self.ecm3)
+
+        async def read():
+            return [payment async for payment
+                    in eazy.get.iter_payments(self.contracts, prefetch=2)]
+        self.assertEqual(len(asyncio.run(read())), 15)
@@ -0,0 +1,148 @@
+from ... import main
+from ...circuit import CircuitBreaker
+from ...exceptions import CircuitOpenError
+from ...exceptions import RequestTimeoutError
+from ...ratelimit import RateLimiter
+from ...retry import RetryPolicy
+from ...settings import Settings as s
+from ...timeouts import timeout
+from .scripted import ScriptedResponse
+from .scripted import ScriptedTransport
+from requests.exceptions import ConnectionError
+from time import sleep
+import unittest
+
+CONTRACTS = '{"Contracts":[{"Id":"1"}]}'
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        self.eazy = main.EazySDK()
+        self.eazy.session.retry_policy = RetryPolicy(max_attempts=1)
+        self.eazy.session.circuit_breaker = CircuitBreaker(
+            failure_threshold=2, recovery_timeout=0.05,
+            half_open_max_calls=1,
+        )
+
+    def use(self, *outcomes):
+        self.eazy.session.transport = ScriptedTransport(*outcomes)
+        return self.eazy.session.transport
+
+    def state(self, family='contract'):
+        return self.eazy.circuit_stats()['sandbox'][family]['state']
+
+    def fail(self, times):
+        for i in range(times):
+            with self.assertRaises(ConnectionError):
+                self.eazy.get.contracts('abc')
+
+    def test_circuit_opens_after_failures_in_a_row(self):
+        transport = self.use(
+            ConnectionError(), ScriptedResponse(200, CONTRACTS),
+            ConnectionError(), ScriptedResponse(503),
+        )
+        self.fail(1)
+        self.eazy.get.contracts('abc')
+        self.assertEqual(self.state(), 'closed')
+        self.fail(1)
+        self.eazy.get.contracts('abc')
+        self.assertEqual(self.state(), 'open')
+
+        with self.assertRaises(CircuitOpenError) as error:
+            self.eazy.get.contracts('abc')
+        self.assertEqual(error.exception.family, 'contract')
+        self.assertEqual(error.exception.environment, 'sandbox')
+        self.assertEqual(len(transport.calls), 4)
+
+    def test_client_errors_do_not_open_the_circuit(self):
+        self.use(*[ScriptedResponse(400, '{"Message":"x"}')] * 3)
+        for i in range(3):
+            self.eazy.get.contracts('abc')
+        self.assertEqual(self.state(), 'closed')
+
+    def test_families_have_their_own_circuit(self):
+        self.use(ConnectionError(), ConnectionError(),
+                 ScriptedResponse(200, '{"Payments":[{"Id":"1"}]}'))
+        self.fail(2)
+        self.assertEqual(self.state(), 'open')
+        self.eazy.get.payments('abc')
+        self.assertEqual(self.state('payment'), 'closed')
+
+    def test_successful_trial_closes_the_circuit(self):
+        self.use(ConnectionError(), ConnectionError(),
+                 ScriptedResponse(200, CONTRACTS))
+        self.fail(2)
+        sleep(0.06)
+        self.eazy.get.contracts('abc')
+        self.assertEqual(self.state(), 'closed')
+
+    def test_failed_trial_opens_the_circuit_again(self):
+        transport = self.use(ConnectionError(), ConnectionError(),
+                             ConnectionError())
+        self.fail(2)
+        sleep(0.06)
+        self.fail(1)
+        self.assertEqual(self.state(), 'open')
+        with self.assertRaises(CircuitOpenError):
+            self.eazy.get.contracts('abc')
+        self.assertEqual(len(transport.calls), 3)
+
+    def test_half_open_circuit_lets_one_trial_through(self):
+        breaker = self.eazy.session.circuit_breaker
+        for i in range(2):
+            breaker.record('contract')
+        sleep(0.06)
+        breaker.allow('contract')
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow('contract')
+        self.assertEqual(self.state(), 'half-open')
+
+    def test_open_circuit_does_not_use_rate_limit_tokens(self):
+        self.use(ConnectionError(), ConnectionError())
+        self.fail(2)
+        limiter = RateLimiter(
+            buckets={'contract': {'rate': 0.001, 'burst': 1}}, block=False,
+        )
+        self.eazy.session.rate_limiter = limiter
+        s.rate_limits['enabled'] = True
+        try:
+            for i in range(3):
+                with self.assertRaises(CircuitOpenError):
+                    self.eazy.get.contracts('abc')
+            self.assertEqual(limiter.reserve('contract'), 0)
+        finally:
+            s.rate_limits['enabled'] = False
+
+    def test_errors_raised_before_sending_are_not_failures(self):
+        transport = self.use(ValueError(), ValueError(),
+                             ConnectionError(), ConnectionError())
+        for i in range(2):
+            with self.assertRaises(ValueError):
+                self.eazy.get.contracts('abc')
+        self.assertEqual(self.state(), 'closed')
+        self.fail(2)
+        sleep(0.06)
+        self.eazy.session.rate_limiter = RateLimiter(
+            buckets={'contract': {'rate': 0.001, 'burst': 1}}, block=True,
+        )
+        s.rate_limits['enabled'] = True
+        try:
+            self.eazy.session.rate_limiter.reserve('contract')
+            with self.assertRaises(RequestTimeoutError):
+                with timeout(deadline=1):
+                    self.eazy.get.contracts('abc')
+        finally:
+            s.rate_limits['enabled'] = False
+        self.assertEqual(self.state(), 'half-open')
+        self.assertEqual(len(transport.calls), 4)
+        # The trial given up by the request is still available
+        self.eazy.session.circuit_breaker.allow('contract')
+
+    def test_disabled_breaker_never_opens(self):
+        s.circuit_breaker['enabled'] = False
+        try:
+            self.use(*[ConnectionError()] * 3)
+            self.fail(3)
+        finally:
+            s.circuit_breaker['enabled'] = True
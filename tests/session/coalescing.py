@@ -0,0 +1,140 @@
+from ... import main
+from ...aio import AsyncEazySDK
+from ...aio import AsyncResponse
+from ...get import Get
+from ...retry import RetryPolicy
+from ...settings import Settings as s
+from concurrent.futures import ThreadPoolExecutor
+from requests.exceptions import ConnectionError
+from threading import Event
+from threading import Lock
+import asyncio
+import unittest
+
+CONTRACTS = '{"Contracts":[{"Id":"1"}]}'
+
+
+class RecordedResponse:
+    status_code = 200
+    headers = {}
+    text = CONTRACTS
+
+
+class GatedTransport:
+    """ Holds every request until the gate is opened, recording the
+    calls made against it.
+    """
+    def __init__(self, error=None):
+        self.gate = Event()
+        self.error = error
+        self.calls = []
+        self.lock = Lock()
+
+    def request(self, method, url, params=None, headers=None,
+                timeout=None):
+        with self.lock:
+            self.calls.append((method, url))
+        self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return RecordedResponse()
+
+
+class AsyncGatedTransport:
+    def __init__(self):
+        self.calls = []
+
+    async def request(self, method, url, params=None, headers=None,
+                      timeout=None, deadline=None):
+        self.calls.append((method, url))
+        await asyncio.sleep(0.05)
+        return AsyncResponse(200, {}, CONTRACTS)
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        self.eazy = main.EazySDK()
+        self.eazy.session.retry_policy = RetryPolicy(max_attempts=1)
+
+    def use(self, transport):
+        self.eazy.session.transport = transport
+        return transport
+
+    def concurrently(self, call, count=20):
+        with ThreadPoolExecutor(count) as pool:
+            futures = [pool.submit(call) for i in range(count)]
+            while len(self.eazy.session.transport.calls) == 0 \
+                    or self.eazy.coalescing_stats()['shared'] < count - 1:
+                if all(future.done() for future in futures):
+                    break
+            self.eazy.session.transport.gate.set()
+            return [future.result() for future in futures]
+
+    def test_identical_gets_share_one_request(self):
+        transport = self.use(GatedTransport())
+        results = self.concurrently(lambda: self.eazy.get.contracts('abc'))
+        self.assertEqual(len(transport.calls), 1)
+        self.assertEqual(set(results), {CONTRACTS})
+        self.assertEqual(self.eazy.coalescing_stats(),
+                         {'sent': 1, 'shared': 19})
+
+    def test_different_params_are_not_shared(self):
+        transport = self.use(GatedTransport())
+        transport.gate.set()
+        self.eazy.get.payments('abc', number_of_rows=1)
+        self.eazy.get.payments('abc', number_of_rows=2)
+        self.assertEqual(len(transport.calls), 2)
+
+    def test_errors_are_raised_in_every_caller(self):
+        self.use(GatedTransport(ConnectionError()))
+
+        def call():
+            with self.assertRaises(ConnectionError):
+                self.eazy.get.contracts('abc')
+        self.concurrently(call, 5)
+        self.assertEqual(self.eazy.coalescing_stats()['sent'], 1)
+
+    def test_posts_are_never_shared(self):
+        transport = self.use(GatedTransport())
+        transport.gate.set()
+
+        def call(i):
+            self.eazy.post.restart_contract(
+                'abc', 'Until further notice', 'Switch to further notice'
+            )
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(call, range(4)))
+        self.assertEqual(len(transport.calls), 4)
+
+    def test_disabled_coalescing_sends_every_get(self):
+        transport = self.use(GatedTransport())
+        transport.gate.set()
+        s.coalescing['enabled'] = False
+        try:
+            with ThreadPoolExecutor(4) as pool:
+                list(pool.map(
+                    lambda i: self.eazy.get.contracts('abc'), range(4)
+                ))
+        finally:
+            s.coalescing['enabled'] = True
+        self.assertEqual(len(transport.calls), 4)
+
+    def test_request_methods_without_a_session_share_one(self):
+        self.assertIs(Get().sdk, Get().sdk)
+
+    def test_identical_awaited_gets_share_one_request(self):
+        async def run():
+            client = AsyncEazySDK()
+            client.session.retry_policy = RetryPolicy(max_attempts=1)
+            client.session.transport = AsyncGatedTransport()
+            results = await asyncio.gather(
+                *[client.get.contracts('abc') for i in range(10)]
+            )
+            return client, results
+
+        client, results = asyncio.run(run())
+        self.assertEqual(len(client.session.transport.calls), 1)
+        self.assertEqual(set(results), {CONTRACTS})
+        self.assertEqual(client.coalescing_stats(),
+                         {'sent': 1, 'shared': 9})
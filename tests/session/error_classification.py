@@ -0,0 +1,114 @@
+from ... import main
+from ...exceptions import RecordAlreadyExistsError
+from ...exceptions import RequestTimeoutError
+from ...exceptions import ResourceNotFoundError
+from ...exceptions import SDKNotEnabledError
+from ...exceptions import ServerError
+from ...exceptions import UnsupportedHTTPMethodError
+from ...exceptions import check_common_exceptions
+from ...exceptions import classify_error
+from ...retry import RetryPolicy
+from ...session import Response
+from ...settings import Settings as s
+from requests.exceptions import ReadTimeout
+import unittest
+
+
+class CannedResponse:
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+        self.headers = {}
+
+
+class CannedTransport:
+    """ Answers every request with the same status and body, or raises
+    the same error.
+    """
+    def __init__(self, status_code=200, text='', error=None):
+        self.response = CannedResponse(status_code, text)
+        self.error = error
+
+    def request(self, method, url, params=None, headers=None,
+                timeout=None):
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+def response(status_code, text):
+    body = Response(text)
+    body.status_code = status_code
+    return body
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        self.eazy = main.EazySDK()
+        self.eazy.session.retry_policy = RetryPolicy(max_attempts=1)
+
+    def use(self, status_code=200, text='', error=None):
+        self.eazy.session.transport = CannedTransport(
+            status_code, text, error
+        )
+
+    def test_successful_bodies_are_not_scanned(self):
+        body = '{"Customers":[{"Surname":"not supported"}]}'
+        self.use(200, body)
+        found = self.eazy.get.customers(surname='not supported')
+        self.assertEqual(found, body)
+        self.assertEqual(found.status_code, 200)
+
+    def test_successful_responses_are_returned_without_a_copy(self):
+        body = response(200, 'No HTTP resource was found')
+        self.assertIs(check_common_exceptions(body), body)
+
+    def test_errors_are_classified_by_status(self):
+        self.assertIs(classify_error(401, 'Denied')[0], SDKNotEnabledError)
+        self.assertIs(classify_error(404, 'Gone')[0], ResourceNotFoundError)
+        self.assertIs(classify_error(405, 'No')[0],
+                      UnsupportedHTTPMethodError)
+        self.assertIs(classify_error(502, 'Bad')[0], ServerError)
+        self.assertEqual(classify_error(400, 'Invalid'), (None, None))
+
+    def test_generic_messages_are_read_from_error_bodies(self):
+        self.use(400, '{"Message":"API not enabled"}')
+        with self.assertRaises(SDKNotEnabledError):
+            self.eazy.get.contracts('abc')
+
+    def test_errors_describe_the_response(self):
+        self.use(404, '{"Message":"No HTTP resource was found"}')
+        with self.assertRaises(ResourceNotFoundError) as raised:
+            self.eazy.get.contracts('abc')
+        error = raised.exception
+        self.assertEqual(error.status_code, 404)
+        self.assertEqual(error.method, 'GET')
+        self.assertEqual(error.endpoint, 'customer/abc/contract')
+        self.assertGreaterEqual(error.elapsed, 0)
+
+    def test_request_method_errors_describe_the_response(self):
+        self.use(400, '{"Message":"There is an existing Customer with the'
+                      ' same Client and Customer ref in the database'
+                      ' already."}')
+        with self.assertRaises(RecordAlreadyExistsError) as raised:
+            self.eazy.post.customer(
+                'test@email.com', 'Mr', 'test-000001', 'Test', 'Test',
+                '1 Test Lane', 'GL52 2NF', '12345678', '123456',
+                'MR TEST TEST',
+            )
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertEqual(raised.exception.endpoint, 'customer')
+
+    def test_unclassified_errors_are_returned(self):
+        self.use(400, '{"Message":"The amount is invalid"}')
+        self.assertEqual(self.eazy.get.contracts('abc'),
+                         '{"Message":"The amount is invalid"}')
+
+    def test_timeouts_describe_the_request(self):
+        self.use(error=ReadTimeout())
+        with self.assertRaises(RequestTimeoutError) as raised:
+            self.eazy.get.contracts('abc')
+        self.assertIsNone(raised.exception.status_code)
+        self.assertEqual(raised.exception.endpoint,
+                         'customer/abc/contract')
@@ -0,0 +1,109 @@
+from ... import main
+from ...exceptions import RateLimitExceededError
+from ...exceptions import RequestTimeoutError
+from ...ratelimit import RateLimiter
+from ...ratelimit import TokenBucket
+from ...session import Request
+from ...settings import Settings as s
+from multiprocessing import get_context
+from tempfile import TemporaryDirectory
+from time import monotonic
+import os
+import unittest
+
+
+class RecordedResponse:
+    status_code = 200
+    headers = {}
+    text = '{"Contracts":[{"Id":"1"}]}'
+
+
+class RecordingTransport:
+    def __init__(self):
+        self.calls = 0
+
+    def request(self, method, url, params=None, headers=None,
+                timeout=None):
+        self.calls += 1
+        return RecordedResponse()
+
+
+def take_tokens(path, count, results):
+    bucket = TokenBucket(rate=0.001, burst=10, path=path)
+    results.put(sum(1 for i in range(count) if bucket.take() == 0))
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        s.rate_limits['enabled'] = True
+        self.eazy = main.EazySDK()
+        self.eazy.session.transport = RecordingTransport()
+
+    def tearDown(self):
+        s.rate_limits['enabled'] = False
+
+    def limit(self, rate, burst, block):
+        self.eazy.session.rate_limiter = RateLimiter(
+            buckets={'contract': {'rate': rate, 'burst': burst}},
+            block=block,
+        )
+
+    def test_endpoint_families(self):
+        families = {
+            'customer': 'customer',
+            'customer/abc': 'customer',
+            'customer/abc/contract': 'contract',
+            'contract/abc/cancel': 'contract',
+            '/contract/abc/payment': 'payment',
+            '/contract/abc/payment/def/': 'payment',
+            'schedules': 'schedules',
+            'BACS/contract/callback': 'callback',
+        }
+        for endpoint, family in families.items():
+            self.assertEqual(Request('GET', endpoint).family, family)
+
+    def test_fail_fast_raises_once_burst_is_spent(self):
+        self.limit(rate=0.001, burst=2, block=False)
+        self.eazy.get.contracts('abc')
+        self.eazy.get.contracts('abc')
+        with self.assertRaises(RateLimitExceededError):
+            self.eazy.get.contracts('abc')
+        self.assertEqual(self.eazy.session.transport.calls, 2)
+
+    def test_unlimited_families_are_not_limited(self):
+        self.limit(rate=0.001, burst=1, block=False)
+        for i in range(5):
+            self.eazy.get.payments('abc')
+
+    def test_blocking_waits_for_a_token(self):
+        self.limit(rate=20, burst=1, block=True)
+        start = monotonic()
+        for i in range(3):
+            self.eazy.get.contracts('abc')
+        self.assertGreaterEqual(monotonic() - start, 0.09)
+        self.assertEqual(self.eazy.session.transport.calls, 3)
+
+    def test_blocking_longer_than_deadline_raises(self):
+        self.limit(rate=0.001, burst=1, block=True)
+        self.eazy.get.contracts('abc')
+        with self.assertRaises(RequestTimeoutError):
+            with self.eazy.timeout(deadline=1):
+                self.eazy.get.contracts('abc')
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_bucket_is_shared_between_processes(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'contract.bucket')
+            context = get_context('fork')
+            results = context.Queue()
+            processes = [
+                context.Process(target=take_tokens, args=(path, 10, results))
+                for i in range(4)
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            taken = sum(results.get() for process in processes)
+        self.assertEqual(taken, 10)
@@ -0,0 +1,118 @@
+from ... import main
+from ...aio import AsyncEazySDK
+from ...exceptions import ResourceNotFoundError
+from ...exceptions import ServerError
+from ...fakeserver import AsyncFakeTransport
+from ...fakeserver import FakeECM3
+from ...retry import RetryPolicy
+from ...session import response_text
+from ...settings import Settings as s
+import asyncio
+import json
+import unittest
+
+
+class BytesResponse:
+    """ A response holding its body as bytes, recording whether its
+    text is read.
+    """
+    def __init__(self, status_code, content, encoding='utf-8'):
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.headers = {'Content-Type': 'application/json'}
+        self.decoded = False
+
+    @property
+    def text(self):
+        self.decoded = True
+        return self.content.decode(self.encoding)
+
+
+class BytesTransport:
+    def __init__(self, status_code=200, content=b'{}'):
+        self.response = BytesResponse(status_code, content)
+        self.calls = 0
+
+    def request(self, method, url, params=None, headers=None,
+                timeout=None, **kwargs):
+        self.calls += 1
+        return self.response
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        s.sandbox_client_details['client_code'] = 'SDKTST'
+        self.eazy = main.EazySDK()
+        self.eazy.session.retry_policy = RetryPolicy(max_attempts=1)
+        self.body = json.dumps({'Customers': [{'Id': '1'}]}).encode()
+
+    def test_body_is_returned_without_being_decoded_or_copied(self):
+        transport = BytesTransport(content=self.body)
+        self.eazy.session.transport = transport
+        raw = self.eazy.session.request('GET', 'customer', raw=True)
+        self.assertIs(raw.content, transport.response.content)
+        self.assertIs(bytes(raw), transport.response.content)
+        self.assertEqual(raw.status_code, 200)
+        self.assertEqual(raw.headers['Content-Type'], 'application/json')
+        self.assertEqual((raw.method, raw.endpoint), ('GET', 'customer'))
+        self.assertEqual(raw.json(), {'Customers': [{'Id': '1'}]})
+        self.assertEqual(raw.view[2:11].tobytes(), b'Customers')
+        self.assertFalse(transport.response.decoded)
+
+    def test_raw_is_only_passed_by_keyword(self):
+        self.eazy.session.transport = BytesTransport(content=self.body)
+        with self.assertRaises(TypeError):
+            self.eazy.session.request('GET', 'customer', None, {'a': 1})
+        self.assertEqual(
+            self.eazy.session.request('GET', 'customer', {'a': 1}),
+            self.body.decode(),
+        )
+
+    def test_raw_requests_are_not_cached(self):
+        transport = BytesTransport(content=self.body)
+        self.eazy.session.transport = transport
+        s.cache['enabled'] = True
+        try:
+            self.eazy.session.request('GET', 'customer', raw=True)
+            self.eazy.session.request('GET', 'customer', raw=True)
+        finally:
+            s.cache['enabled'] = False
+        self.assertEqual(transport.calls, 2)
+
+    def test_unsuccessful_responses_are_classified(self):
+        self.eazy.session.transport = BytesTransport(
+            404, b'{"Message":"Customer not found"}'
+        )
+        with self.assertRaises(ResourceNotFoundError) as e:
+            self.eazy.session.request('GET', 'customer/1', raw=True)
+        self.assertEqual(e.exception.endpoint, 'customer/1')
+        self.eazy.session.transport = BytesTransport(500, b'')
+        with self.assertRaises(ServerError):
+            self.eazy.session.request('GET', 'customer', raw=True)
+
+    def test_bodies_without_a_charset_are_decoded_as_utf8(self):
+        response = BytesResponse(200, 'Café'.encode(), encoding=None)
+        self.assertEqual(response_text(response), 'Café')
+
+    def test_raw_bodies_match_the_text_over_http(self):
+        with FakeECM3(seed=1) as ecm3:
+            ecm3.populate(customers=20)
+            s.other['base_url'] = ecm3.base_url
+            try:
+                eazy = main.EazySDK()
+                raw = eazy.session.request('GET', 'customer', raw=True)
+                text = eazy.get.customers()
+            finally:
+                s.other['base_url'] = None
+        self.assertIsInstance(raw.content, bytes)
+        self.assertEqual(raw.content.decode(), text)
+
+    def test_raw_bodies_are_awaited(self):
+        ecm3 = FakeECM3(seed=1)
+        ecm3.populate(customers=5)
+        eazy = AsyncEazySDK()
+        eazy.session.transport = AsyncFakeTransport(ecm3)
+        raw = asyncio.run(eazy.session.request('GET', 'customer', raw=True))
+        self.assertEqual(len(raw.json()['Customers']), 5)
@@ -0,0 +1,67 @@
+from ... import main
+from ...session import Request
+from ...settings import Settings as s
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import unittest
+
+
+class RecordedResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, text):
+        self.text = text
+
+
+class RecordingTransport:
+    """ Answers every request with a canned body, recording the calls
+    made against it.
+    """
+    def __init__(self, body):
+        self.body = body
+        self.calls = []
+        self.lock = Lock()
+
+    def request(self, method, url, params=None, headers=None,
+                timeout=None):
+        with self.lock:
+            self.calls.append((method, url, dict(params)))
+        return RecordedResponse(self.body)
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        s.sandbox_client_details['client_code'] = 'SDKTST'
+        self.eazy = main.EazySDK()
+        self.transport = RecordingTransport('{"Contracts":[{"Id":"1"}]}')
+        self.eazy.session.transport = self.transport
+
+    def test_request_methods_share_one_session(self):
+        self.assertIs(self.eazy.get.sdk, self.eazy.post.sdk)
+        self.assertIs(self.eazy.patch.sdk, self.eazy.delete.sdk)
+
+    def test_params_do_not_leak_into_later_calls(self):
+        self.eazy.get.payments('abc', number_of_rows=5)
+        self.eazy.get.contracts('abc')
+        self.assertEqual(self.transport.calls[0][2], {'rows': 5})
+        self.assertEqual(self.transport.calls[1][2], {})
+
+    def test_requests_are_immutable(self):
+        request = Request('GET', 'customer', {'surname': 'Test'})
+        self.assertEqual(request.params, (('surname', 'Test'),))
+        with self.assertRaises(AttributeError):
+            request.endpoint = 'schedules'
+
+    def test_threads_sharing_an_instance_keep_their_own_requests(self):
+        def call(i):
+            self.eazy.get.payments('contract-%s' % i, number_of_rows=i)
+
+        with ThreadPoolExecutor(32) as pool:
+            list(pool.map(call, range(200)))
+
+        self.assertEqual(len(self.transport.calls), 200)
+        for method, url, params in self.transport.calls:
+            contract = url.split('/')[-2]
+            self.assertEqual(contract, 'contract-%s' % params['rows'])
@@ -0,0 +1,128 @@
+from ... import main
+from ...cache import ResponseCache
+from ...settings import Settings as s
+import unittest
+
+CUSTOMERS = '{"Customers":[{"Id":"cu1","Surname":"Test"}]}'
+CONTRACTS = '{"Contracts":[{"Id":"co1"},{"Id":"co2"}]}'
+PAYMENTS = '{"Payments":[{"Id":"pa1"}]}'
+
+
+class RecordedResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, text):
+        self.text = text
+
+
+class RoutedTransport:
+    """ Answers each request with the body routed to the end of its URL,
+    recording the calls made against it.
+    """
+    def __init__(self, routes):
+        self.routes = routes
+        self.calls = []
+
+    def request(self, method, url, params=None, headers=None,
+                timeout=None):
+        self.calls.append((method, url))
+        for path, body in self.routes.items():
+            if url.rstrip('/').endswith(path):
+                return RecordedResponse(body)
+        return RecordedResponse('{"Message":"Updated"}')
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        s.cache['enabled'] = True
+        self.eazy = main.EazySDK()
+        self.transport = RoutedTransport({
+            'customer': CUSTOMERS,
+            'customer/cu1/contract': CONTRACTS,
+            'contract/co1/payment': PAYMENTS,
+        })
+        self.eazy.session.transport = self.transport
+
+    def tearDown(self):
+        s.cache['enabled'] = False
+
+    def gets(self):
+        return sum(1 for method, url in self.transport.calls
+                   if method == 'GET')
+
+    def test_repeated_reads_are_cached(self):
+        for i in range(3):
+            self.assertEqual(self.eazy.get.contracts('cu1'), CONTRACTS)
+            self.assertEqual(self.eazy.get.payments('co1'), PAYMENTS)
+            self.eazy.get.customers(surname='Test')
+        self.assertEqual(self.gets(), 3)
+        self.assertEqual(self.eazy.cache_stats()['hits'], 6)
+
+    def test_different_params_are_cached_separately(self):
+        self.eazy.get.payments('co1', number_of_rows=1)
+        self.eazy.get.payments('co1', number_of_rows=2)
+        self.assertEqual(self.gets(), 2)
+
+    def test_empty_searches_are_cached_with_the_negative_ttl(self):
+        self.transport.routes['customer'] = '{"Customers":[]}'
+        s.cache['ttls']['negative'] = 0
+        try:
+            for i in range(2):
+                self.assertIn('No customers could be found',
+                              self.eazy.get.customers(surname='None'))
+        finally:
+            s.cache['ttls']['negative'] = 10
+        self.assertEqual(self.gets(), 2)
+
+        self.eazy.get.customers(surname='None')
+        self.eazy.get.customers(surname='None')
+        self.assertEqual(self.gets(), 3)
+
+    def test_contract_writes_invalidate_contracts_and_payments(self):
+        self.eazy.get.contracts('cu1')
+        self.eazy.get.payments('co1')
+        self.eazy.patch.contract_amount('co1', 10.0, 'Test')
+        self.eazy.get.contracts('cu1')
+        self.eazy.get.payments('co1')
+        self.assertEqual(self.gets(), 4)
+
+    def test_customer_writes_invalidate_searches(self):
+        self.eazy.get.customers(surname='Test')
+        self.eazy.get.contracts('cu1')
+        self.eazy.patch.customer('cu1', surname='Changed')
+        self.eazy.get.customers(surname='Test')
+        self.eazy.get.contracts('cu1')
+        self.assertEqual(self.gets(), 4)
+
+    def test_unrelated_writes_keep_cached_reads(self):
+        self.eazy.get.contracts('cu1')
+        self.eazy.patch.contract_amount('co9', 10.0, 'Test')
+        self.eazy.get.contracts('cu1')
+        self.assertEqual(self.gets(), 1)
+
+    def test_least_recently_used_responses_are_evicted(self):
+        cache = ResponseCache(max_bytes=len(CONTRACTS) + len(PAYMENTS))
+        self.eazy.session.cache = cache
+        self.eazy.get.contracts('cu1')
+        self.eazy.get.payments('co1')
+        self.eazy.get.contracts('cu1')
+        self.eazy.get.customers(surname='Test')
+        self.assertEqual(cache.stats()['evictions'], 2)
+        self.eazy.get.contracts('cu1')
+        self.assertEqual(self.gets(), 4)
+        self.assertLessEqual(cache.stats()['bytes'], cache.max_bytes)
+
+    def test_responses_are_counted_in_bytes_received(self):
+        body = CUSTOMERS.replace('Test', 'Tést')
+        self.transport.routes['customer'] = body
+        self.eazy.get.customers(surname='Tést')
+        self.assertEqual(self.eazy.session.cache.stats()['bytes'],
+                         len(body.encode('utf-8')))
+
+    def test_disabled_cache_sends_every_get(self):
+        s.cache['enabled'] = False
+        self.eazy.get.contracts('cu1')
+        self.eazy.get.contracts('cu1')
+        self.assertEqual(self.gets(), 2)
@@ -0,0 +1,131 @@
+from ... import main
+from ...exceptions import RecordAlreadyExistsError
+from ...exceptions import RequestTimeoutError
+from ...retry import RetryPolicy
+from ...retry import parse_retry_after
+from ...session import Request
+from ...settings import Settings as s
+from .scripted import ScriptedResponse
+from .scripted import ScriptedTransport
+from requests.exceptions import ConnectionError
+from requests.exceptions import ConnectTimeout
+from requests.exceptions import ReadTimeout
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from json import loads
+import unittest
+
+DUPLICATE = '{"Message":"There is an existing Customer with the same Client' \
+            ' and Customer ref in the database already"}'
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        self.eazy = main.EazySDK()
+        self.eazy.session.retry_policy = RetryPolicy(
+            max_attempts=3, backoff_base=0.001, backoff_max=1,
+        )
+
+    def use(self, *outcomes):
+        self.eazy.session.transport = ScriptedTransport(*outcomes)
+        return self.eazy.session.transport
+
+    def customer(self):
+        return self.eazy.post.customer(
+            'test@email.com', 'Mr', 'test-000001', 'Test', 'Test',
+            '1 Test Lane', 'GL52 2NF', '12345678', '123456', 'MR TEST TEST',
+        )
+
+    def test_get_is_retried_after_server_error(self):
+        transport = self.use(
+            ScriptedResponse(503, 'Service Unavailable'),
+            ScriptedResponse(200, '{"Contracts":[{"Id":"1"}]}'),
+        )
+        req = self.eazy.get.contracts('abc')
+        self.assertIn('"Id":"1"', req)
+        self.assertEqual(len(transport.calls), 2)
+        self.assertEqual(self.eazy.retry_stats()['by_method'], {'GET': 1})
+
+    def test_get_is_retried_after_read_timeout(self):
+        self.use(ReadTimeout(), ScriptedResponse(200, '{"Contracts":[1]}'))
+        self.assertIn('Contracts', self.eazy.get.contracts('abc'))
+
+    def test_retries_stop_after_max_attempts(self):
+        transport = self.use(ReadTimeout(), ReadTimeout(), ReadTimeout())
+        with self.assertRaises(RequestTimeoutError):
+            self.eazy.get.contracts('abc')
+        self.assertEqual(len(transport.calls), 3)
+        self.assertEqual(self.eazy.retry_stats()['gave_up'], 1)
+
+    def test_post_is_not_retried_after_it_may_have_been_sent(self):
+        transport = self.use(ReadTimeout())
+        with self.assertRaises(RequestTimeoutError):
+            self.eazy.post.restart_contract(
+                'abc', 'Until further notice', 'Switch to further notice'
+            )
+        self.assertEqual(len(transport.calls), 1)
+
+    def test_post_is_retried_if_it_was_never_sent(self):
+        transport = self.use(
+            ConnectTimeout(),
+            ScriptedResponse(200, '{"Message":"Contract cancelled"}'),
+        )
+        self.eazy.post.reactivate_direct_debit('abc')
+        self.assertEqual(len(transport.calls), 2)
+
+    def test_throttled_post_is_retried(self):
+        transport = self.use(
+            ScriptedResponse(429, '', {'Retry-After': '0'}),
+            ScriptedResponse(200, '{"Contract":{"Id":"1"}}'),
+        )
+        self.eazy.post.reactivate_direct_debit('abc')
+        self.assertEqual(len(transport.calls), 2)
+
+    def test_post_customer_is_retried_and_duplicate_is_recovered(self):
+        record = {'Id': '1', 'CustomerRef': 'test-000001',
+                  'Email': 'test@email.com'}
+        transport = self.use(
+            ConnectionError('Connection reset by peer'),
+            ScriptedResponse(200, DUPLICATE),
+            ScriptedResponse(200, '{"Customers":[%s]}' % str(record)
+                             .replace("'", '"')),
+        )
+        req = self.customer()
+        self.assertEqual(loads(req), {'Customer': record})
+        self.assertEqual([c[0] for c in transport.calls],
+                         ['POST', 'POST', 'GET'])
+
+    def test_post_customer_duplicate_on_first_attempt_raises(self):
+        self.use(ScriptedResponse(200, DUPLICATE))
+        with self.assertRaises(RecordAlreadyExistsError):
+            self.customer()
+
+    def test_backoff_uses_full_jitter(self):
+        policy = RetryPolicy(backoff_base=1, backoff_max=4)
+        for attempt in range(1, 6):
+            wait = policy.backoff(attempt)
+            self.assertGreaterEqual(wait, 0)
+            self.assertLessEqual(wait, min(4, 2 ** (attempt - 1)))
+
+    def test_retry_after_longer_than_backoff_max_is_not_retried(self):
+        policy = RetryPolicy(backoff_max=1)
+        request = Request('GET', 'customer')
+        self.assertIsNone(policy.delay(request, 1, 503, '120'))
+        self.assertEqual(policy.delay(request, 1, 503, '0.5') >= 0.5, True)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('3'), 3.0)
+        self.assertEqual(
+            parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0.0
+        )
+        self.assertIsNone(parse_retry_after('soon'))
+
+    def test_parse_retry_after_date_without_a_zone(self):
+        self.assertEqual(
+            parse_retry_after('Wed, 21 Oct 2015 07:28:00 -0000'), 0.0
+        )
+        later = datetime.now(timezone.utc) + timedelta(seconds=60)
+        wait = parse_retry_after(later.strftime('%a, %d %b %Y %H:%M:%S -0000'))
+        self.assertTrue(50 < wait <= 60)
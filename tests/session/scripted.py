@@ -0,0 +1,22 @@
+class ScriptedResponse:
+    def __init__(self, status_code, text='', headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+class ScriptedTransport:
+    """ Answers each request with the next outcome of a script, which is
+    either a response or an exception to be raised.
+    """
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, method, url, params=None, headers=None,
+                timeout=None):
+        self.calls.append((method, url))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
@@ -0,0 +1,93 @@
+from ... import main
+from ...exceptions import RequestTimeoutError
+from ...settings import Settings as s
+from requests.exceptions import ReadTimeout
+from time import sleep
+import unittest
+
+
+class RecordedResponse:
+    status_code = 200
+    headers = {}
+    text = '{"Contracts":[{"Id":"1"}]}'
+
+
+class SlowTransport:
+    """ Takes a fixed time to answer every request, raising a read
+    timeout if that is longer than the read timeout requested.
+    """
+    def __init__(self, delay):
+        self.delay = delay
+        self.timeouts = []
+
+    def request(self, method, url, params=None, headers=None,
+                timeout=None):
+        self.timeouts.append(timeout)
+        if timeout[1] is not None and self.delay > timeout[1]:
+            sleep(timeout[1])
+            raise ReadTimeout()
+        sleep(self.delay)
+        return RecordedResponse()
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        s.timeouts.update({'connect': 5, 'read': 30, 'deadline': None})
+        self.eazy = main.EazySDK()
+
+    def tearDown(self):
+        s.timeouts.update({'connect': 5, 'read': 30, 'deadline': None})
+
+    def use(self, delay):
+        self.eazy.session.transport = SlowTransport(delay)
+        return self.eazy.session.transport
+
+    def test_settings_timeouts_are_sent(self):
+        transport = self.use(0)
+        self.eazy.get.contracts('abc')
+        self.assertEqual(transport.timeouts, [(5, 30)])
+
+    def test_timeouts_overridden_per_call(self):
+        transport = self.use(0)
+        with self.eazy.timeout(connect=1, read=2):
+            self.eazy.get.contracts('abc')
+        self.eazy.get.contracts('abc')
+        self.assertEqual(transport.timeouts, [(1, 2), (5, 30)])
+
+    def test_read_timeout_raises_request_timeout_error(self):
+        self.use(0.2)
+        with self.assertRaises(RequestTimeoutError):
+            with self.eazy.timeout(read=0.05):
+                self.eazy.get.contracts('abc')
+
+    def test_deadline_shortens_request_timeouts(self):
+        transport = self.use(0)
+        with self.eazy.timeout(deadline=1):
+            self.eazy.get.contracts('abc')
+        connect, read = transport.timeouts[0]
+        self.assertLessEqual(connect, 1)
+        self.assertLessEqual(read, 1)
+
+    def test_deadline_from_settings_applies_to_every_call(self):
+        s.timeouts['deadline'] = 0.1
+        self.use(0.2)
+        with self.assertRaises(RequestTimeoutError):
+            self.eazy.get.contracts('abc')
+
+    def test_nested_deadline_cannot_extend_outer_deadline(self):
+        transport = self.use(0.06)
+        with self.assertRaises(RequestTimeoutError):
+            with self.eazy.timeout(deadline=0.1):
+                self.eazy.get.contracts('abc')
+                with self.eazy.timeout(deadline=10):
+                    self.eazy.get.contracts('abc')
+        self.assertLess(transport.timeouts[1][1], 0.1)
+
+    def test_exceeded_deadline_sends_no_request(self):
+        transport = self.use(0)
+        with self.assertRaises(RequestTimeoutError):
+            with self.eazy.timeout(deadline=0.01):
+                sleep(0.02)
+                self.eazy.get.contracts('abc')
+        self.assertEqual(transport.timeouts, [])
@@ -0,0 +1,55 @@
+from ... import main
+from ...benchmarks import startup
+from concurrent.futures import ThreadPoolExecutor
+import subprocess
+import sys
+import unittest
+
+# Report whether the synchronous SDK imports asyncio when its request
+# methods are built
+_asyncio_probe = '''
+import sys
+import eazysdk
+client = eazysdk.EazySDK()
+client.get
+client.post
+print('asyncio' in sys.modules)
+'''
+
+
+class Test(unittest.TestCase):
+    def test_request_methods_are_built_on_first_access(self):
+        eazy = main.EazySDK()
+        self.assertEqual(set(vars(eazy)), {'settings'})
+        eazy.get
+        self.assertEqual(set(vars(eazy)),
+                         {'settings', 'transport', 'session', 'get'})
+
+    def test_request_methods_share_one_session(self):
+        eazy = main.EazySDK()
+        self.assertIs(eazy.get.sdk, eazy.delete.sdk)
+        self.assertIs(eazy.session.transport, eazy.transport)
+
+    def test_threads_build_one_session(self):
+        eazy = main.EazySDK()
+        with ThreadPoolExecutor(8) as pool:
+            sessions = set(pool.map(lambda i: id(eazy.session), range(64)))
+        self.assertEqual(len(sessions), 1)
+
+    def test_connection_pool_is_created_on_first_request(self):
+        eazy = main.EazySDK()
+        eazy.post
+        self.assertIsNone(eazy.transport.session)
+        self.assertEqual(eazy.pool_stats()['requests'], 0)
+
+    def test_import_and_construction_do_not_import_requests(self):
+        results = startup.measure()
+        self.assertFalse(results['requests_imported'])
+
+    def test_synchronous_requests_do_not_import_asyncio(self):
+        output = subprocess.run(
+            [sys.executable, '-c', _asyncio_probe],
+            env=startup._environment(), check=True,
+            stdout=subprocess.PIPE, universal_newlines=True,
+        ).stdout
+        self.assertEqual(output.strip(), 'False')
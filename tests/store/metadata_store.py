@@ -0,0 +1,106 @@
+from ...store import MetadataStore
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+from tempfile import TemporaryDirectory
+from time import sleep
+import os
+import unittest
+
+
+def refresh_in_process(directory, results):
+    store = MetadataStore(directory)
+
+    def fetch(stale):
+        # Record every fetch, so the test can count them
+        with open(os.path.join(directory, 'fetches'), 'a') as f:
+            f.write('fetch\n')
+        sleep(0.1)
+        return 'fresh'
+    results.put(store.refresh('file', lambda text: text == 'fresh', fetch))
+
+
+def write_in_process(directory, text):
+    store = MetadataStore(directory)
+    for i in range(50):
+        store.write('file', text)
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.store = MetadataStore(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_missing_file_reads_as_none(self):
+        self.assertIsNone(self.store.read('missing'))
+
+    def test_write_replaces_the_file(self):
+        self.store.write('file', 'first')
+        self.store.write('file', 'second')
+        self.assertEqual(self.store.read('file'), 'second')
+        self.assertEqual(os.listdir(self.directory.name), ['file'])
+
+    def test_refresh_fetches_once_for_concurrent_threads(self):
+        fetches = []
+
+        def fetch(stale):
+            fetches.append(stale)
+            sleep(0.05)
+            return 'fresh'
+
+        with ThreadPoolExecutor(16) as pool:
+            results = list(pool.map(
+                lambda i: self.store.refresh(
+                    'file', lambda text: text == 'fresh', fetch
+                ),
+                range(32),
+            ))
+        self.assertEqual(fetches, [None])
+        self.assertEqual(set(results), {'fresh'})
+
+    def test_refresh_passes_stale_contents_to_fetch(self):
+        self.store.write('file', 'stale')
+        text = self.store.refresh(
+            'file', lambda text: text == 'fresh',
+            lambda stale: stale.replace('stale', 'fresh'),
+        )
+        self.assertEqual(text, 'fresh')
+        self.assertEqual(self.store.read('file'), 'fresh')
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_refresh_fetches_once_for_concurrent_processes(self):
+        context = get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(target=refresh_in_process,
+                            args=(self.directory.name, results))
+            for i in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual([results.get() for process in processes],
+                         ['fresh'] * 4)
+        with open(os.path.join(self.directory.name, 'fetches')) as f:
+            self.assertEqual(f.read(), 'fetch\n')
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_concurrent_writers_never_leave_a_partial_file(self):
+        context = get_context('fork')
+        texts = ['a' * 100000, 'b' * 100000]
+        processes = [
+            context.Process(target=write_in_process,
+                            args=(self.directory.name, text))
+            for text in texts
+        ]
+        for process in processes:
+            process.start()
+        while any(process.is_alive() for process in processes):
+            text = self.store.read('file')
+            if text is not None:
+                self.assertIn(text, texts)
+        for process in processes:
+            process.join()
@@ -0,0 +1,50 @@
+from ...transport import Transport
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+import unittest
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"Message":null}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%s/' % self.server.server_port
+        self.transport = Transport(pool_maxsize=2)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        for i in range(5):
+            self.transport.request('GET', self.url)
+        stats = self.transport.stats()
+        self.assertEqual(stats['connections'], 1)
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['reuse_ratio'], 0.8)
+
+    def test_idle_connections_are_counted(self):
+        self.transport.request('GET', self.url)
+        stats = self.transport.stats()
+        self.assertEqual(stats['idle_connections'], 1)
+        self.assertIn('127.0.0.1', stats['hosts'])
+
+    def test_empty_pool_has_no_reuse(self):
+        stats = self.transport.stats()
+        self.assertEqual(stats['requests'], 0)
+        self.assertEqual(stats['reuse_ratio'], 0.0)
@@ -0,0 +1,121 @@
+from ...utils import working_days
+from ...settings import Settings as s
+from datetime import datetime
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from tempfile import TemporaryDirectory
+from threading import Event
+from threading import Thread
+import json
+import os
+import unittest
+
+ETAG = '"holidays-1"'
+THIS_YEAR = datetime.now().year
+HOLIDAYS = json.dumps({'england-and-wales': {'events': [
+    {'date': '%s-12-25' % (THIS_YEAR - 1)},
+    {'date': '%s-12-25' % THIS_YEAR},
+    {'date': '%s-12-26' % THIS_YEAR},
+]}}).encode()
+
+
+class BankHolidaysHandler(BaseHTTPRequestHandler):
+    """ Stands in for gov.uk, answering conditional requests with 304
+    """
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        self.server.gate.wait(5)
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.send_header('ETag', ETAG)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(HOLIDAYS)))
+        self.end_headers()
+        self.wfile.write(HOLIDAYS)
+
+    def log_message(self, *args):
+        pass
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), BankHolidaysHandler)
+        self.server.requests = []
+        self.server.gate = Event()
+        self.server.gate.set()
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = s.other['bank_holidays_url']
+        s.other['bank_holidays_url'] = \
+            'http://127.0.0.1:%s/bank-holidays.json' % self.server.server_port
+        self.directory = TemporaryDirectory()
+        s.other['cache_directory'] = self.directory.name
+        self.file = os.path.join(self.directory.name, 'holidays.csv')
+        working_days.refresher = working_days.BankHolidayRefresher()
+
+    def tearDown(self):
+        working_days.refresher.wait(5)
+        s.other['cache_directory'] = None
+        s.other['bank_holidays_url'] = self.url
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def stale_file(self, etag=ETAG):
+        updated = datetime.now().date() \
+            - timedelta(s.other['bank_holidays_update_days'])
+        with open(self.file, 'w') as f:
+            f.write('%s\n# ETag: %s\n2000-01-03' % (updated, etag))
+
+    def test_missing_file_is_fetched_before_returning(self):
+        holidays = working_days \
+            .read_bank_holiday_file_and_check_if_update_needed()
+        self.assertEqual(holidays, ['%s-12-25' % THIS_YEAR,
+                                    '%s-12-26' % THIS_YEAR])
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(
+            working_days.read_bank_holidays_file(),
+            (holidays, datetime.now().date(), {'ETag': ETAG}),
+        )
+
+    def test_stale_file_is_served_while_refreshing(self):
+        self.stale_file()
+        self.server.gate.clear()
+        holidays = working_days \
+            .read_bank_holiday_file_and_check_if_update_needed()
+        self.assertEqual(holidays, ['2000-01-03'])
+        # A second stale read does not start another refresh
+        working_days.read_bank_holiday_file_and_check_if_update_needed()
+        self.server.gate.set()
+        working_days.refresher.wait(5)
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.server.requests[0]['If-None-Match'], ETAG)
+        holidays, updated, validators = \
+            working_days.read_bank_holidays_file()
+        self.assertEqual(holidays, ['2000-01-03'])
+        self.assertEqual(updated, datetime.now().date())
+
+    def test_changed_holidays_are_written_once(self):
+        self.stale_file('"holidays-0"')
+        working_days.refresher.refresh()
+        holidays, updated, validators = \
+            working_days.read_bank_holidays_file()
+        self.assertEqual(holidays, ['%s-12-25' % THIS_YEAR,
+                                    '%s-12-26' % THIS_YEAR])
+        self.assertEqual(validators, {'ETag': ETAG})
+        self.assertFalse([name for name in os.listdir(self.directory.name)
+                          if name.endswith('.tmp')])
+
+    def test_failed_refresh_keeps_the_last_good_holidays(self):
+        self.stale_file()
+        # Nothing listens on port 1
+        s.other['bank_holidays_url'] = 'http://127.0.0.1:1/'
+        holidays = working_days \
+            .read_bank_holiday_file_and_check_if_update_needed()
+        working_days.refresher.wait(5)
+        self.assertEqual(holidays, ['2000-01-03'])
+        self.assertEqual(working_days.read_bank_holidays_file()[0],
+                         ['2000-01-03'])
@@ -0,0 +1,106 @@
+from ...utils import contract_checks
+from ...utils import schedules
+from ...utils.schedules import ScheduleRegistry
+from ...exceptions import InvalidParameterError
+from ...settings import Settings as s
+from ...store import MetadataStore
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from datetime import timedelta
+from tempfile import TemporaryDirectory
+from threading import Lock
+from time import sleep
+import json
+import os
+import unittest
+
+SERVICES = json.dumps({'Services': [{'Schedules': [
+    {'Name': 'Monthly Free', 'Description': 'Monthly payments',
+     'Frequency': 'Monthly'},
+    {'Name': 'Ad-Hoc Free', 'Description': 'AD-HOC Payments',
+     'Frequency': 'Monthly'},
+]}]})
+
+
+class CountingGet:
+    """ Answers get.schedules() with canned schedules, counting the
+    number of times it is called.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.lock = Lock()
+
+    def schedules(self):
+        with self.lock:
+            self.calls += 1
+        sleep(0.05)
+        return SERVICES
+
+
+def schedules_file(path, days_old):
+    updated = datetime.now().date() - timedelta(days_old)
+    with open(path, 'w') as f:
+        json.dump({
+            'schedule': [{'name': 'Weekly Free', 'ad_hoc': True,
+                          'frequency': 'Weekly'}],
+            'last_update_date': {'last_updated': str(updated)},
+        }, f)
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        s.current_environment['env'] = 'sandbox'
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'sandbox.csv')
+        self.get = CountingGet()
+        self.registry = ScheduleRegistry(
+            MetadataStore(self.directory.name), self.get
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_fresh_file_is_read_once_without_fetching(self):
+        schedules_file(self.path, 1)
+        for i in range(3):
+            schedule = self.registry.lookup('WEEKLY free')
+        self.assertEqual(schedule.frequency, 'Weekly')
+        self.assertFalse(schedule.ad_hoc)
+        self.assertEqual(self.get.calls, 0)
+
+        os.remove(self.path)
+        self.assertIsNotNone(self.registry.lookup('weekly free'))
+
+    def test_missing_file_is_fetched_once_by_concurrent_threads(self):
+        with ThreadPoolExecutor(16) as pool:
+            found = list(pool.map(
+                lambda i: self.registry.lookup('ad-hoc free'), range(64)
+            ))
+        self.assertEqual(self.get.calls, 1)
+        self.assertTrue(all(schedule.ad_hoc for schedule in found))
+        with open(self.path) as f:
+            self.assertEqual(len(json.load(f)['schedule']), 2)
+
+    def test_stale_file_is_fetched_again(self):
+        schedules_file(self.path, s.other['schedules_update_days'])
+        self.assertIsNone(self.registry.lookup('weekly free'))
+        self.assertEqual(self.registry.names(),
+                         ['monthly free', 'ad-hoc free'])
+        self.assertEqual(self.get.calls, 1)
+
+    def test_contract_checks_use_the_registry(self):
+        schedules_file(self.path, 0)
+        s.other['cache_directory'] = self.directory.name
+        schedules.registry.clear()
+        try:
+            schedule = contract_checks.check_schedule_name('weekly FREE')
+            self.assertEqual(schedule.name, 'Weekly Free')
+            self.assertTrue(contract_checks.ad_hoc_checker('Weekly Free'))
+            self.assertEqual(
+                contract_checks.payment_time_frame_checker('Weekly Free'), 0
+            )
+            with self.assertRaises(InvalidParameterError):
+                contract_checks.check_schedule_name('Missing')
+        finally:
+            s.other['cache_directory'] = None
+            schedules.registry.clear()
@@ -1,13 +1,12 @@
 from ... import main
 import unittest
 from ...settings import Settings as s
-from pathlib import Path
+from ...store import metadata_store
 from datetime import datetime
 from os import remove
 
-base_path = Path(__file__).parent
-sandbox_schedules = (base_path / '../../includes/sandbox.csv').resolve()
-ecm3_schedules = (base_path / '../../includes/ecm3.csv').resolve()
+sandbox_schedules = metadata_store().path('sandbox.csv')
+ecm3_schedules = metadata_store().path('ecm3.csv')
 
 
 class Test(unittest.TestCase):
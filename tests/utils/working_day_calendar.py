@@ -0,0 +1,65 @@
+from ...utils.working_days import WorkingDayCalendar
+from datetime import date
+import unittest
+
+HOLIDAYS = [
+    '2019-04-19', '2019-04-22', '2019-05-06', '2019-05-27', '2019-08-26',
+    '2019-12-25', '2019-12-26', '2020-01-01',
+]
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.calendar = WorkingDayCalendar(HOLIDAYS)
+
+    def test_is_working_day(self):
+        self.assertTrue(self.calendar.is_working_day(date(2019, 6, 3)))
+        self.assertFalse(self.calendar.is_working_day(date(2019, 6, 1)))
+        self.assertFalse(self.calendar.is_working_day(date(2019, 8, 26)))
+
+    def test_add_working_days_from_a_working_day(self):
+        self.assertEqual(
+            self.calendar.add_working_days(date(2019, 5, 30), 5),
+            date(2019, 6, 6),
+        )
+
+    def test_add_working_days_overlapping_bank_holiday(self):
+        self.assertEqual(
+            self.calendar.add_working_days(date(2019, 8, 22), 2),
+            date(2019, 8, 27),
+        )
+
+    def test_add_working_days_starting_on_weekend(self):
+        self.assertEqual(
+            self.calendar.add_working_days(date(2019, 6, 1), 0),
+            date(2019, 6, 3),
+        )
+        self.assertEqual(
+            self.calendar.add_working_days(date(2019, 6, 1), 1),
+            date(2019, 6, 4),
+        )
+
+    def test_add_working_days_across_christmas(self):
+        self.assertEqual(
+            self.calendar.add_working_days(date(2019, 12, 23), 5),
+            date(2020, 1, 2),
+        )
+
+    def test_add_working_days_far_in_the_future(self):
+        self.assertEqual(
+            self.calendar.add_working_days(date(2019, 1, 1), 260),
+            date(2020, 1, 10),
+        )
+
+    def test_next_working_day(self):
+        self.assertEqual(self.calendar.next_working_day(date(2019, 4, 18)),
+                         date(2019, 4, 23))
+        self.assertEqual(self.calendar.next_working_day(date(2019, 6, 3)),
+                         date(2019, 6, 4))
+
+    def test_working_days_between(self):
+        self.assertEqual(
+            self.calendar.working_days_between(date(2019, 4, 15),
+                                               date(2019, 4, 29)),
+            8,
+        )
@@ -1,10 +1,9 @@
 from ...utils import working_days
 import unittest
 import os
-from pathlib import Path
+from ...store import metadata_store
 
-base_path = Path(__file__).parent
-holidays_file = (base_path / '../../includes/holidays.csv').resolve()
+holidays_file = metadata_store().path('holidays.csv')
 
 
 class Test(unittest.TestCase):
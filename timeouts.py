@@ -0,0 +1,93 @@
+"""
+eazysdk.timeouts
+~~~~~~~~~~~~~~~~
+
+This module contains the connect, read and deadline timeouts applied to
+requests sent by EazySDK. The defaults are read from
+settings.timeouts, and can be overridden for a block of calls with
+timeout().
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import monotonic
+from .settings import Settings as s
+from .exceptions import RequestTimeoutError
+
+# The timeouts overriding settings.timeouts in the current thread or task
+_current = ContextVar('eazysdk_timeouts', default={})
+
+
+@contextmanager
+def timeout(connect=None, read=None, deadline=None):
+    """ Override the timeouts of every call made inside the block. A
+    deadline is a budget in seconds shared by the validation and every
+    request of the calls in the block. Nested blocks never extend the
+    deadline of an enclosing block.
+
+    :Args:
+    connect - The number of seconds to wait for a connection
+    read - The number of seconds to wait between bytes of a response
+    deadline - The total number of seconds the block may take
+
+    :Example:
+    with timeout(deadline=10):
+        post.contract(...)
+    """
+    current = dict(_current.get())
+    if connect is not None:
+        current['connect'] = connect
+    if read is not None:
+        current['read'] = read
+    if deadline is not None:
+        deadline_at = monotonic() + deadline
+        if current.get('deadline_at') is None \
+                or deadline_at < current['deadline_at']:
+            current['deadline_at'] = deadline_at
+    token = _current.set(current)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def call_deadline():
+    """ Start the deadline of a single call, using the deadline in
+    settings.timeouts, unless an enclosing block ends sooner.
+    """
+    return timeout(deadline=s.timeouts['deadline'])
+
+
+def remaining():
+    """ Return the number of seconds left before the current deadline,
+    or None if there is no deadline.
+    """
+    deadline_at = _current.get().get('deadline_at')
+    if deadline_at is None:
+        return None
+    return deadline_at - monotonic()
+
+
+def check_deadline():
+    """ Raise an error if the current deadline has already passed.
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise RequestTimeoutError(
+            'The deadline for this call was exceeded before it could be'
+            ' completed. No further requests have been sent.'
+        )
+    return left
+
+
+def request_timeout():
+    """ Return the (connect, read) timeouts for the next request, each
+    shortened to fit inside the current deadline.
+    """
+    left = check_deadline()
+    current = _current.get()
+    connect = current.get('connect', s.timeouts['connect'])
+    read = current.get('read', s.timeouts['read'])
+    if left is not None:
+        connect = left if connect is None else min(connect, left)
+        read = left if read is None else min(read, left)
+    return connect, read
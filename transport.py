@@ -0,0 +1,145 @@
+from threading import Lock
+from .settings import Settings as s
+
+
+class Transport:
+    def __init__(self, pool_connections=None, pool_maxsize=None,
+                 pool_block=None):
+        """
+        Creates a pooled keep-alive transport shared by every request
+        sent to EazyCustomerManager
+
+        :Optional args:
+        - pool_connections - The number of hosts a connection pool is
+            kept for. By default, this is read from
+            settings.connection_pool
+        - pool_maxsize - The number of connections kept alive per host.
+            By default, this is read from settings.connection_pool
+        - pool_block - Whether a request should wait for a free
+            connection once pool_maxsize connections to a host are in
+            use, rather than opening a throwaway connection. By default,
+            this is read from settings.connection_pool
+        """
+        if pool_connections is None:
+            pool_connections = s.connection_pool['pool_connections']
+        if pool_maxsize is None:
+            pool_maxsize = s.connection_pool['pool_maxsize']
+        if pool_block is None:
+            pool_block = s.connection_pool['pool_block']
+
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        # The connection pool shared by every request using the transport
+        # is created on first use, so an unused transport costs nothing
+        self.adapter = None
+        self.session = None
+        self._lock = Lock()
+
+    def _connect(self):
+        if self.session is None:
+            with self._lock:
+                if self.session is None:
+                    from requests import session
+                    from requests.adapters import HTTPAdapter
+                    adapter = HTTPAdapter(
+                        pool_connections=self.pool_connections,
+                        pool_maxsize=self.pool_maxsize,
+                        pool_block=self.pool_block,
+                    )
+                    http = session()
+                    http.mount('https://', adapter)
+                    http.mount('http://', adapter)
+                    self.adapter = adapter
+                    self.session = http
+        return self.session
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request through the connection pool
+
+        :Required args:
+        - method - The HTTP method of the request
+        - url - The full URL of the request
+
+        :Returns:
+        requests.Response object
+        """
+        return self._connect().request(method, url, **kwargs)
+
+    def stats(self):
+        """
+        Return the usage statistics of the connection pool
+
+        :Example:
+        stats()
+
+        :Returns:
+        {'hosts': {'ecm3.eazycollect.co.uk': {...}}, 'connections': 1,
+         'requests': 10, 'idle_connections': 1, 'reuse_ratio': 0.9}
+        """
+        hosts = {}
+        pools = {}
+        if self.adapter is not None:
+            pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            # Idle connections are kept in the pool queue, empty slots
+            # are stored as None
+            idle = 0
+            if pool.pool is not None:
+                idle = len([c for c in list(pool.pool.queue) if c])
+            hosts[pool.host] = {
+                'connections': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle_connections': idle,
+                'reuse_ratio': _reuse_ratio(
+                    pool.num_connections, pool.num_requests
+                ),
+            }
+
+        connections = sum(h['connections'] for h in hosts.values())
+        requests = sum(h['requests'] for h in hosts.values())
+        return {
+            'hosts': hosts,
+            'connections': connections,
+            'requests': requests,
+            'idle_connections': sum(
+                h['idle_connections'] for h in hosts.values()
+            ),
+            'reuse_ratio': _reuse_ratio(connections, requests),
+        }
+
+    def close(self):
+        """
+        Close every connection held by the transport
+        """
+        if self.session is not None:
+            self.session.close()
+
+
+def _reuse_ratio(connections, requests):
+    # The share of requests which did not need a new connection
+    if not requests:
+        return 0.0
+    return max(requests - connections, 0) / requests
+
+
+_default_transport = None
+_default_transport_lock = Lock()
+
+
+def default_transport():
+    """
+    Return the process-wide transport, used by sessions created without
+    an explicit transport, such as the schedule and bank holiday
+    lookups performed during validation.
+    """
+    global _default_transport
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = Transport()
+    return _default_transport
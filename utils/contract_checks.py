@@ -1,37 +1,29 @@
-from pathlib import Path
 from ..exceptions import InvalidParameterError
-from .schedules import read_available_schedules_file
+from .schedules import registry
 from ..exceptions import InvalidStartDateError
 from ..settings import Settings as s
+from datetime import date
 from datetime import datetime
 from .working_days import check_working_days_in_future
 from warnings import warn
-import json
-
-base_path = Path(__file__).parent
-sandbox_schedules = (base_path / '../includes/sandbox.csv').resolve()
-ecm3_schedules = (base_path / '../includes/ecm3.csv').resolve()
 
 
 def check_schedule_name(schedule_name):
-    """ Read a file containing all available schedules, and return an
-    error if the selected schedule_name cannot be found in the file.
+    """ Look up the selected schedule_name in the schedule registry, and
+    return an error if it cannot be found.
 
     :Args:
      schedule_name - A schedule_name provided by the post.contract()
         function
     """
-    schedules = read_available_schedules_file()
-
-    schedule_names = []
-    for name in schedules['schedule']:
-        schedule_names.append(name['name'].lower())
+    schedule = registry.lookup(schedule_name)
 
-    if schedule_name.lower() not in schedule_names:
+    if schedule is None:
             raise InvalidParameterError(
                 '%s is not a valid schedule. The schedules available are as'
-                ' follows: %s' % (schedule_name, schedule_names)
+                ' follows: %s' % (schedule_name, registry.names())
             )
+    return schedule
 
 
 def check_termination_type(termination_type):
@@ -155,7 +147,13 @@ def check_payment_month_in_year(payment_month_in_year):
     payment_day_in_year - A payment_day_in_year argument provided by
         the post.contract() function
     """
-    if int(payment_month_in_year) not in range(1, 12):
+    try:
+        month = int(payment_month_in_year)
+    except (TypeError, ValueError):
+        raise InvalidParameterError(
+            'payment_month_in_year must be an integer.'
+        )
+    if month not in range(1, 13):
         raise InvalidParameterError(
             '%s is not a valid payment month in year. Please check the payment'
             ' month in year and re-submit. The available arguments are: \n'
@@ -187,13 +185,13 @@ def check_number_of_debits(number_of_debits):
             )
         else:
             pass
-    except TypeError:
+    except (TypeError, ValueError):
         raise InvalidParameterError(
             'number_of_debits must be a positive integer between 1 and 99.'
         )
 
 
-def check_start_date(start_date):
+def check_start_date(start_date, first_date=None):
     """ Check that the start_date argument is a valid ISO date and is
     at least x working days in the future, where x is the pre-determined
     bacs_processing_days setting. Throw an error if this is not the
@@ -202,11 +200,12 @@ def check_start_date(start_date):
     :Args:
     start_date - A start_date argument provided by the post.contract()
         function
+    first_date - The earliest start date available. By default, this
+        is counted from today
     """
-    date_format = '%Y-%m-%d'
-    start = datetime.strptime(start_date, date_format).date()
-    initial_days_in_future = s.direct_debit_processing_days['initial']
-    first_date = check_working_days_in_future(initial_days_in_future)
+    start = _parse_date(start_date, 'start date')
+    if first_date is None:
+        first_date = earliest_start_date()
 
     if start < first_date:
         if s.contracts['auto_start_date']:
@@ -237,9 +236,8 @@ def check_termination_date_is_in_future(termination_date, start_date):
     start_date - A start_date argument provided by the post.contract()
         function
     """
-    date_format = '%Y-%m-%d'
-    start = datetime.strptime(start_date, date_format).date()
-    termination = datetime.strptime(termination_date, date_format).date()
+    start = _parse_date(start_date, 'start date')
+    termination = _parse_date(termination_date, 'termination date')
 
     if termination < start:
         raise InvalidParameterError(
@@ -252,61 +250,141 @@ def check_termination_date_is_in_future(termination_date, start_date):
 
 
 def ad_hoc_checker(schedule):
-    """ Check the status of a schedule by reading the JSON found in
-        the includes folder, and whether or not it is ad-hoc. If it is
-        ad-hoc, return True, if not, return False.
+    """ Look up a schedule in the schedule registry, and check whether
+        or not it is ad-hoc. If it is not ad-hoc, return True, if it is,
+        return False.
 
     :Args:
     schedule - A schedule_name argument provided by the post.contract()
         function
     """
-    schedule_type = None
-    if s.current_environment['env'] == 'sandbox':
-        schedules_json = sandbox_schedules
-    else:
-        schedules_json = ecm3_schedules
-
-    with open(schedules_json, 'r') as f:
-        data = json.load(f)
-        for i in data['schedule']:
-            if schedule == i['name']:
-                schedule_type = i['ad_hoc']
-        if not schedule_type:
-            return False
-        elif schedule_type:
-            return True
-        else:
-            raise InvalidParameterError(
-                'Could not find the schedule.'
-            )
+    return _not_ad_hoc(registry.lookup(schedule))
 
 
 def payment_time_frame_checker(schedule):
-    """ Check the frequency of a schedule by reading the JSON found in
-        the includes folder. Return a number depending on the frequency
-        used in other functions for validation.
+    """ Look up the frequency of a schedule in the schedule registry.
+        Return a number depending on the frequency used in other
+        functions for validation.
 
     :Args:
     schedule - A schedule_name argument provided by the post.contract()
         function
     """
-    payment_type = None
-    if s.current_environment['env'] == 'sandbox':
-        schedules_json = sandbox_schedules
+    return _time_frame(registry.lookup(schedule))
+
+
+def earliest_start_date(day=None):
+    """ Return the earliest start date available to a new contract,
+    counted from today or from a given date.
+
+    :Args:
+    day - The date to count from. By default, this is today
+    """
+    return check_working_days_in_future(
+        s.direct_debit_processing_days['initial'], day
+    )
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
+    except ValueError:
+        raise InvalidParameterError(
+            '%s is not a valid %s. Dates must be given in the format'
+            ' YYYY-MM-DD.' % (value, name)
+        )
+
+
+def _not_ad_hoc(found):
+    # True if a schedule was found and is not ad-hoc
+    return found is not None and not found.ad_hoc
+
+
+def _time_frame(found):
+    # The number of the frequency of a schedule, as used by
+    # post.contract()
+    payment_type = found.frequency if found is not None else None
+    if payment_type == 'Weekly':
+        return 0
+    elif payment_type == 'Monthly':
+        return 1
+    elif payment_type == 'Annually':
+        return 2
     else:
-        schedules_json = ecm3_schedules
-    with open(schedules_json, 'r') as f:
-        data = json.load(f)
-        for i in data['schedule']:
-            if schedule == i['name']:
-                payment_type = i['frequency']
-        if payment_type == 'Weekly':
-            return 0
-        elif payment_type == 'Monthly':
-            return 1
-        elif payment_type == 'Annually':
-            return 2
-        else:
+        raise InvalidParameterError(
+            'Could not find the schedule.'
+        )
+
+
+class ContractContext:
+    def __init__(self, as_of=None):
+        """
+        The facts shared by every contract of a batch, resolved once for
+        the batch rather than once for each contract. Each schedule is
+        looked up the first time it is used, and the earliest start date
+        is counted the first time it is needed, so every contract of the
+        batch is checked against the same schedules and the same date.
+
+        :Optional args:
+        - as_of - The date the earliest start date is counted from, as a
+            date or an ISO date. By default, this is today.
+
+        :Example:
+        context = ContractContext('2019-08-01')
+        parameters = contract_parameters(arguments, context)
+        """
+        if as_of is not None and not isinstance(as_of, date):
+            as_of = _parse_date(as_of, 'date')
+        self.as_of = as_of
+        self._schedules = {}
+        self._first_date = None
+
+    def schedule(self, schedule_name):
+        """ Return the Schedule with the given name, ignoring case, or
+        raise an InvalidParameterError if it is not available.
+        """
+        name = str(schedule_name).lower()
+        try:
+            found = self._schedules[name]
+        except KeyError:
+            found = self._schedules[name] = registry.lookup(name)
+        if found is None:
             raise InvalidParameterError(
-                'Could not find the schedule.'
+                '%s is not a valid schedule. The schedules available are as'
+                ' follows: %s' % (schedule_name, registry.names())
             )
+        return found
+
+    def not_ad_hoc(self, schedule_name):
+        """ Return True if the schedule is not ad-hoc, as ad_hoc_checker.
+        """
+        return _not_ad_hoc(self.schedule(schedule_name))
+
+    def time_frame(self, schedule_name):
+        """ Return the number of the frequency of the schedule, as
+        payment_time_frame_checker.
+        """
+        return _time_frame(self.schedule(schedule_name))
+
+    def first_date(self):
+        """ Return the earliest start date available to the contracts
+        of the batch.
+        """
+        if self._first_date is None:
+            self._first_date = earliest_start_date(self.as_of)
+        return self._first_date
+
+    def resolve(self):
+        """ Load the schedules and count the earliest start date now,
+        rather than when the first contract is checked. Either may be
+        fetched from EazyCustomerManager, so an async caller runs this
+        in a thread.
+        """
+        registry.schedules()
+        self.first_date()
+
+    def check_start_date(self, start_date):
+        """ Check a start date against the earliest start date of the
+        batch, as check_start_date.
+        """
+        return check_start_date(start_date, self.first_date())
@@ -1,126 +1,188 @@
-from pathlib import Path
 from datetime import datetime
+from collections import namedtuple
+from threading import Lock
 from ..settings import Settings as s
-import json
+from ..codec import dumps
+from ..codec import loads
 from ..get import Get
+from ..store import metadata_store
 
 
-base_path = Path(__file__).parent
-sandbox_schedules_file = (base_path / '../includes/sandbox.csv').resolve()
-ecm3_schedules_file = (base_path / '../includes/ecm3.csv').resolve()
+# The names of the schedules files in the metadata store
+sandbox_schedules_file = 'sandbox.csv'
+ecm3_schedules_file = 'ecm3.csv'
 
+# A schedule available to the client, as used by contract validation
+Schedule = namedtuple('Schedule', 'name ad_hoc frequency')
 
-def read_available_schedules_file():
-    """ Read the schedules file currently being used depending on the
-    current_environment setting. If the schedules file has not been
-    updated in over a year, or the setting to force the schedule updates
-    is enabled, update the schedules file by calling
-    update_schedules_file(). Return a list of schedules to be used by
-    other functions.
-    """
-    # Check the current environment, and select the appropriate file
-    if s.current_environment['env'] == 'sandbox':
-        file = sandbox_schedules_file
-    else:
-        file = ecm3_schedules_file
-    # Instantiate the dictionary we will parse JSON into
-    schedules_json = {}
-    date_today = datetime.now().date()
-    day_difference = 0
-
-    with open(file, 'a+') as f:
-        f.seek(0)
-        try:
-            data = json.load(f)
-            # ISO date formatting
-            date_format = '%Y-%m-%d'
-            last_update_date_text = data['last_update_date']['last_updated']
-            last_update_date = datetime.strptime(
-                last_update_date_text,
-                date_format,
+
+class ScheduleRegistry:
+    def __init__(self, store=None, get=None):
+        """ A process-wide index of the schedules available in each
+        environment, keyed by lower-cased name. The schedules are read
+        from the schedules file once, and are only fetched from
+        EazyCustomerManager again when the file is older than
+        other['schedules_update_days'], or when
+        other['force_schedule_updates'] is enabled.
+
+        :Args:
+        store - The MetadataStore the schedules files are kept in. By
+            default, the store in other['cache_directory'] is used.
+        get - The Get used to fetch schedules. By default, a Get using
+            the process-wide session is used.
+        """
+        self.store = store
+        self.get = get
+        # Held while loading, so only one thread fetches the schedules
+        self._lock = Lock()
+        # The loaded schedules of each environment, replaced whole
+        self._loaded = {}
+
+    def schedules(self):
+        """ Return the schedules of the current environment, keyed by
+        lower-cased name, loading them if they are missing or stale.
+        """
+        return self._current()[1]
+
+    def snapshot(self):
+        """ Return the schedules of the current environment in the
+        format of the schedules file.
+        """
+        return self._current()[2]
+
+    def _current(self):
+        environment = s.current_environment['env'].lower()
+        loaded = self._loaded.get(environment)
+        if loaded is not None and self._fresh(loaded[0]):
+            return loaded
+        with self._lock:
+            loaded = self._loaded.get(environment)
+            if loaded is None or not self._fresh(loaded[0]):
+                loaded = self._load(environment)
+                self._loaded[environment] = loaded
+            return loaded
+
+    def lookup(self, name):
+        """ Return the Schedule with the given name, ignoring case, or
+        None if the schedule is not available.
+        """
+        return self.schedules().get(str(name).lower())
+
+    def names(self):
+        """ Return the lower-cased names of every available schedule.
+        """
+        return list(self.schedules())
+
+    def clear(self):
+        """ Forget every loaded schedule, so they are read again on the
+        next lookup.
+        """
+        with self._lock:
+            self._loaded = {}
+
+    @staticmethod
+    def _fresh(last_updated):
+        if s.other['force_schedule_updates']:
+            return False
+        age = datetime.now().date() - last_updated
+        return age.days < s.other['schedules_update_days']
+
+    def _load(self, environment):
+        store = self.store
+        if store is None:
+            store = metadata_store()
+
+        def fresh(text):
+            if not text:
+                return False
+            last_updated = _parse(text)[0]
+            return last_updated is not None and self._fresh(last_updated)
+
+        text = store.refresh(
+            _file(environment), fresh,
+            lambda stale: dumps(self._fetch()),
+        )
+        last_updated, schedules_json = _parse(text)
+        index = {}
+        for schedule in schedules_json['schedule']:
+            index[schedule['name'].lower()] = Schedule(
+                schedule['name'],
+                # The file marks schedules which are not ad-hoc as True
+                not schedule['ad_hoc'],
+                schedule['frequency'],
             )
-            day_difference += date_today.day - last_update_date.day
-
-            # Instantiate the JSON object to be written to
-            schedules_json['schedule'] = []
-            # Get the schedules from EazyCustomerManager
-            schedules = Get().schedules()
-            services_list = json.loads(schedules)
-            # Read the schedules
-            schedule_list = services_list['Services']
-
-            for i in range(len(schedule_list)):
-                schedules = (schedule_list[i]['Schedules'])
-                for schedule in schedules:
-                    # Ad-hoc will appear nowhere else other than
-                    # potentially name. It will be in Description
-                    # every time, however.
-                    if 'AD-HOC Payments' in schedule['Description']:
-                        schedule_type = False
-                    else:
-                        schedule_type = True
-
-                    schedules_json['schedule'].append({
-                        'name': schedule['Name'],
-                        'ad_hoc': schedule_type,
-                        'frequency': schedule['Frequency'],
-                    })
-                    # We save the date in ISO format, but JSON cannot
-                    # parse a date
-                schedules_json['last_update_date'] = ({
-                    'last_updated': str(datetime.now().date())
-                })
-            if day_difference >= 365 or s.other['force_schedule_updates']:
-                update_schedules_file(schedules_json)
-
-            return schedules_json
-
-        except:
-            # Instantiate the JSON object to be written to
-            schedules_json['schedule'] = []
-            # Get the schedules from EazyCustomerManager
-            schedules = Get().schedules()
-            services_list = json.loads(schedules)
-            # Read the schedules
-            schedule_list = services_list['Services']
-
-            for i in range(len(schedule_list)):
-                schedules = (schedule_list[i]['Schedules'])
-                for schedule in schedules:
-                    # Ad-hoc will appear nowhere else other than
-                    # potentially name. It will be in Description
-                    # every time, however.
-                    if 'AD-HOC Payments' in schedule['Description']:
-                        schedule_type = False
-                    else:
-                        schedule_type = True
-
-                    schedules_json['schedule'].append({
-                        'name': schedule['Name'],
-                        'ad_hoc': schedule_type,
-                        'frequency': schedule['Frequency'],
-                    })
-                    # We save the date in ISO format, but JSON cannot
-                    # parse a date
-                schedules_json['last_update_date'] = ({
-                    'last_updated': str(datetime.now().date())
+        return last_updated, index, schedules_json
+
+    def _fetch(self):
+        get = self.get
+        if get is None:
+            get = Get()
+        services_list = loads(get.schedules())
+        schedules_json = {'schedule': []}
+        for service in services_list['Services']:
+            for schedule in service['Schedules']:
+                # Ad-hoc will appear nowhere else other than
+                # potentially name. It will be in Description
+                # every time, however.
+                schedules_json['schedule'].append({
+                    'name': schedule['Name'],
+                    'ad_hoc': 'AD-HOC Payments' not in
+                              schedule['Description'],
+                    'frequency': schedule['Frequency'],
                 })
-            update_schedules_file(schedules_json)
-            return schedules_json
+        # We save the date in ISO format, but JSON cannot parse a date
+        schedules_json['last_update_date'] = {
+            'last_updated': str(datetime.now().date())
+        }
+        return schedules_json
+
+
+def _file(environment):
+    if environment == 'sandbox':
+        return sandbox_schedules_file
+    return ecm3_schedules_file
+
+
+def _parse(text):
+    # Return the date a schedules file was updated, and its schedules
+    try:
+        schedules_json = loads(text)
+        last_updated = datetime.strptime(
+            schedules_json['last_update_date']['last_updated'],
+            '%Y-%m-%d',
+        ).date()
+    except (ValueError, KeyError, TypeError):
+        return None, None
+    return last_updated, schedules_json
+
+
+# The registry shared by every thread and EazySDK in the process
+registry = ScheduleRegistry()
+
+
+def read_available_schedules_file():
+    """ Return the schedules of the current environment, in the format
+    of the schedules file. The schedules are held by the process-wide
+    registry, so the schedules file is only read once, and schedules
+    are only fetched from EazyCustomerManager when the file is older
+    than other['schedules_update_days'], or the setting to force the
+    schedule updates is enabled.
+    """
+    return registry.snapshot()
+
 
 def update_schedules_file(schedules_json):
-    """ Update the schedules file with the list of schedules passed by
-    read_available_schedules_file()
+    """ Update the schedules file of the current environment in the
+    metadata store with the list of schedules passed by
+    read_available_schedules_file(). The file is replaced in one step,
+    so it is never read half written.
 
     :Args:
     schedules_json - A JSON object of all of the schedules provided by
         read_available_schedules_file()
     """
-    if s.current_environment['env'] == 'sandbox':
-        file = sandbox_schedules_file
-    else:
-        file = ecm3_schedules_file
-
-    with open(file, 'w') as f:
-        json.dump(schedules_json, f)
-    return 'Updated bank holidays file.'
+    metadata_store().write(
+        _file(s.current_environment['env'].lower()),
+        dumps(schedules_json),
+    )
+    return 'Updated schedules file.'
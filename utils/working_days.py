@@ -1,128 +1,365 @@
-from pathlib import Path
 from datetime import datetime
 from ..settings import Settings as s
-from datetime import timedelta
-from requests import get
+from datetime import date as Date
+from bisect import bisect_left
+from bisect import bisect_right
+from threading import Lock
+from threading import Thread
+from time import monotonic
+import os
+from ..store import metadata_store
+from ..codec import loads
+from ..transport import default_transport
+from ..timeouts import request_timeout
+from ..exceptions import RequestTimeoutError
+from requests.exceptions import Timeout
 
 
-base_path = Path(__file__).parent
-bank_holidays_file = (base_path / '../includes/holidays.csv').resolve()
+# The name of the bank holidays file in the metadata store
+bank_holidays_file = 'holidays.csv'
 
 
-def check_working_days_in_future(number_of_days):
-    """ Take X number of working days, and calculate the number of
-    working days X is in the future from today. Call
-    read_bank_holiday_file_and_check_if_update_needed() to get a list
-    of bank holidays.
+class WorkingDayCalendar:
+    def __init__(self, holidays):
+        """ A calendar of working days, being weekdays which are not bank
+        holidays. Days are counted through the number of weekdays before
+        them, less the number of bank holidays before them, found in a
+        sorted index, so every question is answered in constant or log
+        time whatever the distance between dates.
+
+        :Args:
+        holidays - The bank holidays, as dates or ISO date strings
+        """
+        closed = set()
+        for holiday in holidays:
+            if not isinstance(holiday, Date):
+                holiday = datetime.strptime(
+                    str(holiday).strip(), '%Y-%m-%d'
+                ).date()
+            # A holiday at the weekend is not a working day anyway
+            if holiday.weekday() < 5:
+                closed.add(holiday.toordinal())
+        self._closed = frozenset(closed)
+        # The prefix sums of holidays, as positions in a sorted index
+        self._sorted = sorted(closed)
+
+    @staticmethod
+    def _weekdays_before(ordinal):
+        # Ordinal 1, 0001-01-01, was a Monday
+        days = ordinal - 1
+        return days // 7 * 5 + min(days % 7, 5)
+
+    @staticmethod
+    def _weekday(index):
+        # The ordinal of the index-th weekday, counting from zero
+        return index // 5 * 7 + index % 5 + 1
+
+    def _rank(self, ordinal):
+        # The number of working days before the ordinal
+        return self._weekdays_before(ordinal) \
+            - bisect_left(self._sorted, ordinal)
+
+    def _working_day(self, rank):
+        # The ordinal of the working day with the given rank. Each pass
+        # skips the holidays found so far, so it settles in a few passes
+        skipped = 0
+        while True:
+            ordinal = self._weekday(rank + skipped)
+            holidays = bisect_right(self._sorted, ordinal)
+            if holidays == skipped:
+                return ordinal
+            skipped = holidays
+
+    def is_working_day(self, day):
+        """ Return whether a date is a working day.
+
+        :Args:
+        day - The date to be checked
+        """
+        return day.weekday() < 5 and day.toordinal() not in self._closed
+
+    def next_working_day(self, day):
+        """ Return the first working day after a date.
+
+        :Args:
+        day - The date to start from
+        """
+        ordinal = self._working_day(self._rank(day.toordinal() + 1))
+        return Date.fromordinal(ordinal)
+
+    def add_working_days(self, day, number_of_days):
+        """ Return the date number_of_days working days after a date. If
+        the date is not a working day, counting starts from the next
+        working day.
+
+        :Args:
+        day - The date to start from
+        number_of_days - The number of working days to add
+        """
+        rank = self._rank(day.toordinal()) + number_of_days
+        return Date.fromordinal(self._working_day(rank))
+
+    def working_days_between(self, start, end):
+        """ Return the number of working days from start up to, but not
+        including, end.
+
+        :Args:
+        start - The first date counted
+        end - The date counting stops at
+        """
+        return self._rank(end.toordinal()) - self._rank(start.toordinal())
+
+
+_calendar = None
+_calendar_key = None
+_calendar_lock = Lock()
+
+
+def working_day_calendar():
+    """ Return the WorkingDayCalendar of the bank holidays file. The
+    calendar is built once, and only rebuilt when the file changes or
+    the day changes, when the file may need an update.
+    """
+    global _calendar, _calendar_key
+    path = metadata_store().path(bank_holidays_file)
+    key = (datetime.now().date(), path, _modified(path))
+    if _calendar_key != key:
+        with _calendar_lock:
+            if _calendar_key != key:
+                holidays = read_bank_holiday_file_and_check_if_update_needed()
+                _calendar = WorkingDayCalendar(holidays)
+                _calendar_key = key[:2] + (_modified(path),)
+    return _calendar
+
+
+def _modified(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def check_working_days_in_future(number_of_days, day=None):
+    """ Take X number of working days, and calculate the date X working
+    days in the future from today, or from a given date. If the date is
+    not a working day, counting starts from the next working day.
 
     :Args:
     number_of_days - The number of days in the future X is
+    day - The date to count from. By default, this is today
     """
-    holidays = read_bank_holiday_file_and_check_if_update_needed()
-    working_days = 0
-    calendar_days = 0
-    today_datetime = datetime.now()
-    today_date = today_datetime.date()
-    # We want to keep today_date constant for raising errors
-    start_date = today_date
-
-    # Check if today is a weekday, if it is not, go to next weekday
-    if today_date.isoweekday() == 6 or today_date.isoweekday() == 7 or \
-            str(today_date) in holidays:
-        # Should never need 10 iterations. We want the next working day
-        for i in range(10):
-            iter_date = today_date + timedelta(i)
-            if iter_date.isoweekday() in range(1, 5) \
-                    and str(iter_date) not in holidays:
-                start_date += timedelta(i)
-                break
-
-    while working_days <= (number_of_days - 1):
-        working_date = start_date + timedelta(calendar_days)
-        if working_date.isoweekday() != 6 and working_date.isoweekday() != 7 \
-                and str(working_date) not in holidays:
-            working_days += 1
-        calendar_days += 1
-    final_date = start_date + timedelta(calendar_days)
-
-    while final_date.isoweekday() == 6 or final_date.isoweekday() == 7 \
-            or str(final_date) in holidays:
-        final_date += timedelta(1)
-        calendar_days += 1
-    return final_date
+    if day is None:
+        day = datetime.now().date()
+    return working_day_calendar().add_working_days(day, number_of_days)
+
+
+# The validators kept with the bank holidays, sent on a refresh
+_validators = ('ETag', 'Last-Modified')
+# The number of seconds before a failed refresh is tried again
+_retry_interval = 300
+
+
+class BankHolidayRefresher:
+    def __init__(self):
+        """ Refreshes the bank holidays file from
+        other['bank_holidays_url'], either in the calling thread or in a
+        background thread while the last good bank holidays are used.
+        """
+        self._lock = Lock()
+        self.thread = None
+        self._failed_at = None
+
+    def refresh(self):
+        """ Fetch the bank holidays, unless another thread or process
+        has just done so, and return the list of bank holidays. The
+        validators kept in the file are sent, so the bank holidays are
+        only sent again if they have changed, and the file is written
+        once.
+        """
+        text = metadata_store().refresh(
+            bank_holidays_file, _up_to_date, _fetch_bank_holidays_file
+        )
+        return parse_bank_holidays_file(text)[0]
+
+    def start(self):
+        """ Refresh the bank holidays in a background thread, unless a
+        refresh is already running, or failed in the last few minutes.
+        """
+        with self._lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            if self._failed_at is not None \
+                    and monotonic() - self._failed_at < _retry_interval:
+                return
+            self.thread = Thread(
+                target=self._run, name='eazysdk-bank-holidays', daemon=True
+            )
+            self.thread.start()
+
+    def _run(self):
+        try:
+            self.refresh()
+        except Exception:
+            # The last good bank holidays are used until a refresh works
+            self._failed_at = monotonic()
+        else:
+            self._failed_at = None
+
+    def wait(self, timeout=None):
+        """ Wait for a background refresh to finish.
+        """
+        thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+# The refresher shared by every thread in the process
+refresher = BankHolidayRefresher()
+
+
+def _up_to_date(text):
+    holidays, last_updated, validators = parse_bank_holidays_file(text)
+    if holidays is None:
+        return False
+    day_difference = (datetime.now().date() - last_updated).days
+    return day_difference < s.other['bank_holidays_update_days']
+
+
+def _fetch_bank_holidays_file(text):
+    holidays, last_updated, validators = parse_bank_holidays_file(text)
+    response = fetch_bank_holidays(
+        validators if holidays is not None else None
+    )
+    if response.status_code == 304 and holidays is not None:
+        return format_bank_holidays_file(holidays, validators)
+    response.raise_for_status()
+
+    year = datetime.now().year
+    holidays = [
+        # Add bank holidays from or after the current year
+        event['date'] for event
+        in loads(response.content)['england-and-wales']['events']
+        if int(event['date'][0:4]) >= year
+    ]
+    validators = {
+        name: response.headers[name]
+        for name in _validators if name in response.headers
+    }
+    return format_bank_holidays_file(holidays, validators)
 
 
 def read_bank_holiday_file_and_check_if_update_needed():
     """ Read the bank holidays file and return a list of all bank
-    bank holidays for the current year. If the file has not been updated
-    in the pre_determined number of days in the settings file, read
-    the bank_holidays.json file and get a list of all bank holidays in
-    the current year or later.
+    holidays for the current year or later. If the file has not been
+    updated in the pre-determined number of days in the settings file,
+    the bank holidays are refreshed in the background, and the bank
+    holidays already in the file are returned. Only if there is no file
+    are the bank holidays fetched before returning.
+    """
+    holidays, last_updated, validators = read_bank_holidays_file()
+    if holidays is None:
+        return refresher.refresh()
+
+    day_difference = (datetime.now().date() - last_updated).days
+    if day_difference >= s.other['bank_holidays_update_days']:
+        refresher.start()
+    return holidays
+
+
+def read_bank_holidays_file():
+    """ Read the bank holidays file from the metadata store.
+
+    :Returns:
+    (holidays, last_updated, validators), or (None, None, {}) if the
+    file is missing or cannot be read
     """
-    # We need the datetime to access the year element
-    today_datetime = datetime.now()
-    today_date = today_datetime.date()
+    return parse_bank_holidays_file(
+        metadata_store().read(bank_holidays_file)
+    )
+
+
+def parse_bank_holidays_file(text):
+    """ Parse the contents of a bank holidays file.
+
+    :Args:
+    text - The contents of the file, or None
+
+    :Returns:
+    (holidays, last_updated, validators), or (None, None, {}) if the
+    file cannot be parsed
+    """
+    if not text:
+        return None, None, {}
+    lines = text.split('\n')
+    try:
+        # The first line of the file holds the date of the last update
+        last_updated = datetime.strptime(lines[0], '%Y-%m-%d').date()
+    except ValueError:
+        return None, None, {}
     holidays = []
-    with open(bank_holidays_file, 'a+') as f:
-        f.seek(0)
-        try:
-            # Check the first line of the file to check last update
-            text_date = f.readline().strip('\n')
-
-            # The file stores the date as a string. We need a Date object
-            date_formatting = '%Y-%m-%d'
-            last_update_date = datetime.strptime(
-                text_date, date_formatting
-            ).date()
-            date_difference = today_date - last_update_date
-            day_difference = date_difference.days
-
-            if day_difference >= s.other['bank_holidays_update_days']:
-                print(
-                    'The bank holidays file has not been updated in over %s'
-                    ' days. Updating......' % day_difference
-                )
-                new_holidays = get('https://www.gov.uk/bank-holidays.json')
-                holidays_json = new_holidays.json()['england-and-wales'] \
-                    ['events']
-
-                for date in holidays_json:
-                    # Add  bank holidays from or after the current year
-                    if int(date['date'][0:4]) >= today_datetime.year:
-                        holidays.append(date['date'])
-                    else:
-                        continue
-                    update_bank_holidays_file(holidays)
-            else:
-                for line in f:
-                    holidays.append(line.strip('\n'))
-
-            return holidays
-        except:
-            new_holidays = get('https://www.gov.uk/bank-holidays.json')
-            holidays_json = new_holidays.json()['england-and-wales']['events']
-
-            for date in holidays_json:
-                # Add  bank holidays from or after the current year
-                if int(date['date'][0:4]) >= today_datetime.year:
-                    holidays.append(date['date'])
-                else:
-                    continue
-                update_bank_holidays_file(holidays)
-        return holidays
-
-
-def update_bank_holidays_file(bank_holiday_list):
-    """ Write the bank_holiday_list to the bank_holidays.csv file,
-    prepending it with todays date, which will be used for updating the
-    file in the future.
+    validators = {}
+    for line in lines[1:]:
+        if line.startswith('# '):
+            name, _, value = line[2:].partition(': ')
+            validators[name] = value
+        elif line:
+            holidays.append(line)
+    return holidays, last_updated, validators
+
+
+def format_bank_holidays_file(bank_holiday_list, validators=None):
+    """ Return the contents of a bank holidays file, headed with todays
+    date, which will be used for updating the file in the future.
 
     :Args:
-    number_of_days - The number of days in the future X is
+    bank_holiday_list - The bank holidays to be written
+    validators - The ETag and Last-Modified headers of the bank holidays
+    """
+    lines = [str(datetime.now().date())]
+    for name, value in (validators or {}).items():
+        lines.append('# %s: %s' % (name, value))
+    lines.extend(bank_holiday_list)
+    return '\n'.join(lines)
+
+
+def fetch_bank_holidays(validators=None):
+    """ Fetch the bank holidays json file from other['bank_holidays_url'],
+    within the timeouts and deadline of the current call.
+
+    :Args:
+    validators - The ETag and Last-Modified headers of the bank holidays
+        already held, so they are only sent again if they have changed
+    """
+    headers = {}
+    if validators:
+        if 'ETag' in validators:
+            headers['If-None-Match'] = validators['ETag']
+        if 'Last-Modified' in validators:
+            headers['If-Modified-Since'] = validators['Last-Modified']
+    try:
+        return default_transport().request(
+            'GET', s.other['bank_holidays_url'], headers=headers,
+            timeout=request_timeout(),
+        )
+    except Timeout:
+        raise RequestTimeoutError(
+            'gov.uk did not respond in time when updating the bank'
+            ' holidays file.'
+        )
+
+
+def update_bank_holidays_file(bank_holiday_list, validators=None):
+    """ Write the bank_holiday_list to the bank holidays file in the
+    metadata store, prepending it with todays date, which will be used
+    for updating the file in the future. The file is replaced in one
+    step, so it is never read half written.
+
+    :Args:
+    bank_holiday_list - The bank holidays to be written
+    validators - The ETag and Last-Modified headers of the bank holidays
     """
-    with open(bank_holidays_file, 'w') as f:
-        # Update the header
-        f.write(str(datetime.now().date()))
-        for date in bank_holiday_list:
-            f.write('\n%s' % date)
+    metadata_store().write(
+        bank_holidays_file,
+        format_bank_holidays_file(bank_holiday_list, validators),
+    )
     return 'Updated bank holidays file.'